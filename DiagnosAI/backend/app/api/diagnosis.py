@@ -1,18 +1,32 @@
 from fastapi import APIRouter, HTTPException, Depends, status, Query
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from typing import List, Optional
 from app.core.security import get_current_user
-from app.db.crud import (
-    create_diagnosis_record,
-    create_session,
-    add_message,
-    get_session_messages,
-    get_session,
+from app.db.crud import SessionNotFoundError, begin_diagnosis_turn, discard_user_turn, queue_diagnosis_turn
+from app.db.write_behind import SpilledRowsError
+from app.core.config import DIAGNOSIS_GROUNDING, DIAGNOSIS_GROUNDING_DOCS, HISTORY_MAX_MESSAGES
+from app.services.health_search import health_search
+from app.services.history import history_manager
+from app.services.response_cache import response_cache
+from app.services.gemini_client import (
+    CircuitOpenError,
+    candidate_text,
+    get_diagnosis_with_history,
+    stream_diagnosis_with_history,
 )
-from app.services.gemini_client import get_diagnosis_with_history
+import functools
 import json
+import logging
 
 router = APIRouter()
+logger = logging.getLogger("diagnosis")
+
+INSTRUCTION = (
+    "You are a doctor providing a clear diagnosis based on symptoms. "
+    "Respond concisely, avoid mentioning you are AI or disclaimers. "
+    "Make it sound like a real doctor-patient conversation."
+)
 
 class DiagnosisRequest(BaseModel):
     prompt: str
@@ -23,55 +37,173 @@ class DiagnosisResponse(BaseModel):
     diagnosis_text: str
     record_id: int
 
+
+async def _start_turn(req: DiagnosisRequest, user, session_id: Optional[int]):
+    """Store the user's message and build the Gemini ``contents`` for this turn.
+
+    Returns ``(session_id, contents, first_turn, abandon)``; ``first_turn``
+    means the reply depends on the prompt alone, so near-duplicate answers may
+    be reused, and ``await abandon()`` removes the stored message again when
+    no reply can be produced.
+    """
+    new_session = session_id is None
+    try:
+        # The new message itself is sent below with the instruction, not as history.
+        session_id, message_id, prior = await begin_diagnosis_turn(
+            user.id, session_id, req.prompt, history_limit=HISTORY_MAX_MESSAGES
+        )
+    except SessionNotFoundError:
+        raise HTTPException(status_code=404, detail="Session not found")
+    except SpilledRowsError:
+        # The previous reply isn't in the database yet; answering without it
+        # would silently drop it from the conversation.
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Conversation history is temporarily unavailable",
+        )
+    abandon = functools.partial(discard_user_turn, session_id, message_id, new_session)
+    contents, summary = await history_manager.build(session_id, prior)
+
+    diagnosis_prompt = INSTRUCTION
+    if summary:
+        diagnosis_prompt += "\n\nEarlier in this conversation:\n" + summary
+    if DIAGNOSIS_GROUNDING:
+        notes = health_search.grounding(req.prompt, DIAGNOSIS_GROUNDING_DOCS)
+        if notes:
+            diagnosis_prompt += "\n\nReference notes (may or may not apply):\n" + notes
+    diagnosis_prompt += "\n\nSymptoms:\n" + req.prompt
+    first_turn = not contents and not summary
+    contents.append({"role": "user", "parts": [{"text": diagnosis_prompt}]})
+    return session_id, contents, first_turn, abandon
+
+
+async def _finish_turn(session_id: int, user, req: DiagnosisRequest, diagnosis_data):
+    # Queued, not committed: the response doesn't wait on the insert.
+    await queue_diagnosis_turn(session_id, user.id, req.prompt, diagnosis_data)
+
+
+def _unavailable(exc: CircuitOpenError) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Diagnosis service is temporarily unavailable",
+        headers={"Retry-After": str(max(1, int(exc.retry_after)))},
+    )
+
+
 @router.post("/diagnosis", response_model=DiagnosisResponse, status_code=status.HTTP_201_CREATED)
 async def create_diagnosis(
     req: DiagnosisRequest,
     user=Depends(get_current_user),
     session_id: Optional[int] = Query(None, description="Conversation session id"),
 ):
-    if session_id is None:
-        session = await create_session(user.id)
-        session_id = session.id
-    else:
-        session = await get_session(session_id)
-        if not session:
-            raise HTTPException(status_code=404, detail="Session not found")
-
-    await add_message(session_id, "user", req.prompt)
-
-    messages = await get_session_messages(session_id)
-    instruction = (
-        "You are a doctor providing a clear diagnosis based on symptoms. "
-        "Respond concisely, avoid mentioning you are AI or disclaimers. "
-        "Make it sound like a real doctor-patient conversation."
-    )
+    session_id, contents, first_turn, abandon = await _start_turn(req, user, session_id)
 
-    diagnosis_prompt = instruction + "\n\nSymptoms:\n" + req.prompt
+    try:
+        diagnosis_data, _ = await response_cache.get_or_fetch(
+            contents, get_diagnosis_with_history, req.prompt if first_turn else None
+        )
+    except CircuitOpenError as e:
+        await abandon()
+        raise _unavailable(e)
+    except Exception:
+        await abandon()
+        raise
 
-    contents = [{"role": m.role, "parts": [{"text": m.content}]} for m in messages]
-    contents.append({"role": "user", "parts": [{"text": diagnosis_prompt}]})
+    # Extract text safely for response and saving message
+    diagnosis_text = candidate_text(diagnosis_data) or "No diagnosis returned"
 
-    diagnosis_data = await get_diagnosis_with_history(contents)
+    await _finish_turn(session_id, user, req, diagnosis_data)
 
+    return DiagnosisResponse(diagnosis_text=diagnosis_text, record_id=session_id)
 
-    # Extract text safely for response and saving message
-    diagnosis_text = ""
-    if isinstance(diagnosis_data, str):
-        diagnosis_text = diagnosis_data
-    elif isinstance(diagnosis_data, dict):
-        parts = diagnosis_data.get("content", {}).get("parts") if "content" in diagnosis_data else diagnosis_data.get("parts")
-        if parts and isinstance(parts, list) and len(parts) > 0 and "text" in parts[0]:
-            diagnosis_text = parts[0]["text"]
-        else:
-            diagnosis_text = diagnosis_data.get("text", "No diagnosis returned")
-    else:
-        diagnosis_text = "No diagnosis returned"
-    
-
-    # Save model reply message as JSON string so DB save works
-    import json
-    await add_message(session_id, "model", json.dumps(diagnosis_data))
-
-    await create_diagnosis_record(user.id, req.prompt, diagnosis_data)
 
-    return DiagnosisResponse(diagnosis_text=diagnosis_text, record_id=session_id)
+def _sse(data: dict, event: Optional[str] = None) -> str:
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data)}\n\n"
+
+
+@router.post("/diagnosis/stream")
+async def stream_diagnosis(
+    req: DiagnosisRequest,
+    user=Depends(get_current_user),
+    session_id: Optional[int] = Query(None, description="Conversation session id"),
+):
+    """Same as ``POST /diagnosis`` but relays Gemini's reply as Server-Sent Events.
+
+    Events: ``session`` (the session id), unnamed ``data`` events carrying
+    ``{"text": ...}`` deltas, then ``done`` with the full text once the reply
+    has been saved, or ``error`` if generation fails midway. Failures before
+    the first chunk (including an open circuit breaker) are plain HTTP errors,
+    as for ``POST /diagnosis``.
+    """
+    session_id, contents, first_turn, abandon = await _start_turn(req, user, session_id)
+    first_turn_prompt = req.prompt if first_turn else None
+    cached, _ = response_cache.lookup(contents, first_turn_prompt)
+
+    stream = None
+    first = []
+    if cached is None:
+        # Start the upstream call before committing to a 200 event stream.
+        stream = stream_diagnosis_with_history(contents)
+        try:
+            first.append(await stream.__anext__())
+        except StopAsyncIteration:
+            pass
+        except CircuitOpenError as e:
+            await abandon()
+            raise _unavailable(e)
+        except Exception:
+            await abandon()
+            raise
+
+    async def relay():
+        for candidate in first:
+            yield candidate
+        async for candidate in stream:
+            yield candidate
+
+    async def events():
+        yield _sse({"session_id": session_id}, event="session")
+        if cached is not None:
+            diagnosis_text = candidate_text(cached)
+            yield _sse({"text": diagnosis_text})
+            await _finish_turn(session_id, user, req, cached)
+            yield _sse({"diagnosis_text": diagnosis_text, "record_id": session_id}, event="done")
+            return
+
+        parts = []
+        last = {}
+        try:
+            async for candidate in relay():
+                text = candidate_text(candidate)
+                if candidate:
+                    last = candidate
+                if text:
+                    parts.append(text)
+                    yield _sse({"text": text})
+        except Exception as e:
+            logger.error(f"Gemini stream failed for session {session_id}: {e}")
+            await abandon()
+            yield _sse({"detail": "Diagnosis generation failed"}, event="error")
+            return
+        finally:
+            await stream.aclose()
+
+        diagnosis_text = "".join(parts)
+        diagnosis_data = {
+            "content": {"role": "model", "parts": [{"text": diagnosis_text}]},
+            "finishReason": last.get("finishReason"),
+        }
+        if diagnosis_data["finishReason"] in (None, "STOP"):
+            response_cache.store(contents, diagnosis_data, first_turn_prompt)
+        await _finish_turn(session_id, user, req, diagnosis_data)
+        yield _sse(
+            {"diagnosis_text": diagnosis_text or "No diagnosis returned", "record_id": session_id},
+            event="done",
+        )
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
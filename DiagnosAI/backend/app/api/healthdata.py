@@ -1,26 +1,61 @@
 # backend/app/api/healthdata.py
 
-from fastapi import APIRouter, HTTPException
+import datetime
+from fastapi import APIRouter, Depends, Request
+from pydantic import BaseModel
 from app.services.cdc_client import HealthAPIClient
+from app.core import config
+from app.core.cache import SharedCache, all_cache_stats, get_serializer, register_cache
 from app.core.dependencies import redis_client
-import json
+from app.core.security import get_current_user
+from app.services.static_datasets import StaticDataset
 from pathlib import Path
 
 router = APIRouter()
 cdc_client = HealthAPIClient()
+health_cache = register_cache("health_info", SharedCache(
+    redis_client,
+    "health",
+    ttl=config.HEALTH_INFO_CACHE_TTL,
+    stale_ttl=config.HEALTH_INFO_STALE_TTL,
+    serializer=get_serializer(config.CACHE_SERIALIZER),
+))
+
 
 @router.get("/health-info/{query}")
 async def get_health_info(query: str):
-    cache_key = f"health:{query}"
-    cached = redis_client.get(cache_key)
-    if cached:
-        return {"source": "cache", "data": cached.decode("utf-8")}
-    result = await cdc_client.fetch_cdc_data(query)
-    redis_client.setex(cache_key, 3600, str(result))  # Cache for 1 hr
-    return {"source": "CDC_API", "data": result}
+    normalized = " ".join(query.lower().split())
+    data, source = await health_cache.get_or_load(normalized, lambda: cdc_client.fetch_cdc_data(query))
+    return {"source": "CDC_API" if source == "origin" else "cache", "data": data}
+
+
+@router.get("/cache/stats")
+async def get_cache_stats(user=Depends(get_current_user)):
+    # Not public: hit patterns of the response and principal caches leak usage.
+    return all_cache_stats()
+
+
+class CovidRecord(BaseModel):
+    date: datetime.date
+    state: str
+    cases: int
+    deaths: int
+
+
+def validate_covid_data(data):
+    if not isinstance(data, list):
+        raise ValueError("expected a list of records")
+    for row in data:
+        CovidRecord(**row)
+
+
+covid_dataset = StaticDataset(
+    str(Path(__file__).parent.parent / "mock_data" / "mock_covid_data.json"),
+    validate=validate_covid_data,
+)
+
+
 @router.get("/covid-data")
-async def get_mock_covid_data():
-    mock_file = Path(__file__).parent.parent / "mock_data" / "mock_covid_data.json"
-    with open(mock_file, "r") as f:
-        data = json.load(f)
-    return data
\ No newline at end of file
+async def get_mock_covid_data(request: Request):
+    # Served from memory, pre-compressed; polling clients get 304s via If-None-Match.
+    return covid_dataset.response(request)
@@ -0,0 +1,139 @@
+import base64
+import json
+from datetime import datetime
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from pydantic import BaseModel
+
+from app.core.security import get_current_user
+from app.db.crud import list_diagnoses, list_messages, list_sessions
+from app.db.write_behind import SpilledRowsError, write_behind
+
+router = APIRouter()
+
+# Listings are newest first. ``next_cursor`` is opaque to clients: pass it
+# back as ``cursor`` for the next (older) page; it is null on the last page.
+
+
+def encode_cursor(*values) -> str:
+    raw = json.dumps([v.isoformat() if isinstance(v, datetime) else v for v in values])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int) -> list:
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except ValueError:
+        values = None
+    if not isinstance(values, list) or len(values) != size:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return values
+
+
+def _before_id(cursor: Optional[str]):
+    if not cursor:
+        return None
+    before_id = decode_cursor(cursor, 1)[0]
+    if not isinstance(before_id, int):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return before_id
+
+
+def _page(rows, limit: int, cursor_of):
+    """Trim the extra look-ahead row and derive the next cursor from the last item."""
+    items = rows[:limit]
+    next_cursor = encode_cursor(*cursor_of(items[-1])) if len(rows) > limit else None
+    return items, next_cursor
+
+
+class SessionOut(BaseModel):
+    id: int
+    created_at: Optional[datetime] = None
+
+class SessionPage(BaseModel):
+    items: List[SessionOut]
+    next_cursor: Optional[str] = None
+
+class MessageOut(BaseModel):
+    id: int
+    role: str
+    text: str
+    created_at: Optional[datetime] = None
+
+class MessagePage(BaseModel):
+    items: List[MessageOut]
+    next_cursor: Optional[str] = None
+
+class DiagnosisOut(BaseModel):
+    id: int
+    prompt: str
+    diagnosis_text: str
+    created_at: Optional[datetime] = None
+
+class DiagnosisPage(BaseModel):
+    items: List[DiagnosisOut]
+    next_cursor: Optional[str] = None
+
+
+@router.get("/sessions", response_model=SessionPage)
+async def get_sessions(
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    user=Depends(get_current_user),
+):
+    before_id = _before_id(cursor)
+    rows = await list_sessions(user.id, limit, before_id)
+    items, next_cursor = _page(rows, limit, lambda s: (s.id,))
+    return {"items": [{"id": s.id, "created_at": s.created_at} for s in items], "next_cursor": next_cursor}
+
+
+@router.get("/sessions/{session_id}/messages", response_model=MessagePage)
+async def get_messages(
+    session_id: int,
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None,
+    user=Depends(get_current_user),
+):
+    before = None
+    if cursor:
+        created_at, message_id = decode_cursor(cursor, 2)
+        try:
+            before = (datetime.fromisoformat(created_at), int(message_id))
+        except (TypeError, ValueError):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+    # Just-flushed rows may not have reached the replica yet.
+    try:
+        flushed = await write_behind.wait_for_session(session_id)
+    except SpilledRowsError:
+        raise HTTPException(status_code=503, detail="Conversation history is temporarily unavailable")
+    rows = await list_messages(session_id, user.id, limit, before, primary=flushed)
+    if rows is None:
+        raise HTTPException(status_code=404, detail="Session not found")
+    items, next_cursor = _page(rows, limit, lambda m: (m.created_at, m.id))
+    return {
+        "items": [
+            {"id": m.id, "role": m.role, "text": m.content, "created_at": m.created_at}
+            for m in items
+        ],
+        "next_cursor": next_cursor,
+    }
+
+
+@router.get("/diagnoses", response_model=DiagnosisPage)
+async def get_diagnoses(
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    user=Depends(get_current_user),
+):
+    before_id = _before_id(cursor)
+    flushed = await write_behind.wait_for_user(user.id)
+    rows = await list_diagnoses(user.id, limit, before_id, primary=flushed)
+    items, next_cursor = _page(rows, limit, lambda d: (d.id,))
+    return {
+        "items": [
+            {"id": d.id, "prompt": d.prompt, "diagnosis_text": d.text, "created_at": d.created_at}
+            for d in items
+        ],
+        "next_cursor": next_cursor,
+    }
@@ -1,14 +1,142 @@
-from fastapi import APIRouter, UploadFile, File, Depends, HTTPException
-from app.core.dependencies import get_db
+import re
+from urllib.parse import quote
+from fastapi import APIRouter, UploadFile, File, Depends, HTTPException, Request, status
+from fastapi.responses import Response, StreamingResponse
+from fastapi.routing import APIRoute
+from app.core import config
+from app.core.security import get_current_user
 from app.db import crud
+from app.services.blob_store import BlobTooLargeError, get_blob_store
+
+blob_store = get_blob_store()
+
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+# Room for the multipart boundaries and part headers around the file itself.
+_MULTIPART_OVERHEAD = 64 * 1024
+
+
+def _too_large() -> HTTPException:
+    return HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail="File too large")
+
+
+class _UploadLimitRoute(APIRoute):
+    """Enforces ``UPLOAD_MAX_BYTES`` while the request body is received.
+
+    Starlette spools the whole multipart body before the endpoint runs, so a
+    check in the endpoint only fires after an oversized upload has been
+    read. This rejects on ``Content-Length`` up front, and stops a body
+    without one (chunked) as soon as it passes the limit.
+    """
+
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+
+        async def limited_handler(request: Request):
+            limit = config.UPLOAD_MAX_BYTES + _MULTIPART_OVERHEAD
+            length = request.headers.get("content-length")
+            if length and length.isdigit() and int(length) > limit:
+                raise _too_large()
+            receive = request.receive
+            received = 0
+
+            async def limited_receive():
+                nonlocal received
+                message = await receive()
+                received += len(message.get("body", b""))
+                if received > limit:
+                    raise _too_large()
+                return message
+
+            return await handler(Request(request.scope, limited_receive))
+
+        return limited_handler
+
+
+router = APIRouter(route_class=_UploadLimitRoute)
+
+
+async def _upload_chunks(file: UploadFile):
+    while True:
+        chunk = await file.read(config.UPLOAD_CHUNK_SIZE)
+        if not chunk:
+            return
+        yield chunk
+
+
+def _parse_range(header: str, size: int):
+    """Single ``bytes=`` range -> inclusive ``(start, end)``; None if unsatisfiable."""
+    match = _RANGE_RE.match(header.strip())
+    if not match or match.groups() == ("", ""):
+        return None
+    first, last = match.groups()
+    if first == "":
+        # Suffix range: the final N bytes.
+        length = int(last)
+        if length == 0:
+            return None
+        return max(0, size - length), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or end < start:
+        return None
+    return start, end
 
-router = APIRouter()
 
 @router.post("/upload")
-async def upload_health_record(file: UploadFile = File(...), db=Depends(get_db)):
+async def upload_health_record(file: UploadFile = File(...), user=Depends(get_current_user)):
     if file.content_type not in ("application/pdf", "image/jpeg", "image/png"):
         raise HTTPException(status_code=400, detail="Invalid file type")
-    contents = await file.read()
-    # Save file contents securely in DB or cloud storage (not shown)
-    record = await crud.create_health_record(db, file.filename, contents)
-    return {"filename": file.filename, "id": record.id}
+    # Streamed to the content-addressed store a chunk at a time; only the
+    # metadata and digest go into the database.
+    try:
+        digest, size, deduplicated = await blob_store.put_stream(
+            _upload_chunks(file), max_bytes=config.UPLOAD_MAX_BYTES
+        )
+    except BlobTooLargeError:
+        raise _too_large()
+    # If this insert fails the blob is left for sweep_orphans: deleting it here
+    # could pull it from under a concurrent upload of the same file.
+    record = await crud.create_health_record(user.id, file.filename, file.content_type, digest, size)
+    return {"filename": file.filename, "id": record.id, "size": size, "digest": digest, "deduplicated": deduplicated}
+
+
+@router.get("/{record_id}/download")
+async def download_health_record(record_id: int, request: Request, user=Depends(get_current_user)):
+    record = await crud.get_health_record(record_id)
+    if not record or record.user_id != user.id:
+        raise HTTPException(status_code=404, detail="Record not found")
+
+    etag = f'"{record.digest}"'
+    headers = {
+        "Accept-Ranges": "bytes",
+        "ETag": etag,
+        "Content-Disposition": f"attachment; filename*=UTF-8''{quote(record.filename)}",
+    }
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if range_header and (if_range is None or if_range == etag):
+        byte_range = _parse_range(range_header, record.size)
+        if byte_range is None:
+            return Response(
+                status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+                headers={"Content-Range": f"bytes */{record.size}"},
+            )
+        start, end = byte_range
+        headers["Content-Range"] = f"bytes {start}-{end}/{record.size}"
+        headers["Content-Length"] = str(end - start + 1)
+        return StreamingResponse(
+            blob_store.iter_range(record.digest, start, end),
+            status_code=status.HTTP_206_PARTIAL_CONTENT,
+            media_type=record.content_type,
+            headers=headers,
+        )
+
+    headers["Content-Length"] = str(record.size)
+    return StreamingResponse(
+        blob_store.iter_range(record.digest),
+        media_type=record.content_type,
+        headers=headers,
+    )
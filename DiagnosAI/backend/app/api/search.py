@@ -0,0 +1,22 @@
+import time
+
+from fastapi import APIRouter, Query
+
+from app.services.health_search import health_search
+
+router = APIRouter()
+
+
+@router.get("/health-search")
+async def search_health_info(
+    q: str = Query(..., min_length=1, description="Symptoms or disease name"),
+    limit: int = Query(10, ge=1, le=50),
+):
+    """BM25-ranked matches from the local ``health_info`` table; no upstream calls."""
+    started = time.perf_counter()
+    results = health_search.search(q, limit)
+    return {
+        "query": q,
+        "results": results,
+        "took_ms": round((time.perf_counter() - started) * 1000, 3),
+    }
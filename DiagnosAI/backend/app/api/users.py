@@ -1,15 +1,23 @@
-from fastapi import APIRouter, HTTPException, status, Depends
+from fastapi import APIRouter, HTTPException, Request, status
 from pydantic import BaseModel, EmailStr
-from passlib.context import CryptContext
-from app.db.crud import get_user_by_email, create_user
-from jose import jwt
-import os
+from app.core import config
+from app.core.passwords import PasswordHasherBusyError, hash_password, verify_password
+from app.core.rate_limit import RateLimitExceeded, RateLimiter
+from app.core.security import create_access_token
+from app.db.crud import get_user_by_email, create_user, update_user_password
 
 router = APIRouter()
 
-SECRET_KEY = os.getenv("JWT_SECRET_KEY", "yoursecretkey")
-ALGORITHM = "HS256"
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+def _redis_tier():
+    if not config.RATE_LIMIT_REDIS:
+        return None
+    from app.core.dependencies import redis_client
+    return redis_client
+
+
+account_limiter = RateLimiter(config.LOGIN_RATE_LIMIT, config.LOGIN_RATE_WINDOW, "account", redis=_redis_tier())
+ip_limiter = RateLimiter(config.LOGIN_IP_RATE_LIMIT, config.LOGIN_RATE_WINDOW, "ip", redis=_redis_tier())
 
 
 class UserCreate(BaseModel):
@@ -22,24 +30,53 @@ class TokenResponse(BaseModel):
     token_type: str = "bearer"
 
 
-def hash_password(password: str):
-    return pwd_context.hash(password)
+async def _throttle(request: Request, email: str = None):
+    try:
+        await ip_limiter.hit(request.client.host if request.client else "unknown")
+        if email is not None:
+            await account_limiter.hit(email.lower())
+    except RateLimitExceeded as e:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many attempts, try again later",
+            headers={"Retry-After": str(e.retry_after)},
+        )
+
+
+def _busy() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Server busy, try again shortly",
+        headers={"Retry-After": "1"},
+    )
 
 
 @router.post("/register", status_code=status.HTTP_201_CREATED)
-async def register_user(user: UserCreate):
+async def register_user(user: UserCreate, request: Request):
+    await _throttle(request)
     existing = await get_user_by_email(user.email)
     if existing:
         raise HTTPException(status_code=400, detail="Email already registered")
-    hashed = hash_password(user.password)
+    try:
+        hashed = await hash_password(user.password)
+    except PasswordHasherBusyError:
+        raise _busy()
     new_user = await create_user(user.email, hashed)
     return {"email": new_user.email}
 
 
 @router.post("/token", response_model=TokenResponse)
-async def login(user: UserCreate):
+async def login(user: UserCreate, request: Request):
+    await _throttle(request, user.email)
     db_user = await get_user_by_email(user.email)
-    if not db_user or not pwd_context.verify(user.password, db_user.hashed_password):
+    if not db_user:
+        raise HTTPException(status_code=400, detail="Incorrect email or password")
+    try:
+        valid, new_hash = await verify_password(user.password, db_user.hashed_password)
+    except PasswordHasherBusyError:
+        raise _busy()
+    if not valid:
         raise HTTPException(status_code=400, detail="Incorrect email or password")
-    token = jwt.encode({"sub": db_user.email}, SECRET_KEY, algorithm=ALGORITHM)
-    return {"access_token": token}
+    if new_hash:
+        await update_user_password(db_user.id, new_hash)
+    return {"access_token": create_access_token(db_user)}
@@ -0,0 +1,67 @@
+import asyncio
+import os
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Query
+
+from app.core.cache import TTLCache
+from app.services.who_snapshots import WHOSnapshotStore
+
+router = APIRouter()
+store = WHOSnapshotStore()
+# (country, file mtime) -> rows, so a refresh on disk is picked up automatically.
+_rows_cache = TTLCache(maxsize=64)
+
+
+def _indicator_view(row: dict, names: dict) -> dict:
+    return {
+        "indicator_code": row.get("IndicatorCode"),
+        "indicator_name": names.get(row.get("IndicatorCode")),
+        "year": row.get("TimeDim"),
+        "value": row.get("Value"),
+        "numeric_value": row.get("NumericValue"),
+        "low": row.get("Low"),
+        "high": row.get("High"),
+        "dim1": row.get("Dim1"),
+    }
+
+
+async def _country_rows(country_code: str):
+    path = store.rows_path(country_code)
+    try:
+        mtime = os.path.getmtime(path)
+    except FileNotFoundError:
+        return None
+    key = (country_code, mtime)
+    rows = _rows_cache.get(key)
+    if rows is None:
+        rows = await asyncio.to_thread(store.load, country_code)
+        _rows_cache.set(key, rows)
+    return rows
+
+
+@router.get("/who/countries")
+async def list_who_countries():
+    return store.read_countries()
+
+
+@router.get("/who/countries/{country_code}/indicators")
+async def get_who_indicators(
+    country_code: str,
+    indicator: Optional[str] = Query(None, description="GHO indicator code"),
+    year: Optional[int] = Query(None, description="Only rows for this year"),
+):
+    country_code = country_code.upper()
+    rows = await _country_rows(country_code)
+    if rows is None:
+        raise HTTPException(status_code=404, detail="No WHO snapshot for this country")
+    if indicator:
+        rows = [row for row in rows if row.get("IndicatorCode") == indicator]
+    if year is not None:
+        rows = [row for row in rows if row.get("TimeDim") == year]
+    names = store.read_indicator_names()
+    return {
+        "country": country_code,
+        "refreshed_at": store.manifest().get(country_code, {}).get("refreshed_at"),
+        "indicators": [_indicator_view(row, names) for row in rows],
+    }
@@ -0,0 +1,245 @@
+import asyncio
+import json
+import logging
+import random
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger("cache")
+
+_MISSING = object()
+
+
+class TTLCache:
+    """In-process LRU cache with an optional per-entry time-to-live.
+
+    Meant to be used from the event loop only; it does no locking.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        entry = self._data.get(key, _MISSING)
+        if entry is not _MISSING:
+            expires_at, value = entry
+            if expires_at is None or expires_at > time.monotonic():
+                self._data.move_to_end(key)
+                self.hits += 1
+                return value
+            del self._data[key]
+        self.misses += 1
+        return default
+
+    def set(self, key, value, ttl: float = None):
+        if self.maxsize <= 0:
+            return
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.monotonic() + ttl if ttl else None
+        self._data[key] = (expires_at, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def delete(self, key):
+        self._data.pop(key, None)
+
+    def items(self):
+        """Unexpired ``(key, value)`` pairs, without touching LRU order or stats."""
+        now = time.monotonic()
+        return [(key, value) for key, (expires_at, value) in self._data.items() if expires_at is None or expires_at > now]
+
+    def clear(self):
+        self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        entry = self._data.get(key, _MISSING)
+        return entry is not _MISSING and (entry[0] is None or entry[0] > time.monotonic())
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
+
+
+# ---------------------------------------------------------------------------
+# Shared (Redis) cache with single-flight loading and stale-while-revalidate
+# ---------------------------------------------------------------------------
+_registry = {}
+
+
+def register_cache(name: str, cache):
+    """Make a cache's ``stats()`` visible through ``all_cache_stats()``."""
+    _registry[name] = cache
+    return cache
+
+
+def all_cache_stats() -> dict:
+    return {name: cache.stats() for name, cache in _registry.items()}
+
+
+class JSONSerializer:
+    """orjson when installed (several times faster), stdlib json otherwise."""
+
+    def __init__(self):
+        try:
+            import orjson
+        except ImportError:
+            orjson = None
+        self._orjson = orjson
+
+    def dumps(self, value) -> bytes:
+        if self._orjson is not None:
+            return self._orjson.dumps(value)
+        return json.dumps(value, separators=(",", ":")).encode("utf-8")
+
+    def loads(self, data: bytes):
+        if self._orjson is not None:
+            return self._orjson.loads(data)
+        return json.loads(data)
+
+
+class MsgpackSerializer:
+    def __init__(self):
+        import msgpack
+        self._msgpack = msgpack
+
+    def dumps(self, value) -> bytes:
+        return self._msgpack.packb(value, use_bin_type=True)
+
+    def loads(self, data: bytes):
+        return self._msgpack.unpackb(data, raw=False)
+
+
+def get_serializer(name: str = "json"):
+    return MsgpackSerializer() if name == "msgpack" else JSONSerializer()
+
+
+class SharedCache:
+    """Read-through Redis cache for expensive upstream lookups.
+
+    - Identical concurrent misses in this process share one upstream call.
+    - Entries stay servable for ``stale_ttl`` seconds past their freshness;
+      a stale hit is answered immediately while one background load refreshes it.
+    - TTLs get random jitter so keys written together don't expire together.
+    - Redis errors degrade to calling the loader directly.
+    """
+
+    def __init__(self, redis, namespace: str, ttl: int, stale_ttl: int = 0, jitter: float = 0.1, serializer=None):
+        self.redis = redis
+        self.namespace = namespace
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.jitter = jitter
+        self.serializer = serializer or JSONSerializer()
+        self._inflight = {}
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.errors = 0
+        self.load_seconds = 0.0
+
+    def _key(self, key: str) -> str:
+        return f"{self.namespace}:{key}"
+
+    def _jittered(self, seconds: float) -> float:
+        return seconds * (1 + random.uniform(-self.jitter, self.jitter))
+
+    async def _read(self, key: str):
+        try:
+            data = await self.redis.get(self._key(key))
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Cache read failed for {self._key(key)}: {e}")
+            return None
+        if data is None:
+            return None
+        try:
+            return self.serializer.loads(data)
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Discarding undecodable cache entry {self._key(key)}: {e}")
+            return None
+
+    async def _write(self, key: str, value):
+        fresh_for = self._jittered(self.ttl)
+        envelope = {"value": value, "fresh_until": time.time() + fresh_for}
+        try:
+            await self.redis.set(
+                self._key(key),
+                self.serializer.dumps(envelope),
+                ex=max(1, int(fresh_for + self.stale_ttl)),
+            )
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Cache write failed for {self._key(key)}: {e}")
+
+    async def _load(self, key: str, loader):
+        started = time.monotonic()
+        try:
+            value = await loader()
+        finally:
+            self.load_seconds += time.monotonic() - started
+        await self._write(key, value)
+        return value
+
+    def _load_once(self, key: str, loader) -> asyncio.Future:
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+            return task
+        task = asyncio.ensure_future(self._load(key, loader))
+        self._inflight[key] = task
+        task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return task
+
+    async def get_or_load(self, key: str, loader):
+        """Return ``(value, source)`` where source is ``cache``, ``stale`` or ``origin``.
+
+        ``loader`` is a zero-argument coroutine function fetching the value upstream.
+        """
+        envelope = await self._read(key)
+        if envelope is not None:
+            if envelope["fresh_until"] > time.time():
+                self.hits += 1
+                return envelope["value"], "cache"
+            self.stale_hits += 1
+            refresh = self._load_once(key, loader)
+            # A failed background refresh just leaves the stale copy in place.
+            refresh.add_done_callback(lambda t: t.cancelled() or t.exception())
+            return envelope["value"], "stale"
+        self.misses += 1
+        # shield: one cancelled caller must not cancel the load the others await.
+        return await asyncio.shield(self._load_once(key, loader)), "origin"
+
+    async def invalidate(self, key: str):
+        try:
+            await self.redis.delete(self._key(key))
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Cache invalidation failed for {self._key(key)}: {e}")
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.stale_hits + self.misses
+        return {
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "errors": self.errors,
+            "hit_ratio": (self.hits + self.stale_hits) / lookups if lookups else 0.0,
+            "load_seconds": round(self.load_seconds, 3),
+        }
@@ -7,3 +7,133 @@ DATABASE_URL = os.getenv("DATABASE_URL")
 JWT_SECRET_KEY = os.getenv("JWT_SECRET_KEY")
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 GEMINI_API_URL = os.getenv("GEMINI_API_URL")
+
+# Pneumonia inference backend: keras, tflite or onnx
+PNEUMONIA_BACKEND = os.getenv("PNEUMONIA_BACKEND", "keras")
+PNEUMONIA_MODEL_PATH = os.getenv("PNEUMONIA_MODEL_PATH")
+
+# Pneumonia inference batching
+PNEUMONIA_MAX_BATCH_SIZE = int(os.getenv("PNEUMONIA_MAX_BATCH_SIZE", "16"))
+PNEUMONIA_MAX_WAIT_MS = float(os.getenv("PNEUMONIA_MAX_WAIT_MS", "5"))
+
+# Pneumonia prediction cache
+PNEUMONIA_MODEL_VERSION = os.getenv("PNEUMONIA_MODEL_VERSION")
+PNEUMONIA_CACHE_SIZE = int(os.getenv("PNEUMONIA_CACHE_SIZE", "4096"))
+PNEUMONIA_CACHE_TTL = int(os.getenv("PNEUMONIA_CACHE_TTL", "86400"))
+PNEUMONIA_CACHE_REDIS = os.getenv("PNEUMONIA_CACHE_REDIS", "false").lower() in ("1", "true", "yes")
+
+# Startup behaviour
+PNEUMONIA_ENABLED = os.getenv("PNEUMONIA_ENABLED", "true").lower() in ("1", "true", "yes")
+PNEUMONIA_PRELOAD = os.getenv("PNEUMONIA_PRELOAD", "false").lower() in ("1", "true", "yes")
+
+# Gemini HTTP client
+GEMINI_HTTP2 = os.getenv("GEMINI_HTTP2", "true").lower() in ("1", "true", "yes")
+GEMINI_TIMEOUT = float(os.getenv("GEMINI_TIMEOUT", "10"))
+GEMINI_MAX_CONNECTIONS = int(os.getenv("GEMINI_MAX_CONNECTIONS", "50"))
+GEMINI_MAX_CONCURRENCY = int(os.getenv("GEMINI_MAX_CONCURRENCY", "32"))
+GEMINI_MAX_BACKOFF = float(os.getenv("GEMINI_MAX_BACKOFF", "8"))
+GEMINI_BREAKER_THRESHOLD = int(os.getenv("GEMINI_BREAKER_THRESHOLD", "5"))
+GEMINI_BREAKER_RESET = float(os.getenv("GEMINI_BREAKER_RESET", "30"))
+
+# Conversation history sent to Gemini
+HISTORY_TOKEN_BUDGET = int(os.getenv("HISTORY_TOKEN_BUDGET", "3000"))
+HISTORY_MAX_MESSAGES = int(os.getenv("HISTORY_MAX_MESSAGES", "50"))
+HISTORY_SUMMARY = os.getenv("HISTORY_SUMMARY", "extractive")  # extractive, llm or off
+HISTORY_SUMMARY_TOKENS = int(os.getenv("HISTORY_SUMMARY_TOKENS", "400"))
+
+# Auth tokens and verified-principal cache
+ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "60"))
+AUTH_CACHE_SIZE = int(os.getenv("AUTH_CACHE_SIZE", "10000"))
+AUTH_CACHE_TTL = int(os.getenv("AUTH_CACHE_TTL", "60"))
+AUTH_CACHE_REDIS = os.getenv("AUTH_CACHE_REDIS", "false").lower() in ("1", "true", "yes")
+
+# Password hashing and login throttling
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+PASSWORD_HASH_QUEUE = int(os.getenv("PASSWORD_HASH_QUEUE", "64"))
+LOGIN_RATE_LIMIT = int(os.getenv("LOGIN_RATE_LIMIT", "10"))  # attempts per account per window
+LOGIN_IP_RATE_LIMIT = int(os.getenv("LOGIN_IP_RATE_LIMIT", "50"))  # attempts per client IP per window
+LOGIN_RATE_WINDOW = int(os.getenv("LOGIN_RATE_WINDOW", "60"))
+RATE_LIMIT_REDIS = os.getenv("RATE_LIMIT_REDIS", "false").lower() in ("1", "true", "yes")
+
+# WHO Global Health Observatory snapshots
+WHO_GHO_API_URL = os.getenv("WHO_GHO_API_URL", "https://ghoapi.azureedge.net/api")
+WHO_SNAPSHOT_DIR = os.getenv(
+    "WHO_SNAPSHOT_DIR", os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "data", "who")
+)
+WHO_SNAPSHOT_FORMAT = os.getenv("WHO_SNAPSHOT_FORMAT", "jsonl")  # jsonl (gzip) or parquet
+WHO_INDICATORS = [
+    code.strip()
+    for code in os.getenv("WHO_INDICATORS", "WHOSIS_000001,MDG_0000000001,NCD_BMI_30A").split(",")
+    if code.strip()
+]
+WHO_CONCURRENCY = int(os.getenv("WHO_CONCURRENCY", "4"))
+WHO_PAGE_SIZE = int(os.getenv("WHO_PAGE_SIZE", "1000"))
+
+# Shared Redis cache
+CACHE_SERIALIZER = os.getenv("CACHE_SERIALIZER", "json")  # json (orjson if installed) or msgpack
+HEALTH_INFO_CACHE_TTL = int(os.getenv("HEALTH_INFO_CACHE_TTL", "3600"))
+HEALTH_INFO_STALE_TTL = int(os.getenv("HEALTH_INFO_STALE_TTL", "86400"))
+CDC_API_URL = os.getenv("CDC_API_URL", "https://api.us.socrata.com/api/catalog/v1")
+
+# Health record blob storage
+BLOB_STORE = os.getenv("BLOB_STORE", "local")  # local or s3
+BLOB_STORE_DIR = os.getenv(
+    "BLOB_STORE_DIR", os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "data", "blobs")
+)
+BLOB_S3_BUCKET = os.getenv("BLOB_S3_BUCKET")
+BLOB_S3_PREFIX = os.getenv("BLOB_S3_PREFIX", "health-records/")
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(1024 * 1024)))
+UPLOAD_MAX_BYTES = int(os.getenv("UPLOAD_MAX_BYTES", str(100 * 1024 * 1024)))
+BLOB_GC_MIN_AGE = int(os.getenv("BLOB_GC_MIN_AGE", "3600"))  # seconds before an unreferenced blob is swept
+
+# Pneumonia batch endpoint
+PNEUMONIA_BATCH_MAX_FILES = int(os.getenv("PNEUMONIA_BATCH_MAX_FILES", "500"))
+PNEUMONIA_BATCH_MAX_FILE_BYTES = int(os.getenv("PNEUMONIA_BATCH_MAX_FILE_BYTES", str(20 * 1024 * 1024)))
+PNEUMONIA_DECODE_CONCURRENCY = int(os.getenv("PNEUMONIA_DECODE_CONCURRENCY", "8"))
+
+# Logging and database diagnostics
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text")  # text or json
+LOG_SAMPLE_RATE = float(os.getenv("LOG_SAMPLE_RATE", "1.0"))  # fraction of DEBUG/INFO records kept
+DB_ECHO = os.getenv("DB_ECHO", "false").lower() in ("1", "true", "yes")
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+
+# Database connection pool
+DATABASE_READ_URL = os.getenv("DATABASE_READ_URL")  # optional read replica
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "5"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "100"))
+
+# Gemini response cache
+GEMINI_MODEL_VERSION = os.getenv("GEMINI_MODEL_VERSION")  # default: model name from GEMINI_API_URL
+GEMINI_CACHE_SIZE = int(os.getenv("GEMINI_CACHE_SIZE", "2048"))  # 0 disables the cache
+GEMINI_CACHE_TTL = int(os.getenv("GEMINI_CACHE_TTL", "3600"))
+GEMINI_CACHE_NEAR_DUP = os.getenv("GEMINI_CACHE_NEAR_DUP", "false").lower() in ("1", "true", "yes")
+GEMINI_CACHE_NEAR_THRESHOLD = float(os.getenv("GEMINI_CACHE_NEAR_THRESHOLD", "0.85"))
+
+# Local health_info search and diagnosis grounding
+HEALTH_SEARCH_REFRESH = int(os.getenv("HEALTH_SEARCH_REFRESH", "300"))  # seconds between full reloads; 0 disables
+DIAGNOSIS_GROUNDING = os.getenv("DIAGNOSIS_GROUNDING", "false").lower() in ("1", "true", "yes")
+DIAGNOSIS_GROUNDING_DOCS = int(os.getenv("DIAGNOSIS_GROUNDING_DOCS", "3"))
+
+# Write-behind queue for chat replies and diagnosis records
+WRITE_BEHIND = os.getenv("WRITE_BEHIND", "true").lower() in ("1", "true", "yes")
+WRITE_BEHIND_BATCH_SIZE = int(os.getenv("WRITE_BEHIND_BATCH_SIZE", "500"))
+WRITE_BEHIND_INTERVAL_MS = float(os.getenv("WRITE_BEHIND_INTERVAL_MS", "50"))
+WRITE_BEHIND_MAX_PENDING = int(os.getenv("WRITE_BEHIND_MAX_PENDING", "10000"))
+WRITE_BEHIND_SPILL_PATH = os.getenv(
+    "WRITE_BEHIND_SPILL_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "data", "write_behind.jsonl"),
+)
+
+# Static JSON datasets (/covid-data)
+STATIC_DATASET_CHECK_INTERVAL = float(os.getenv("STATIC_DATASET_CHECK_INTERVAL", "2"))  # seconds between mtime checks
+STATIC_DATASET_MAX_AGE = int(os.getenv("STATIC_DATASET_MAX_AGE", "60"))  # Cache-Control max-age
+
+# Storage of model replies
+REPLY_CANDIDATE_STORAGE = os.getenv("REPLY_CANDIDATE_STORAGE", "none")  # none, metadata (no text) or full
+TEXT_COMPRESS_MIN_BYTES = int(os.getenv("TEXT_COMPRESS_MIN_BYTES", "256"))  # -1 never compresses
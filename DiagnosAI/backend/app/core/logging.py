@@ -1,9 +1,100 @@
 # backend/app/core/logging.py
 
+import atexit
+import json
 import logging
+import logging.handlers
+import queue
+import random
+import time
 
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s %(levelname)s %(message)s",
-    handlers=[logging.StreamHandler()]
-)
+from app.core import config
+
+_listener = None
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per line; ``extra=`` fields are included as keys."""
+
+    _reserved = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+    def format(self, record):
+        entry = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created)) + f".{int(record.msecs):03d}Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in self._reserved and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """Keep a ``rate`` fraction of records below WARNING; warnings and errors always pass."""
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record):
+        return record.levelno >= logging.WARNING or self.rate >= 1 or random.random() < self.rate
+
+
+def setup_logging(level: str = None, fmt: str = None, sample_rate: float = None):
+    """Route all logging through a queue so request handlers never block on I/O.
+
+    Records are enqueued by a ``QueueHandler`` on the root logger and written
+    by a ``QueueListener`` thread. Safe to call more than once.
+    """
+    global _listener
+    level = level or config.LOG_LEVEL
+    fmt = fmt or config.LOG_FORMAT
+    sample_rate = config.LOG_SAMPLE_RATE if sample_rate is None else sample_rate
+
+    stream = logging.StreamHandler()
+    if fmt == "json":
+        stream.setFormatter(JSONFormatter())
+    else:
+        stream.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s %(message)s"))
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    queue_handler.addFilter(SamplingFilter(sample_rate))
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(level.upper())
+
+    if _listener is not None:
+        _listener.stop()
+    _listener = logging.handlers.QueueListener(log_queue, stream, respect_handler_level=True)
+    _listener.start()
+
+
+def shutdown_logging():
+    """Flush queued records; called on app shutdown and at interpreter exit.
+
+    The output handlers are moved back onto the root logger, so records
+    logged afterwards are written directly instead of queued and lost.
+    """
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        root = logging.getLogger()
+        for handler in list(root.handlers):
+            if isinstance(handler, logging.handlers.QueueHandler):
+                root.removeHandler(handler)
+                for output in _listener.handlers:
+                    for log_filter in handler.filters:
+                        output.addFilter(log_filter)
+                    root.addHandler(output)
+        _listener = None
+
+
+atexit.register(shutdown_logging)
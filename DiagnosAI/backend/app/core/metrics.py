@@ -0,0 +1,163 @@
+import time
+from contextvars import ContextVar
+
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, Counter, Histogram, generate_latest
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+from app.core.cache import all_cache_stats
+
+HTTP_REQUESTS = Counter(
+    "http_requests_total", "HTTP requests handled", ["method", "route", "status"]
+)
+HTTP_LATENCY = Histogram(
+    "http_request_duration_seconds", "Time from request start to the last response byte", ["method", "route"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+DB_QUERIES = Counter("db_queries_total", "SQL statements executed")
+DB_QUERY_LATENCY = Histogram(
+    "db_query_duration_seconds", "SQL statement execution time",
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1),
+)
+DB_QUERIES_PER_REQUEST = Histogram(
+    "db_queries_per_request", "SQL statements executed per HTTP request", ["route"],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 50),
+)
+DB_TIME_PER_REQUEST = Histogram(
+    "db_time_per_request_seconds", "Total SQL time per HTTP request", ["route"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1),
+)
+GEMINI_LATENCY = Histogram(
+    "gemini_request_duration_seconds", "Gemini API call latency per attempt", ["operation", "outcome"],
+    buckets=(0.1, 0.25, 0.5, 1, 2, 4, 8, 15, 30, 60),
+)
+GEMINI_RETRIES = Counter("gemini_retries_total", "Gemini calls retried after a failure")
+GEMINI_REJECTED = Counter("gemini_circuit_rejections_total", "Gemini calls refused by the open circuit breaker")
+MODEL_INFERENCE_LATENCY = Histogram(
+    "pneumonia_inference_duration_seconds", "Pneumonia model time per batch",
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+)
+MODEL_BATCH_SIZE = Histogram(
+    "pneumonia_batch_size", "Images per pneumonia model call", buckets=(1, 2, 4, 8, 16, 32, 64),
+)
+PREPROCESS_LATENCY = Histogram(
+    "pneumonia_preprocess_duration_seconds", "X-ray decode and resize time per image",
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25),
+)
+WRITE_BEHIND_ROWS = Counter("write_behind_rows_total", "Rows written by the write-behind queue")
+WRITE_BEHIND_FLUSH_LATENCY = Histogram(
+    "write_behind_flush_duration_seconds", "Time to write one write-behind batch",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1, 5),
+)
+WRITE_BEHIND_SPILLED = Counter("write_behind_spilled_rows_total", "Rows spilled to disk after failed flushes")
+
+# [statement count, seconds] for the HTTP request being handled, if any.
+_request_db = ContextVar("request_db", default=None)
+
+
+class CacheStatsCollector:
+    """Exposes every cache registered with ``app.core.cache.register_cache``."""
+
+    def collect(self):
+        hits = CounterMetricFamily("cache_hits", "Cache lookups that were served from cache", labels=["cache"])
+        misses = CounterMetricFamily("cache_misses", "Cache lookups that fell through", labels=["cache"])
+        ratio = GaugeMetricFamily("cache_hit_ratio", "Hits / lookups since start", labels=["cache"])
+        for name, stats in all_cache_stats().items():
+            if "hits" not in stats:
+                # Tiered caches report per tier; use the in-process tier.
+                stats = stats.get("local") or {}
+            if "hits" not in stats:
+                continue
+            hits.add_metric([name], stats["hits"] + stats.get("stale_hits", 0))
+            misses.add_metric([name], stats["misses"])
+            ratio.add_metric([name], stats.get("hit_ratio", 0.0))
+        yield hits
+        yield misses
+        yield ratio
+
+
+REGISTRY.register(CacheStatsCollector())
+
+_engines = {}
+
+
+class PoolCollector:
+    """Connections checked out of / idle in each instrumented engine's pool."""
+
+    def collect(self):
+        in_use = GaugeMetricFamily("db_pool_checked_out", "Connections currently in use", labels=["engine"])
+        idle = GaugeMetricFamily("db_pool_idle", "Idle connections held by the pool", labels=["engine"])
+        for name, engine in list(_engines.items()):
+            pool = engine.sync_engine.pool
+            if hasattr(pool, "checkedout"):
+                in_use.add_metric([name], pool.checkedout())
+                idle.add_metric([name], pool.checkedin())
+        yield in_use
+        yield idle
+
+
+REGISTRY.register(PoolCollector())
+
+
+def instrument_engine(engine, name: str = "primary"):
+    """Count and time every statement run through an async SQLAlchemy engine."""
+    from sqlalchemy import event
+
+    _engines[name] = engine
+    sync_engine = engine.sync_engine
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        context._query_started = time.perf_counter()
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - context._query_started
+        DB_QUERIES.inc()
+        DB_QUERY_LATENCY.observe(elapsed)
+        stats = _request_db.get()
+        if stats is not None:
+            stats[0] += 1
+            stats[1] += elapsed
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware recording per-route latency, status and DB usage.
+
+    Latency runs until the final body chunk, so streamed responses are timed
+    in full. Routes are labelled by their path template, not the raw URL.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        db_stats = [0, 0.0]
+        token = _request_db.set(db_stats)
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _request_db.reset(token)
+            route = scope.get("route")
+            label = getattr(route, "path", None) or "unmatched"
+            method = scope.get("method", "")
+            HTTP_REQUESTS.labels(method, label, str(status_code)).inc()
+            HTTP_LATENCY.labels(method, label).observe(time.perf_counter() - started)
+            DB_QUERIES_PER_REQUEST.labels(label).observe(db_stats[0])
+            DB_TIME_PER_REQUEST.labels(label).observe(db_stats[1])
+
+
+def render_metrics():
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
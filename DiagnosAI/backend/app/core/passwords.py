@@ -0,0 +1,48 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from passlib.context import CryptContext
+
+from app.core import config
+
+# min_rounds makes hashes below the configured cost "need update", so they
+# are re-hashed transparently on the user's next successful login.
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=config.BCRYPT_ROUNDS,
+    bcrypt__min_rounds=config.BCRYPT_ROUNDS,
+)
+
+_executor = ThreadPoolExecutor(max_workers=config.PASSWORD_HASH_WORKERS, thread_name_prefix="bcrypt")
+_pending = 0
+
+
+class PasswordHasherBusyError(Exception):
+    """Raised instead of queueing when too much bcrypt work is already waiting."""
+
+
+async def _run(fn, *args):
+    global _pending
+    # bcrypt releases the GIL, so a small pool keeps the event loop free;
+    # the queue cap turns a login storm into fast 503s, not unbounded latency.
+    if _pending >= config.PASSWORD_HASH_QUEUE:
+        raise PasswordHasherBusyError()
+    _pending += 1
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_executor, fn, *args)
+    finally:
+        _pending -= 1
+
+
+async def hash_password(password: str) -> str:
+    return await _run(pwd_context.hash, password)
+
+
+async def verify_password(password: str, hashed_password: str):
+    """Return ``(valid, new_hash)``; ``new_hash`` is set when the stored hash should be upgraded."""
+    return await _run(pwd_context.verify_and_update, password, hashed_password)
+
+
+def pending() -> int:
+    return _pending
@@ -0,0 +1,80 @@
+import json
+import logging
+from dataclasses import asdict, dataclass
+
+from app.core import config
+from app.core.cache import TTLCache, register_cache
+
+logger = logging.getLogger("principal_cache")
+
+
+@dataclass(frozen=True)
+class Principal:
+    """The authenticated user as seen by route handlers."""
+    id: int
+    email: str
+
+
+class PrincipalCache:
+    """Verified principals by user id: an in-process TTL/LRU tier plus optional Redis.
+
+    Entries are short-lived and explicitly invalidated when a user changes,
+    so a valid token no longer costs a database lookup on every request.
+    """
+
+    def __init__(self, maxsize: int, ttl: int, redis=None):
+        self.ttl = ttl
+        self.local = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.redis = redis
+
+    @staticmethod
+    def _key(user_id: int) -> str:
+        return f"principal:{user_id}"
+
+    async def get(self, user_id: int):
+        principal = self.local.get(user_id)
+        if principal is not None or self.redis is None:
+            return principal
+        try:
+            cached = await self.redis.get(self._key(user_id))
+        except Exception as e:
+            logger.warning(f"Redis principal lookup failed: {e}")
+            return None
+        if cached is None:
+            return None
+        principal = Principal(**json.loads(cached))
+        self.local.set(user_id, principal)
+        return principal
+
+    async def set(self, principal: Principal):
+        self.local.set(principal.id, principal)
+        if self.redis is None:
+            return
+        try:
+            await self.redis.set(self._key(principal.id), json.dumps(asdict(principal)), ex=self.ttl)
+        except Exception as e:
+            logger.warning(f"Redis principal write failed: {e}")
+
+    def stats(self) -> dict:
+        return self.local.stats()
+
+    async def invalidate(self, user_id: int):
+        self.local.delete(user_id)
+        if self.redis is None:
+            return
+        try:
+            await self.redis.delete(self._key(user_id))
+        except Exception as e:
+            logger.warning(f"Redis principal invalidation failed: {e}")
+
+
+def _redis_tier():
+    if not config.AUTH_CACHE_REDIS:
+        return None
+    from app.core.dependencies import redis_client
+    return redis_client
+
+
+principal_cache = register_cache(
+    "principals", PrincipalCache(config.AUTH_CACHE_SIZE, config.AUTH_CACHE_TTL, redis=_redis_tier())
+)
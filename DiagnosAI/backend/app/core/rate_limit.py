@@ -0,0 +1,57 @@
+import logging
+import time
+
+logger = logging.getLogger("rate_limit")
+
+
+class RateLimitExceeded(Exception):
+    def __init__(self, retry_after: int):
+        super().__init__(f"Rate limit exceeded; retry in {retry_after}s")
+        self.retry_after = retry_after
+
+
+class RateLimiter:
+    """Fixed-window request counter per key, in-process or shared through Redis."""
+
+    def __init__(self, limit: int, window: int, prefix: str, redis=None, max_keys: int = 100000):
+        self.limit = limit
+        self.window = window
+        self.prefix = prefix
+        self.redis = redis
+        self.max_keys = max_keys
+        self._counts = {}
+
+    def _local_hit(self, key: str, now: float) -> int:
+        window_start = now - now % self.window
+        start, count = self._counts.get(key, (window_start, 0))
+        if start != window_start:
+            count = 0
+        self._counts[key] = (window_start, count + 1)
+        if len(self._counts) > self.max_keys:
+            # Drop counters from past windows; they can't affect any decision now.
+            self._counts = {k: v for k, v in self._counts.items() if v[0] == window_start}
+        return count + 1
+
+    async def _redis_hit(self, key: str, now: float) -> int:
+        redis_key = f"ratelimit:{self.prefix}:{key}:{int(now // self.window)}"
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.incr(redis_key)
+            pipe.expire(redis_key, self.window)
+            count, _ = await pipe.execute()
+        return count
+
+    async def hit(self, key: str):
+        """Count one attempt for ``key``; raises ``RateLimitExceeded`` over the limit."""
+        if self.limit <= 0:
+            return
+        now = time.time()
+        count = None
+        if self.redis is not None:
+            try:
+                count = await self._redis_hit(key, now)
+            except Exception as e:
+                logger.warning(f"Redis rate limit check failed, using local counters: {e}")
+        if count is None:
+            count = self._local_hit(key, now)
+        if count > self.limit:
+            raise RateLimitExceeded(max(1, int(self.window - now % self.window)))
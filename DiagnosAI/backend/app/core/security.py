@@ -1,8 +1,11 @@
 import os
+from datetime import datetime, timedelta, timezone
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import jwt, JWTError
-from app.db.crud import get_user_by_email
+from app.core.config import ACCESS_TOKEN_EXPIRE_MINUTES
+from app.core.principal_cache import Principal, principal_cache
+from app.db.crud import get_user_by_email, get_user_by_id
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/users/token")
 
@@ -10,19 +13,46 @@ SECRET_KEY = os.getenv("JWT_SECRET_KEY", "yoursecretkey")
 ALGORITHM = "HS256"
 
 
+def create_access_token(user) -> str:
+    now = datetime.now(timezone.utc)
+    claims = {
+        "sub": user.email,
+        "uid": user.id,
+        "iat": now,
+        "exp": now + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES),
+    }
+    return jwt.encode(claims, SECRET_KEY, algorithm=ALGORITHM)
+
+
 async def get_current_user(token: str = Depends(oauth2_scheme)):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials", headers={"WWW-Authenticate": "Bearer"},
     )
     try:
+        # jose rejects expired tokens when an "exp" claim is present.
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        email: str = payload.get("sub")
-        if email is None:
-            raise credentials_exception
-        user = await get_user_by_email(email)
-        if not user:
-            raise credentials_exception
     except JWTError:
         raise credentials_exception
-    return user
+    email: str = payload.get("sub")
+    user_id = payload.get("uid")
+    if email is None:
+        raise credentials_exception
+
+    if user_id is not None:
+        principal = await principal_cache.get(user_id)
+        if principal is not None and principal.email == email:
+            return principal
+
+    # Cache miss: look the user up by primary key, or by email for a legacy
+    # token without a user id.
+    if user_id is not None:
+        user = await get_user_by_id(user_id)
+    else:
+        user = await get_user_by_email(email)
+    if not user or user.email != email:
+        raise credentials_exception
+    principal = Principal(id=user.id, email=user.email)
+    if user_id is not None:
+        await principal_cache.set(principal)
+    return principal
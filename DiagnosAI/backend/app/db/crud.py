@@ -1,9 +1,15 @@
-import json
+from sqlalchemy import delete, exists, insert, literal, tuple_, update
 from sqlalchemy.future import select
 from app.models.user import User
 from app.models.diagnosis import Diagnosis
-from app.db.session import async_session
+from app.models.record import HealthRecord
+from app.models.health_info import HealthInfo
+from app.db.session import async_session, read_session
 from app.models.sessions import Session, Message
+from app.core.principal_cache import principal_cache
+from app.db.write_behind import utcnow, write_behind
+from app.core import config
+from app.services.gemini_client import candidate_text
 
 
 async def get_user_by_email(email: str):
@@ -12,6 +18,12 @@ async def get_user_by_email(email: str):
         return result.scalars().first()
 
 
+async def get_user_by_id(user_id: int):
+    async with async_session() as session:
+        result = await session.execute(select(User).filter(User.id == user_id))
+        return result.scalars().first()
+
+
 async def create_user(email: str, hashed_password: str):
     async with async_session() as session:
         user = User(email=email, hashed_password=hashed_password)
@@ -21,10 +33,35 @@ async def create_user(email: str, hashed_password: str):
         return user
 
 
+async def update_user_password(user_id: int, hashed_password: str):
+    async with async_session() as session:
+        await session.execute(update(User).where(User.id == user_id).values(hashed_password=hashed_password))
+        await session.commit()
+    await principal_cache.invalidate(user_id)
+
+
+async def delete_user(user_id: int):
+    async with async_session() as session:
+        await session.execute(delete(User).where(User.id == user_id))
+        await session.commit()
+    await principal_cache.invalidate(user_id)
+
+
+def stored_candidate(candidate):
+    """What of a Gemini candidate to keep in ``messages.candidate``, per ``REPLY_CANDIDATE_STORAGE``."""
+    if not candidate or config.REPLY_CANDIDATE_STORAGE == "none":
+        return None
+    if config.REPLY_CANDIDATE_STORAGE == "metadata":
+        # Safety ratings, finish reason etc.; the text is already in ``content``.
+        return {key: value for key, value in candidate.items() if key != "content"} or None
+    return candidate
+
+
 async def create_diagnosis_record(user_id: int, prompt: str, diagnosis):
-    diagnosis_str = json.dumps(diagnosis) if isinstance(diagnosis, dict) else diagnosis
+    """A diagnosis outside any chat session; its text is stored on the record itself."""
+    diagnosis_text = candidate_text(diagnosis) if isinstance(diagnosis, dict) else diagnosis
     async with async_session() as session:
-        record = Diagnosis(user_id=user_id, prompt=prompt, diagnosis=diagnosis_str)
+        record = Diagnosis(user_id=user_id, prompt=prompt, diagnosis=diagnosis_text)
         session.add(record)
         await session.commit()
         await session.refresh(record)
@@ -32,11 +69,48 @@ async def create_diagnosis_record(user_id: int, prompt: str, diagnosis):
 
 
 async def get_diagnosis_record(record_id: int):
-    async with async_session() as session:
+    async with read_session() as session:
         result = await session.execute(select(Diagnosis).filter(Diagnosis.id == record_id))
         return result.scalars().first()
 
 
+# Health record CRUD
+
+async def create_health_record(user_id: int, filename: str, content_type: str, digest: str, size: int):
+    async with async_session() as session:
+        result = await session.execute(
+            insert(HealthRecord)
+            .values(user_id=user_id, filename=filename, content_type=content_type, digest=digest, size=size)
+            .returning(HealthRecord)
+        )
+        record = result.scalar_one()
+        await session.commit()
+        return record
+
+
+async def referenced_digests(digests) -> set:
+    """Which of ``digests`` some health record still points to."""
+    async with async_session() as session:
+        result = await session.execute(select(HealthRecord.digest).filter(HealthRecord.digest.in_(list(digests))))
+        return set(result.scalars().all())
+
+
+async def get_health_record(record_id: int):
+    async with async_session() as session:
+        result = await session.execute(select(HealthRecord).filter(HealthRecord.id == record_id))
+        return result.scalars().first()
+
+
+# HealthInfo. Rows are maintained through the ORM (scripts, admin tools), so
+# the search index's mapper events see every change.
+
+async def list_health_info():
+    # From the primary: the search index must not go back to a lagging replica.
+    async with async_session() as session:
+        result = await session.execute(select(HealthInfo).order_by(HealthInfo.id))
+        return result.scalars().all()
+
+
 # Session CRUD
 
 async def create_session(user_id: int) -> Session:
@@ -57,12 +131,15 @@ async def add_message(session_id: int, role: str, content: str):
         return msg
 
 
-async def get_session_messages(session_id: int):
-    async with async_session() as session:
-        result = await session.execute(
-            select(Message).filter(Message.session_id == session_id).order_by(Message.created_at)
-        )
-        return result.scalars().all()
+async def get_session_messages(session_id: int, limit: int = None):
+    """Messages of a session in chronological order; only the newest ``limit`` if given."""
+    async with read_session() as session:
+        query = select(Message).filter(Message.session_id == session_id)
+        if limit is None:
+            result = await session.execute(query.order_by(Message.created_at))
+            return result.scalars().all()
+        result = await session.execute(query.order_by(Message.created_at.desc(), Message.id.desc()).limit(limit))
+        return list(reversed(result.scalars().all()))
 
 
 async def get_session(session_id: int) -> Session:
@@ -71,3 +148,146 @@ async def get_session(session_id: int) -> Session:
             select(Session).filter(Session.id == session_id)
         )
         return result.scalars().first()
+
+
+# Keyset-paginated listings, newest first. Each returns up to ``limit + 1``
+# rows so the caller can tell whether another page exists without a COUNT.
+
+async def list_sessions(user_id: int, limit: int, before_id: int = None):
+    async with read_session() as session:
+        query = select(Session).filter(Session.user_id == user_id)
+        if before_id is not None:
+            query = query.filter(Session.id < before_id)
+        result = await session.execute(query.order_by(Session.id.desc()).limit(limit + 1))
+        return result.scalars().all()
+
+
+async def list_messages(session_id: int, user_id: int, limit: int, before=None, primary: bool = False):
+    """Messages of one of the user's sessions older than ``before = (created_at, id)``.
+
+    Returns None if the session doesn't exist or belongs to someone else.
+    ``primary`` skips the read replica, for rows that were only just written.
+    """
+    async with async_session() if primary else read_session() as session:
+        query = (
+            select(Message)
+            .join(Session, Session.id == Message.session_id)
+            .filter(Message.session_id == session_id, Session.user_id == user_id)
+        )
+        if before is not None:
+            query = query.filter(tuple_(Message.created_at, Message.id) < tuple_(*before))
+        query = query.order_by(Message.created_at.desc(), Message.id.desc()).limit(limit + 1)
+        rows = (await session.execute(query)).scalars().all()
+        if not rows:
+            owned = await session.execute(
+                select(Session.id).filter(Session.id == session_id, Session.user_id == user_id)
+            )
+            if owned.scalar_one_or_none() is None:
+                return None
+        return rows
+
+
+async def list_diagnoses(user_id: int, limit: int, before_id: int = None, primary: bool = False):
+    async with async_session() if primary else read_session() as session:
+        query = select(Diagnosis).filter(Diagnosis.user_id == user_id)
+        if before_id is not None:
+            query = query.filter(Diagnosis.id < before_id)
+        result = await session.execute(query.order_by(Diagnosis.id.desc()).limit(limit + 1))
+        return result.scalars().all()
+
+
+# Diagnosis turn unit of work
+#
+# A chat turn used to open a session per helper call (create/get session, add
+# message x2, read history, create diagnosis), each with its own commit and
+# refresh. Now the prompt and history read take one transaction, using
+# INSERT ... RETURNING instead of refresh round trips, and the reply is
+# batched through the write-behind queue.
+
+class SessionNotFoundError(LookupError):
+    pass
+
+
+async def begin_diagnosis_turn(user_id: int, session_id, prompt: str, history_limit: int = None):
+    """Store the user's prompt and read the prior history in one transaction.
+
+    Creates a new conversation when ``session_id`` is None. Returns
+    ``(session_id, message_id, prior_messages)`` where ``message_id`` is the
+    prompt just stored, which is not part of ``prior_messages``. Raises ``SessionNotFoundError`` if ``session_id``
+    doesn't exist or belongs to another user.
+    """
+    if session_id is not None:
+        # The previous turn's reply may still be in the write-behind queue.
+        await write_behind.wait_for_session(session_id)
+    # App-clock timestamps, like the queued rows, so history order is consistent.
+    created_at = utcnow()
+    async with async_session() as session:
+        async with session.begin():
+            if session_id is None:
+                result = await session.execute(
+                    insert(Session).values(user_id=user_id).returning(Session.id)
+                )
+                session_id = result.scalar_one()
+                result = await session.execute(
+                    insert(Message)
+                    .values(session_id=session_id, role="user", content=prompt, created_at=created_at)
+                    .returning(Message.id)
+                )
+                return session_id, result.scalar_one(), []
+
+            # Ownership check and insert in a single statement: nothing is
+            # inserted (and no id returned) unless the session is the user's.
+            owned = exists().where(Session.id == session_id, Session.user_id == user_id)
+            result = await session.execute(
+                insert(Message)
+                .from_select(
+                    ["session_id", "role", "content", "created_at"],
+                    select(
+                        # Typed literals, so content goes through CompressedText.
+                        literal(session_id), literal("user"), literal(prompt, Message.content.type),
+                        literal(created_at, Message.created_at.type),
+                    ).where(owned),
+                )
+                .returning(Message.id)
+            )
+            message_id = result.scalar_one_or_none()
+            if message_id is None:
+                raise SessionNotFoundError(session_id)
+
+            query = select(Message).filter(Message.session_id == session_id, Message.id != message_id)
+            query = query.order_by(Message.created_at.desc(), Message.id.desc())
+            if history_limit is not None:
+                query = query.limit(history_limit)
+            result = await session.execute(query)
+            return session_id, message_id, list(reversed(result.scalars().all()))
+
+
+async def discard_user_turn(session_id: int, message_id: int, new_session: bool = False):
+    """Undo ``begin_diagnosis_turn`` for a turn that got no reply.
+
+    Otherwise the session keeps a prompt without an answer, and the next turn
+    would send Gemini two user turns in a row. A session created for this
+    turn is removed with it.
+    """
+    async with async_session() as session:
+        async with session.begin():
+            await session.execute(delete(Message).where(Message.id == message_id, Message.role == "user"))
+            if new_session:
+                await session.execute(delete(Session).where(Session.id == session_id))
+
+
+def _reply_rows(session_id: int, user_id: int, prompt: str, candidate: dict) -> dict:
+    # The reply text is stored once, on the message; the diagnosis points at it.
+    created_at = utcnow()
+    return {
+        "messages": [{
+            "session_id": session_id, "role": "model", "content": candidate_text(candidate or {}),
+            "candidate": stored_candidate(candidate), "created_at": created_at,
+        }],
+        "diagnoses": [{"user_id": user_id, "prompt": prompt, "_message_index": 0, "created_at": created_at}],
+    }
+
+
+async def queue_diagnosis_turn(session_id: int, user_id: int, prompt: str, candidate: dict):
+    """Store the model reply and the diagnosis record through the write-behind queue; returns once queued."""
+    await write_behind.add(session_id, _reply_rows(session_id, user_id, prompt, candidate))
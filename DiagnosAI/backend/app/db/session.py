@@ -1,22 +1,88 @@
-import os
+import logging
+
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker
-from dotenv import load_dotenv
 
-load_dotenv()
+from app.core import config, metrics
+
+logger = logging.getLogger("db")
+
+# The one engine (and optional read replica) per process. The app builds
+# them in its lifespan; scripts get them lazily on first use.
+_engine = None
+_read_engine = None
+_session_factory = None
+_read_session_factory = None
+
+
+def _create_engine(url: str, name: str):
+    url = make_url(url)
+    kwargs = {"echo": config.DB_ECHO, "pool_pre_ping": config.DB_POOL_PRE_PING}
+    if url.get_backend_name() != "sqlite":
+        kwargs.update(
+            pool_size=config.DB_POOL_SIZE,
+            max_overflow=config.DB_MAX_OVERFLOW,
+            pool_recycle=config.DB_POOL_RECYCLE,
+            pool_timeout=config.DB_POOL_TIMEOUT,
+        )
+    if url.get_driver_name() == "asyncpg":
+        # SQLAlchemy's prepared-statement cache plus asyncpg's own; set
+        # DB_STATEMENT_CACHE_SIZE=0 behind pgbouncer in transaction mode.
+        url = url.update_query_dict({"prepared_statement_cache_size": str(config.DB_STATEMENT_CACHE_SIZE)})
+        kwargs["connect_args"] = {"statement_cache_size": config.DB_STATEMENT_CACHE_SIZE}
+    engine = create_async_engine(url, **kwargs)
+    metrics.instrument_engine(engine, name)
+    return engine
+
+
+def init_engine():
+    """Create the engine(s) if they don't exist yet; returns the primary engine."""
+    global _engine, _read_engine, _session_factory, _read_session_factory
+    if _engine is not None:
+        return _engine
+    if not config.DATABASE_URL:
+        raise ValueError("DATABASE_URL is not set in environment variables")
+    _engine = _create_engine(config.DATABASE_URL, "primary")
+    _session_factory = sessionmaker(bind=_engine, class_=AsyncSession, expire_on_commit=False)
+    if config.DATABASE_READ_URL:
+        _read_engine = _create_engine(config.DATABASE_READ_URL, "replica")
+        _read_session_factory = sessionmaker(bind=_read_engine, class_=AsyncSession, expire_on_commit=False)
+        logger.info("Routing read-only queries to the read replica")
+    else:
+        _read_session_factory = _session_factory
+    return _engine
+
+
+async def dispose_engine():
+    global _engine, _read_engine, _session_factory, _read_session_factory
+    if _read_engine is not None:
+        await _read_engine.dispose()
+    if _engine is not None:
+        await _engine.dispose()
+    _engine = _read_engine = _session_factory = _read_session_factory = None
+
+
+def get_engine():
+    return init_engine()
+
+
+def async_session() -> AsyncSession:
+    """A session on the primary database."""
+    if _session_factory is None:
+        init_engine()
+    return _session_factory()
 
-DATABASE_URL = os.getenv("DATABASE_URL")
 
-if not DATABASE_URL:
-    raise ValueError("DATABASE_URL is not set in environment variables")
+def read_session() -> AsyncSession:
+    """A session for read-only queries; the replica if configured, else the primary.
 
-engine = create_async_engine(DATABASE_URL, echo=True)
+    Replicas lag, so only use this where reading slightly stale data is fine.
+    """
+    if _read_session_factory is None:
+        init_engine()
+    return _read_session_factory()
 
-async_session = sessionmaker(
-    bind=engine,
-    class_=AsyncSession,
-    expire_on_commit=False
-)
 
 # Dependency for FastAPI routes if needed
 async def get_db():
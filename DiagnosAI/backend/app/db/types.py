@@ -0,0 +1,49 @@
+import zlib
+
+from sqlalchemy import JSON, LargeBinary
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.types import TypeDecorator
+
+from app.core import config
+
+# JSONB on Postgres (binary, TOAST-compressed, indexable), JSON text elsewhere.
+# None is stored as SQL NULL rather than a JSON null.
+JSONVariant = JSON(none_as_null=True).with_variant(JSONB(none_as_null=True), "postgresql")
+
+_PLAIN = b"\x00"
+_ZLIB = b"\x01"
+
+
+def encode_text(value: str, min_bytes: int = None) -> bytes:
+    min_bytes = config.TEXT_COMPRESS_MIN_BYTES if min_bytes is None else min_bytes
+    raw = value.encode("utf-8")
+    if 0 <= min_bytes <= len(raw):
+        compressed = zlib.compress(raw, 6)
+        if len(compressed) < len(raw):
+            return _ZLIB + compressed
+    return _PLAIN + raw
+
+
+def decode_text(value: bytes) -> str:
+    value = bytes(value)
+    if value[:1] == _ZLIB:
+        return zlib.decompress(value[1:]).decode("utf-8")
+    return value[1:].decode("utf-8")
+
+
+class CompressedText(TypeDecorator):
+    """Text stored as bytes, zlib-compressed once it reaches ``TEXT_COMPRESS_MIN_BYTES``.
+
+    A one-byte header says whether the payload is compressed, so the
+    threshold can change without rewriting existing rows. Values can't be
+    compared or searched in SQL.
+    """
+
+    impl = LargeBinary
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        return None if value is None else encode_text(value)
+
+    def process_result_value(self, value, dialect):
+        return None if value is None else decode_text(value)
@@ -0,0 +1,368 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from collections import Counter
+from datetime import datetime, timezone
+
+from sqlalchemy import insert
+from sqlalchemy.exc import DataError, IntegrityError
+
+from app.core import config, metrics
+from app.db.session import async_session
+from app.models.diagnosis import Diagnosis
+from app.models.sessions import Message
+from app.services.gemini_client import candidate_text
+
+logger = logging.getLogger("write_behind")
+
+# Flushed in this order, so rows may reference rows of earlier tables.
+TABLES = {"messages": Message, "diagnoses": Diagnosis}
+# A diagnosis row may carry ``_message_index`` (position of its message in
+# the same batch) instead of a ``message_id``, which isn't known until flush.
+MESSAGE_REF = "_message_index"
+
+
+def utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _merge(into: dict, batch: dict):
+    """Append ``batch`` to ``into``, shifting message references to match."""
+    offset = len(into["messages"])
+    for name, rows in batch.items():
+        for row in rows:
+            if MESSAGE_REF in row:
+                row[MESSAGE_REF] += offset
+            into[name].append(row)
+
+
+def _resolve(row: dict, message_ids) -> dict:
+    if MESSAGE_REF not in row:
+        return row
+    row = dict(row)
+    row["message_id"] = message_ids[row.pop(MESSAGE_REF)]
+    return row
+
+
+class SpilledRowsError(RuntimeError):
+    """A session's rows are only in the spill file and the database is still unreachable."""
+
+
+class WriteBehindQueue:
+    """Buffers chat-turn inserts and writes them as multi-row batches.
+
+    A request enqueues its rows and returns without waiting for a commit.
+    A background task flushes every ``interval_ms``, or as soon as
+    ``batch_size`` rows are waiting, in one transaction per flush. Rows carry
+    their own ``created_at`` (set at enqueue), so history order doesn't
+    depend on when they reach the database.
+
+    Durability: ``close()`` flushes on shutdown, and a batch that still
+    fails after retries is appended to a JSONL spill file that is replayed
+    once the database is reachable again. Read-your-writes: callers about to
+    read a session's history ``await wait_for_session(id)`` first; that also
+    replays the session's spilled rows, or raises ``SpilledRowsError``.
+    """
+
+    def __init__(self, batch_size: int = 500, interval_ms: float = 50, max_pending: int = 10000,
+                 spill_path: str = None, retries: int = 3):
+        self.batch_size = batch_size
+        self.interval = interval_ms / 1000
+        self.max_pending = max_pending
+        self.spill_path = spill_path
+        self.retries = retries
+        self._rows = {name: [] for name in TABLES}
+        self._sessions = Counter()  # session_id -> rows not yet flushed
+        self._users = Counter()  # user_id -> diagnosis rows not yet flushed
+        self._spilled_sessions = set()  # sessions with rows only in the spill file
+        self._lock = None
+        self._wake = None
+        self._task = None
+        self._closing = False
+
+    def __len__(self):
+        return sum(len(rows) for rows in self._rows.values())
+
+    def start(self):
+        if self._task is None:
+            self._lock = asyncio.Lock()
+            self._wake = asyncio.Event()
+            self._closing = False
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        """Stop the flusher and write everything still queued."""
+        if self._task is not None:
+            # Not cancelled: a flush in progress must finish, not lose its batch.
+            self._closing = True
+            self._wake.set()
+            await self._task
+            self._task = None
+        await self.flush()
+
+    async def add(self, session_id: int, rows: dict):
+        """Queue ``{table: [row, ...]}`` belonging to one chat session."""
+        if self._task is None:
+            # Not running (scripts, tests): write through.
+            await self._write(rows)
+            return
+        for table_rows in rows.values():
+            self._sessions[session_id] += len(table_rows)
+            for row in table_rows:
+                row["_session_id"] = session_id
+        for row in rows.get("diagnoses", ()):
+            self._users[row["user_id"]] += 1
+        _merge(self._rows, rows)
+        size = len(self)
+        if size >= self.max_pending:
+            # Back-pressure while the database can't keep up.
+            await self.flush()
+        elif size >= self.batch_size:
+            self._wake.set()
+
+    def pending_for(self, session_id: int) -> bool:
+        return self._sessions.get(session_id, 0) > 0
+
+    async def wait_for_session(self, session_id: int) -> bool:
+        """Make sure this session's queued and spilled rows are in the database.
+
+        Returns True if that took a write: the rows are then only guaranteed
+        to be visible on the primary, not on a read replica. Raises
+        ``SpilledRowsError`` if some are still only in the spill file, since
+        history read now would silently miss them.
+        """
+        flushed = False
+        if self.pending_for(session_id):
+            await self.flush()
+            flushed = True
+        if session_id in self._spilled_sessions:
+            async with self._lock or asyncio.Lock():
+                await self.replay_spill()
+            flushed = True
+            if session_id in self._spilled_sessions:
+                raise SpilledRowsError(session_id)
+        return flushed
+
+    async def wait_for_user(self, user_id: int) -> bool:
+        """Like ``wait_for_session``, for the user's queued diagnosis records."""
+        if self._users.get(user_id, 0) > 0:
+            await self.flush()
+            return True
+        return False
+
+    async def _run(self):
+        try:
+            async with self._lock:
+                await self.replay_spill()
+        except Exception as e:
+            logger.error(f"Spill replay failed: {e}")
+        while not self._closing:
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            if len(self):
+                try:
+                    await self.flush()
+                except Exception as e:
+                    logger.error(f"Write-behind flush failed: {e}")
+
+    async def flush(self):
+        lock = self._lock or asyncio.Lock()
+        async with lock:
+            batch = self._rows
+            if not any(batch.values()):
+                return
+            self._rows = {name: [] for name in TABLES}
+            sessions = Counter()
+            for table_rows in batch.values():
+                for row in table_rows:
+                    sessions[row.pop("_session_id")] += 1
+            users = Counter(row["user_id"] for row in batch["diagnoses"])
+            try:
+                written = await self._write_with_retries(batch)
+            finally:
+                self._sessions -= sessions
+                self._users -= users
+            if written:
+                # The database is reachable again; catch up on any outage.
+                await self.replay_spill()
+
+    async def _write(self, batch: dict):
+        started = time.perf_counter()
+        message_ids = None
+        async with async_session() as session:
+            async with session.begin():
+                # executemany; SQLAlchemy sends these as multi-row INSERT ... VALUES batches.
+                if batch.get("messages"):
+                    result = await session.execute(
+                        insert(Message).returning(Message.id, sort_by_parameter_order=True), batch["messages"]
+                    )
+                    message_ids = result.scalars().all()
+                for name, model in TABLES.items():
+                    if name != "messages" and batch.get(name):
+                        await session.execute(insert(model), [_resolve(row, message_ids) for row in batch[name]])
+        metrics.WRITE_BEHIND_FLUSH_LATENCY.observe(time.perf_counter() - started)
+        metrics.WRITE_BEHIND_ROWS.inc(sum(len(rows) for rows in batch.values()))
+
+    async def _write_with_retries(self, batch: dict):
+        for attempt in range(self.retries):
+            try:
+                await self._write(batch)
+                return True
+            except Exception as e:
+                logger.error(f"Write-behind batch failed (attempt {attempt + 1}): {e}")
+                if attempt < self.retries - 1:
+                    await asyncio.sleep(0.1 * 2 ** attempt)
+        self._spill(batch)
+        return False
+
+    def _spill(self, batch: dict):
+        if not self.spill_path:
+            logger.error(f"Dropping {sum(len(r) for r in batch.values())} rows: no spill file configured")
+            return
+        os.makedirs(os.path.dirname(self.spill_path) or ".", exist_ok=True)
+        count = sum(len(rows) for rows in batch.values())
+        with open(self.spill_path, "a+b") as f:
+            # Don't glue this batch onto a line torn by an earlier crash.
+            if f.tell():
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    f.write(b"\n")
+            # One line per batch: message references are relative to it.
+            f.write(json.dumps(batch, default=_encode).encode() + b"\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self._spilled_sessions.update(row["session_id"] for row in batch["messages"])
+        metrics.WRITE_BEHIND_SPILLED.inc(count)
+        logger.warning(f"Spilled {count} rows to {self.spill_path}")
+
+    async def replay_spill(self):
+        """Write rows spilled during an outage; rows that fail for now stay on disk.
+
+        Pending lines live in ``<spill_path>.replaying`` while (and, for lines
+        that couldn't be written yet, after) they are replayed; new spills are
+        appended to it rather than replacing it, so an interrupted replay loses
+        nothing. Each spilled batch is retried on its own: a batch the database
+        rejects outright (say, its session was deleted) is moved to
+        ``<spill_path>.rejected`` instead of blocking the rest, and so is a line
+        that isn't valid JSON (a crash mid-append).
+
+        Called with the flush lock held, so nothing spills concurrently.
+        """
+        if not self.spill_path:
+            return
+        replaying = self.spill_path + ".replaying"
+        if os.path.exists(self.spill_path):
+            if os.path.exists(replaying):
+                _append_file(replaying, self.spill_path)
+                os.remove(self.spill_path)
+            else:
+                os.replace(self.spill_path, replaying)
+        if not os.path.exists(replaying):
+            self._spilled_sessions = set()
+            return
+
+        lines = []
+        with open(replaying) as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    lines.append((line, self._parse_spilled(line)))
+                except Exception as e:
+                    logger.error(f"Unreadable spilled line, moving it to {self.spill_path}.rejected: {e}")
+                    self._reject(line)
+
+        written = 0
+        remaining = []
+        for index, (line, batch) in enumerate(lines):
+            try:
+                await self._write(batch)
+                written += sum(len(rows) for rows in batch.values())
+            except (IntegrityError, DataError) as e:
+                logger.error(f"Spilled batch rejected, moving it to {self.spill_path}.rejected: {e}")
+                self._reject(line)
+            except Exception as e:
+                # Most likely the database is unreachable again; try the rest later.
+                logger.error(f"Spill replay failed, keeping {len(lines) - index} batches: {e}")
+                remaining = [line for line, _ in lines[index:]]
+                break
+        if remaining:
+            _write_file(replaying, "".join(remaining))
+        else:
+            os.remove(replaying)
+        self._spilled_sessions = {
+            row["session_id"] for _, batch in lines[len(lines) - len(remaining):] for row in batch["messages"]
+        }
+        if written:
+            logger.info(f"Replayed {written} spilled rows")
+
+    def _parse_spilled(self, line: str) -> dict:
+        spilled = json.loads(line)
+        if "table" in spilled and "row" in spilled:
+            spilled = _legacy_line(spilled)
+        batch = {name: [] for name in TABLES}
+        _merge(batch, {name: [_decode(row) for row in rows] for name, rows in spilled.items()})
+        return batch
+
+    def _reject(self, line: str):
+        with open(self.spill_path + ".rejected", "a") as f:
+            f.write(line if line.endswith("\n") else line + "\n")
+
+
+def _legacy_line(entry: dict) -> dict:
+    """A one-row ``{"table", "row"}`` line spilled before replies were stored as text.
+
+    Those rows hold the JSON-dumped Gemini candidate; only its text is kept,
+    and the diagnosis keeps its own copy since its message id is unknown.
+    """
+    row = dict(entry["row"])
+    column = "content" if entry["table"] == "messages" else "diagnosis"
+    value = row.get(column)
+    if isinstance(value, str) and value.lstrip().startswith("{"):
+        try:
+            row[column] = candidate_text(json.loads(value))
+        except ValueError:
+            pass
+    return {entry["table"]: [row]}
+
+
+def _append_file(path: str, source: str):
+    with open(source) as src, open(path, "a") as out:
+        out.write(src.read())
+        out.flush()
+        os.fsync(out.fileno())
+
+
+def _write_file(path: str, data: str):
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def _encode(value):
+    if isinstance(value, datetime):
+        return {"__datetime__": value.isoformat()}
+    raise TypeError(f"Cannot spill {type(value).__name__}")
+
+
+def _decode(row: dict) -> dict:
+    return {
+        key: datetime.fromisoformat(value["__datetime__"]) if isinstance(value, dict) and "__datetime__" in value else value
+        for key, value in row.items()
+    }
+
+
+write_behind = WriteBehindQueue(
+    batch_size=config.WRITE_BEHIND_BATCH_SIZE,
+    interval_ms=config.WRITE_BEHIND_INTERVAL_MS,
+    max_pending=config.WRITE_BEHIND_MAX_PENDING,
+    spill_path=config.WRITE_BEHIND_SPILL_PATH,
+)
@@ -1,12 +1,77 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.api import diagnosis, users
+from fastapi.responses import JSONResponse, Response
+from app.api import diagnosis, healthdata, history, records, search, users, who
+from app.core import config, metrics
+from app.core.logging import setup_logging, shutdown_logging
+from app.db.session import dispose_engine, init_engine
+from app.db.write_behind import write_behind
 from app.pneumonia.api import router as pneumonia_router
+from app.pneumonia.service import service as pneumonia_service
+from app.services import gemini_client
+from app.services.health_search import health_search
+
+setup_logging()
+logger = logging.getLogger("main")
+
+
+async def _warm_up_pneumonia():
+    try:
+        await pneumonia_service.warm_up()
+    except Exception as e:
+        logger.error(f"Pneumonia warm-up failed: {e}")
+
+
+async def _refresh_health_search():
+    # Picks up health_info changes committed by other workers or scripts;
+    # changes made in this process are applied as they commit.
+    while True:
+        try:
+            await health_search.refresh()
+        except Exception as e:
+            logger.error(f"health_info index refresh failed: {e}")
+        if config.HEALTH_SEARCH_REFRESH <= 0:
+            return
+        await asyncio.sleep(config.HEALTH_SEARCH_REFRESH)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Warm-up runs in the background so the server accepts traffic (and
+    # liveness checks) immediately; /ready reports when the model is in.
+    init_engine()
+    if config.WRITE_BEHIND:
+        write_behind.start()
+    await gemini_client.startup()
+    warm_up = None
+    if config.PNEUMONIA_ENABLED and config.PNEUMONIA_PRELOAD:
+        warm_up = asyncio.create_task(_warm_up_pneumonia())
+    search_refresh = asyncio.create_task(_refresh_health_search())
+    try:
+        healthdata.covid_dataset.current()
+    except Exception as e:
+        logger.error(f"Could not preload the COVID dataset: {e}")
+    yield
+    search_refresh.cancel()
+    if warm_up is not None and not warm_up.done():
+        warm_up.cancel()
+    await pneumonia_service.close()
+    await gemini_client.shutdown()
+    await healthdata.cdc_client.aclose()
+    await write_behind.close()
+    await dispose_engine()
+    shutdown_logging()
+
 
 app = FastAPI(
     title="DiagnosAI Backend",
     description="Backend API for DiagnosAI Health Chatbot",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
 origins = [
@@ -21,12 +86,42 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+if config.METRICS_ENABLED:
+    app.add_middleware(metrics.MetricsMiddleware)
 
 app.include_router(users.router, prefix="/api/users", tags=["users"])
 app.include_router(diagnosis.router, prefix="/api", tags=["diagnosis"])
-app.include_router(pneumonia_router, prefix="/pneumonia", tags=["pneumonia"])
+app.include_router(history.router, prefix="/api", tags=["history"])
+app.include_router(who.router, prefix="/api", tags=["who"])
+app.include_router(healthdata.router, prefix="/api", tags=["healthdata"])
+app.include_router(search.router, prefix="/api", tags=["search"])
+app.include_router(records.router, prefix="/api/records", tags=["records"])
+if config.PNEUMONIA_ENABLED:
+    app.include_router(pneumonia_router, prefix="/pneumonia", tags=["pneumonia"])
 
 
 @app.get("/")
 async def root():
     return {"message": "Welcome to DiagnosAI Backend"}
+
+
+@app.get("/health")
+async def health():
+    return {"status": "ok"}
+
+
+if config.METRICS_ENABLED:
+    @app.get("/metrics", include_in_schema=False)
+    async def prometheus_metrics():
+        body, content_type = metrics.render_metrics()
+        return Response(body, media_type=content_type)
+
+
+@app.get("/ready")
+async def ready():
+    pneumonia = pneumonia_service.status if config.PNEUMONIA_ENABLED else "disabled"
+    # A preloading worker isn't ready until the model is in memory; a lazy
+    # one is ready immediately and loads on the first prediction.
+    is_ready = not (config.PNEUMONIA_ENABLED and config.PNEUMONIA_PRELOAD) or pneumonia_service.ready
+    body = {"status": "ready" if is_ready else "starting", "pneumonia": pneumonia}
+    return JSONResponse(body, status_code=200 if is_ready else 503)
@@ -1,5 +1,7 @@
-from sqlalchemy import Column, Integer, String, ForeignKey
+from sqlalchemy import Column, DateTime, Integer, String, ForeignKey, Index
+from sqlalchemy.sql import func
 from app.db.base import Base
+from app.db.types import CompressedText
 from sqlalchemy.orm import relationship
 
 class Diagnosis(Base):
@@ -8,6 +10,19 @@ class Diagnosis(Base):
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"))
     prompt = Column(String, nullable=False)
-    diagnosis = Column(String, nullable=False)
+    # The reply lives on the model message; ``diagnosis`` only holds text for
+    # records that have no message (created outside a chat session).
+    message_id = Column(Integer, ForeignKey("messages.id"), nullable=True, index=True)
+    diagnosis = Column(CompressedText, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
 
     user = relationship("User")
+    message = relationship("Message", lazy="joined")
+
+    __table_args__ = (Index("ix_diagnoses_user_id_id", "user_id", "id"),)
+
+    @property
+    def text(self) -> str:
+        if self.message is not None:
+            return self.message.content
+        return self.diagnosis or ""
@@ -1,5 +1,7 @@
+from datetime import datetime
 from pydantic import BaseModel
-from sqlalchemy import Column, Integer, String, LargeBinary
+from sqlalchemy import BigInteger, Column, DateTime, ForeignKey, Integer, String
+from sqlalchemy.sql import func
 from app.db.base import Base
 
 # SQLAlchemy ORM Model
@@ -7,9 +9,13 @@ class HealthRecord(Base):
     __tablename__ = "health_records"
 
     id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
     filename = Column(String, nullable=False)
     content_type = Column(String, nullable=False)
-    data = Column(LargeBinary, nullable=False)  # Store raw file bytes
+    # File bytes live in the blob store, addressed by their SHA-256.
+    digest = Column(String(64), nullable=False, index=True)
+    size = Column(BigInteger, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
 
 # Pydantic schemas
 class HealthRecordBase(BaseModel):
@@ -17,10 +23,14 @@ class HealthRecordBase(BaseModel):
     content_type: str
 
 class HealthRecordCreate(HealthRecordBase):
-    data: bytes
+    digest: str
+    size: int
 
 class HealthRecordOut(HealthRecordBase):
     id: int
+    digest: str
+    size: int
+    created_at: datetime | None = None
 
     class Config:
         orm_mode = True
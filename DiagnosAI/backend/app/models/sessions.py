@@ -1,7 +1,8 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, Text, DateTime
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.db.base import Base
+from app.db.types import CompressedText, JSONVariant
 
 class Session(Base):
     __tablename__ = "sessions"
@@ -10,11 +11,20 @@ class Session(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     messages = relationship("Message", back_populates="session", cascade="all, delete-orphan")
 
+    # Keyset pagination of a user's sessions: WHERE user_id = ? AND id < ? ORDER BY id DESC
+    __table_args__ = (Index("ix_sessions_user_id_id", "user_id", "id"),)
+
 class Message(Base):
     __tablename__ = "messages"
     id = Column(Integer, primary_key=True, index=True)
     session_id = Column(Integer, ForeignKey("sessions.id"), nullable=False)
     role = Column(String, nullable=False)  # "user" or "model"
-    content = Column(Text, nullable=False)
+    # Plain text of the message; for model replies, just the reply text.
+    content = Column(CompressedText, nullable=False)
+    # Raw Gemini candidate (or its metadata), per REPLY_CANDIDATE_STORAGE; usually NULL.
+    candidate = Column(JSONVariant, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     session = relationship("Session", back_populates="messages")
+
+    # History reads and keyset pagination walk (created_at, id) within a session.
+    __table_args__ = (Index("ix_messages_session_id_created_at_id", "session_id", "created_at", "id"),)
@@ -1,29 +1,74 @@
-from fastapi import APIRouter, File, UploadFile, HTTPException
-from io import BytesIO
-from PIL import Image
-import numpy as np
-from .model import PneumoniaModel
+import asyncio
+from typing import List
+from fastapi import APIRouter, Depends, File, UploadFile, HTTPException
+from fastapi.responses import StreamingResponse
+from app.core.security import get_current_user
+from .bulk import BatchTooLargeError, close_all, collect_items, stream_predictions
 from .schemas import PneumoniaPredictionResponse
+from .service import service
 
 router = APIRouter()
 
-model = PneumoniaModel()
+
+def _diagnosis_for(prob: float) -> str:
+    return "Pneumonia likely" if prob > 0.5 else "Likely normal"
+
+
+async def _loaded_service():
+    try:
+        await service.ensure_loaded()
+    except Exception:
+        raise HTTPException(status_code=503, detail="Pneumonia model is unavailable.")
+    return service
+
 
 @router.post("/predict", response_model=PneumoniaPredictionResponse)
 async def pneumonia_predict(file: UploadFile = File(...)):
     if file.content_type not in ["image/jpeg", "image/png", "image/jpg"]:
         raise HTTPException(status_code=400, detail="Invalid image format. Use JPEG or PNG.")
     contents = await file.read()
+    pneumonia = await _loaded_service()
+
+    cache_key = pneumonia.cache.key_for(contents)
+    prob = await pneumonia.cache.get(cache_key)
+    if prob is None:
+        try:
+            # PIL decoding/resizing is CPU-bound; keep it off the event loop.
+            pixels = await asyncio.to_thread(pneumonia.decode, contents)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid image file.")
+        prob = await pneumonia.predictor.predict(pixels)
+        await pneumonia.cache.set(cache_key, prob)
+
+    return PneumoniaPredictionResponse(pneumonia_probability=prob, diagnosis=_diagnosis_for(prob))
+
+
+@router.post("/predict/batch")
+async def pneumonia_predict_batch(files: List[UploadFile] = File(...)):
+    """Score many X-rays (individual images and/or zip archives) in one request.
+
+    Streams ``application/x-ndjson``: one line per image with its ``index``
+    and ``filename``, in the order results become available.
+    """
+    pneumonia = await _loaded_service()
     try:
-        image = Image.open(BytesIO(contents)).convert("RGB")
-    except:
-        raise HTTPException(status_code=400, detail="Invalid image file.")
-    
-    image = image.resize((150, 150))
-    img_array = np.array(image) / 255.0
-    img_array = np.expand_dims(img_array, 0)
-    
-    prob = float(model.predict(img_array))
-    diagnosis = "Pneumonia likely" if prob > 0.5 else "Likely normal"
-    
-    return PneumoniaPredictionResponse(pneumonia_probability=prob, diagnosis=diagnosis)
+        items, spooled_files = await collect_items(files)
+    except BatchTooLargeError as e:
+        raise HTTPException(status_code=413, detail=f"At most {e.args[0]} images per request.")
+
+    async def body():
+        try:
+            async for line in stream_predictions(pneumonia, items):
+                yield line
+        finally:
+            close_all(spooled_files)
+
+    return StreamingResponse(body(), media_type="application/x-ndjson")
+
+
+@router.get("/cache/stats")
+async def pneumonia_cache_stats(user=Depends(get_current_user)):
+    # Not public, like /api/cache/stats: hit patterns leak usage.
+    if not service.ready:
+        return {"status": service.status}
+    return service.cache.stats()
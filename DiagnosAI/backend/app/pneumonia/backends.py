@@ -0,0 +1,90 @@
+import os
+
+import numpy as np
+
+MODELS_DIR = os.path.join(os.path.dirname(__file__), "models")
+
+
+class KerasBackend:
+    name = "keras"
+    extension = ".h5"
+
+    def __init__(self, model_path: str):
+        from tensorflow.keras.models import load_model
+
+        self.model = load_model(model_path)
+
+    def predict(self, img_batch: np.ndarray) -> np.ndarray:
+        # predict_on_batch skips the per-call dataset/callback setup of predict(),
+        # which dominates latency for the small batches we serve.
+        return np.asarray(self.model.predict_on_batch(img_batch))
+
+
+class TFLiteBackend:
+    name = "tflite"
+    extension = ".tflite"
+
+    def __init__(self, model_path: str):
+        try:
+            from tflite_runtime.interpreter import Interpreter
+        except ImportError:
+            from tensorflow.lite import Interpreter
+
+        self.interpreter = Interpreter(model_path=model_path)
+        self.interpreter.allocate_tensors()
+        self._input = self.interpreter.get_input_details()[0]
+        self._output = self.interpreter.get_output_details()[0]
+        self._batch_size = int(self._input["shape"][0])
+
+    def _resize(self, batch_size: int):
+        if batch_size != self._batch_size:
+            shape = [batch_size] + list(self._input["shape"][1:])
+            self.interpreter.resize_tensor_input(self._input["index"], shape)
+            self.interpreter.allocate_tensors()
+            self._input = self.interpreter.get_input_details()[0]
+            self._output = self.interpreter.get_output_details()[0]
+            self._batch_size = batch_size
+
+    def predict(self, img_batch: np.ndarray) -> np.ndarray:
+        self._resize(len(img_batch))
+        dtype = self._input["dtype"]
+        if dtype != np.float32:
+            # Full-integer models take quantized inputs.
+            scale, zero_point = self._input["quantization"]
+            img_batch = np.round(img_batch / scale + zero_point).astype(dtype)
+        self.interpreter.set_tensor(self._input["index"], img_batch)
+        self.interpreter.invoke()
+        output = self.interpreter.get_tensor(self._output["index"])
+        if self._output["dtype"] != np.float32:
+            scale, zero_point = self._output["quantization"]
+            output = (output.astype(np.float32) - zero_point) * scale
+        return output
+
+
+class ONNXBackend:
+    name = "onnx"
+    extension = ".onnx"
+
+    def __init__(self, model_path: str):
+        import onnxruntime as ort
+
+        self.session = ort.InferenceSession(model_path, providers=["CPUExecutionProvider"])
+        self._input_name = self.session.get_inputs()[0].name
+
+    def predict(self, img_batch: np.ndarray) -> np.ndarray:
+        return self.session.run(None, {self._input_name: img_batch})[0]
+
+
+BACKENDS = {backend.name: backend for backend in (KerasBackend, TFLiteBackend, ONNXBackend)}
+
+
+def default_model_path(backend_name: str) -> str:
+    return os.path.join(MODELS_DIR, "pneumonia_model" + BACKENDS[backend_name].extension)
+
+
+def load_backend(backend_name: str = "keras", model_path: str = None):
+    if backend_name not in BACKENDS:
+        raise ValueError(f"Unknown pneumonia backend {backend_name!r}; expected one of {sorted(BACKENDS)}")
+    if model_path is None:
+        model_path = default_model_path(backend_name)
+    return BACKENDS[backend_name](model_path)
@@ -0,0 +1,125 @@
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from app.core import metrics
+
+from .preprocessing import new_batch, to_batch
+
+logger = logging.getLogger("pneumonia.batching")
+
+
+class BatchingPredictor:
+    """Gathers concurrent prediction requests into one batched model call.
+
+    Requests wait at most ``max_wait_ms`` for company before the batch is
+    dispatched. The model itself runs on a single dedicated thread so the
+    event loop is never blocked by Keras, and that thread normalizes every
+    batch into one reused float32 buffer.
+    """
+
+    def __init__(self, model, max_batch_size: int = 16, max_wait_ms: float = 5.0):
+        self.model = model
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="pneumonia-model")
+        self._buffer = new_batch(self.max_batch_size)
+        self._queue = None
+        self._worker = None
+        # Requests taken off the queue but not yet answered, so they can be
+        # failed (rather than left hanging) if the worker dies.
+        self._inflight = []
+
+    async def predict(self, pixels) -> float:
+        """Queue one decoded ``(150, 150, 3)`` uint8 image and wait for its probability."""
+        self._ensure_started()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((pixels, future))
+        return await future
+
+    async def predict_many(self, images) -> list:
+        """Score an already-collected list of images in ``max_batch_size`` chunks.
+
+        Runs on the same model thread as ``predict`` so the two never contend
+        for the model or the batch buffer.
+        """
+        loop = asyncio.get_running_loop()
+        results = []
+        for start in range(0, len(images), self.max_batch_size):
+            chunk = images[start:start + self.max_batch_size]
+            probs = await loop.run_in_executor(self._executor, self._infer, chunk)
+            results.extend(float(prob) for prob in probs)
+        return results
+
+    def _ensure_started(self):
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+        if self._worker is None or self._worker.done():
+            # A restarted worker keeps the queue, so requests already waiting
+            # in it are still answered.
+            self._worker = asyncio.create_task(self._run())
+
+    async def _collect_batch(self):
+        loop = asyncio.get_running_loop()
+        batch = self._inflight = [await self._queue.get()]
+        deadline = loop.time() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        # Callers that disconnected while queued don't need a prediction.
+        return [(pixels, fut) for pixels, fut in batch if not fut.done()]
+
+    def _fail(self, items, exc: BaseException):
+        for _, fut in items:
+            if not fut.done():
+                fut.set_exception(exc)
+
+    def _infer(self, images):
+        # Only ever called on the single model thread, so the buffer is not shared.
+        started = time.perf_counter()
+        result = self.model.predict_batch(to_batch(images, out=self._buffer))
+        metrics.MODEL_INFERENCE_LATENCY.observe(time.perf_counter() - started)
+        metrics.MODEL_BATCH_SIZE.observe(len(images))
+        return result
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                batch = await self._collect_batch()
+                if not batch:
+                    continue
+                images = [pixels for pixels, _ in batch]
+                try:
+                    probs = await loop.run_in_executor(self._executor, self._infer, images)
+                except Exception as exc:
+                    logger.error(f"Batched pneumonia prediction failed ({len(batch)} images): {exc}")
+                    self._fail(batch, exc)
+                    continue
+                for (_, fut), prob in zip(batch, probs):
+                    if not fut.done():
+                        fut.set_result(float(prob))
+                self._inflight = []
+        except BaseException:
+            self._fail(self._inflight, RuntimeError("Pneumonia prediction worker stopped"))
+            self._inflight = []
+            raise
+
+    async def close(self):
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+        if self._queue is not None:
+            while not self._queue.empty():
+                self._fail([self._queue.get_nowait()], RuntimeError("Pneumonia predictor closed"))
+        self._executor.shutdown(wait=False)
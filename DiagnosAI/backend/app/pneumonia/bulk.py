@@ -0,0 +1,185 @@
+import asyncio
+import json
+import os
+import shutil
+import tempfile
+import zipfile
+
+from app.core import config
+
+IMAGE_TYPES = ("image/jpeg", "image/png", "image/jpg")
+ZIP_TYPES = ("application/zip", "application/x-zip-compressed")
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png")
+_DONE = object()
+
+
+class BatchTooLargeError(ValueError):
+    pass
+
+
+def _is_zip(upload) -> bool:
+    return upload.content_type in ZIP_TYPES or (upload.filename or "").lower().endswith(".zip")
+
+
+def _file_reader(spooled):
+    def read():
+        # Each upload has its own spool file and only one reader, so seek+read is safe.
+        spooled.seek(0)
+        return spooled.read()
+
+    async def reader():
+        return await asyncio.to_thread(read)
+    return reader
+
+
+def _zip_reader(archive: zipfile.ZipFile, info: zipfile.ZipInfo, lock: asyncio.Lock):
+    async def reader():
+        # Members share the archive's file handle, so reads must not interleave.
+        async with lock:
+            return await asyncio.to_thread(archive.read, info)
+    return reader
+
+
+def _spool(upload):
+    spooled = tempfile.TemporaryFile()
+    upload.file.seek(0)
+    shutil.copyfileobj(upload.file, spooled, 1024 * 1024)
+    return spooled
+
+
+async def collect_items(uploads):
+    """List ``(name, reader)`` pairs for every image in the uploads and zip archives.
+
+    FastAPI closes request files before a streaming response body runs, so
+    each upload is first copied (in chunks) to a temp file we own; readers
+    are coroutine functions that pull one image into memory only when it is
+    processed. Returns ``(items, spooled_files)``; the caller closes the files.
+    """
+    items = []
+    spooled_files = []
+    try:
+        for upload in uploads:
+            if len(items) > config.PNEUMONIA_BATCH_MAX_FILES:
+                raise BatchTooLargeError(config.PNEUMONIA_BATCH_MAX_FILES)
+            is_zip = _is_zip(upload)
+            if not is_zip and upload.content_type not in IMAGE_TYPES:
+                items.append((upload.filename, None))
+                continue
+            spooled = await asyncio.to_thread(_spool, upload)
+            spooled_files.append(spooled)
+            if not is_zip:
+                items.append((upload.filename, _file_reader(spooled)))
+                continue
+            try:
+                archive = zipfile.ZipFile(spooled)
+            except zipfile.BadZipFile:
+                items.append((upload.filename, None))
+                continue
+            lock = asyncio.Lock()
+            for info in archive.infolist():
+                if info.is_dir() or not info.filename.lower().endswith(IMAGE_EXTENSIONS):
+                    continue
+                if os.path.basename(info.filename).startswith("."):
+                    continue  # macOS resource forks and similar
+                if info.file_size > config.PNEUMONIA_BATCH_MAX_FILE_BYTES:
+                    items.append((info.filename, None))
+                    continue
+                items.append((info.filename, _zip_reader(archive, info, lock)))
+        if len(items) > config.PNEUMONIA_BATCH_MAX_FILES:
+            raise BatchTooLargeError(config.PNEUMONIA_BATCH_MAX_FILES)
+    except BaseException:
+        close_all(spooled_files)
+        raise
+    return items, spooled_files
+
+
+def close_all(files):
+    for f in files:
+        f.close()
+
+
+def _row(index: int, name: str, prob=None, cached=False, detail=None) -> str:
+    row = {"index": index, "filename": name}
+    if detail is not None:
+        row["detail"] = detail
+    else:
+        row.update({
+            "pneumonia_probability": prob,
+            "diagnosis": "Pneumonia likely" if prob > 0.5 else "Likely normal",
+            "cached": cached,
+        })
+    return json.dumps(row) + "\n"
+
+
+async def stream_predictions(service, items, flush_after: float = 0.02):
+    """Yield one NDJSON line per image, in completion order.
+
+    Images are read, cache-checked and decoded concurrently; decoded ones are
+    scored in batches of the predictor's ``max_batch_size``. A partial batch
+    is flushed once no new image has finished decoding for ``flush_after``
+    seconds, so results keep streaming while slower decodes are in flight.
+    """
+    queue = asyncio.Queue()
+    semaphore = asyncio.Semaphore(config.PNEUMONIA_DECODE_CONCURRENCY)
+    batch_size = service.predictor.max_batch_size
+
+    async def prepare(index, name, reader):
+        if reader is None:
+            await queue.put((index, name, None, None, "Invalid or unsupported file."))
+            return
+        async with semaphore:
+            try:
+                contents = await reader()
+                key = service.cache.key_for(contents)
+                prob = await service.cache.get(key)
+                if prob is not None:
+                    await queue.put((index, name, None, prob, None))
+                    return
+                pixels = await asyncio.to_thread(service.decode, contents)
+                del contents
+            except Exception:
+                await queue.put((index, name, None, None, "Invalid image file."))
+                return
+        await queue.put((index, name, (key, pixels), None, None))
+
+    async def produce():
+        try:
+            await asyncio.gather(*(prepare(i, name, reader) for i, (name, reader) in enumerate(items)))
+        finally:
+            await queue.put(_DONE)
+
+    producer = asyncio.create_task(produce())
+    pending = []
+
+    async def flush():
+        probs = await service.predictor.predict_many([pixels for _, _, (_, pixels) in pending])
+        lines = []
+        for (index, name, (key, _)), prob in zip(pending, probs):
+            await service.cache.set(key, prob)
+            lines.append(_row(index, name, prob))
+        pending.clear()
+        return "".join(lines)
+
+    try:
+        finished = False
+        while not finished:
+            try:
+                item = await asyncio.wait_for(queue.get(), flush_after if pending else None)
+            except asyncio.TimeoutError:
+                yield await flush()
+                continue
+            if item is _DONE:
+                finished = True
+            else:
+                index, name, decoded, prob, detail = item
+                if detail is not None:
+                    yield _row(index, name, detail=detail)
+                elif prob is not None:
+                    yield _row(index, name, prob, cached=True)
+                else:
+                    pending.append((index, name, decoded))
+            if pending and (finished or len(pending) >= batch_size):
+                yield await flush()
+    finally:
+        if not producer.done():
+            producer.cancel()
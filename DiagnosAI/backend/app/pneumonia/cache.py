@@ -0,0 +1,65 @@
+import hashlib
+import logging
+
+from app.core.cache import TTLCache
+
+logger = logging.getLogger("pneumonia.cache")
+
+
+class PredictionCache:
+    """Content-addressed cache of pneumonia probabilities.
+
+    Keys are the SHA-256 of the uploaded bytes plus the model version. Lookups
+    hit an in-process LRU first and, when enabled, a shared Redis tier.
+    """
+
+    def __init__(self, model_version: str, maxsize: int = 4096, ttl: int = 86400, redis=None):
+        self.model_version = model_version
+        self.ttl = ttl
+        self.local = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.redis = redis
+        self.redis_hits = 0
+        self.redis_misses = 0
+        self.redis_errors = 0
+
+    def key_for(self, contents: bytes) -> str:
+        return f"pneumonia:{self.model_version}:{hashlib.sha256(contents).hexdigest()}"
+
+    async def get(self, key: str):
+        prob = self.local.get(key)
+        if prob is not None or self.redis is None:
+            return prob
+        try:
+            cached = await self.redis.get(key)
+        except Exception as e:
+            self.redis_errors += 1
+            logger.warning(f"Redis lookup failed for {key}: {e}")
+            return None
+        if cached is None:
+            self.redis_misses += 1
+            return None
+        self.redis_hits += 1
+        prob = float(cached)
+        self.local.set(key, prob)
+        return prob
+
+    async def set(self, key: str, prob: float):
+        self.local.set(key, prob)
+        if self.redis is None:
+            return
+        try:
+            await self.redis.set(key, repr(prob), ex=self.ttl)
+        except Exception as e:
+            self.redis_errors += 1
+            logger.warning(f"Redis write failed for {key}: {e}")
+
+    def stats(self) -> dict:
+        return {
+            "model_version": self.model_version,
+            "local": self.local.stats(),
+            "redis": None if self.redis is None else {
+                "hits": self.redis_hits,
+                "misses": self.redis_misses,
+                "errors": self.redis_errors,
+            },
+        }
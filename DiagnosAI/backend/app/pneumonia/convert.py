@@ -0,0 +1,126 @@
+"""Offline conversion of the Keras pneumonia model to TFLite or ONNX.
+
+    python -m app.pneumonia.convert --to tflite --quantize int8
+    python -m app.pneumonia.convert --to onnx --quantize float16
+
+After converting, the new model is run next to the Keras original on the
+calibration images and the command fails if their outputs drift apart.
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+
+import numpy as np
+
+from .backends import MODELS_DIR, default_model_path, load_backend
+from .preprocessing import preprocess_batch
+
+DEFAULT_SAMPLES_DIR = os.path.join(os.path.dirname(__file__), "test")
+QUANTIZE_CHOICES = ("none", "dynamic", "float16", "int8")
+
+
+def load_samples(samples_dir: str, limit: int = 64) -> np.ndarray:
+    paths = sorted(
+        path for pattern in ("*.jpg", "*.jpeg", "*.png")
+        for path in glob.glob(os.path.join(samples_dir, pattern))
+    )[:limit]
+    if not paths:
+        raise SystemExit(f"No calibration images found in {samples_dir}")
+    return preprocess_batch(paths)
+
+
+def convert_to_tflite(keras_model, output_path: str, quantize: str, samples: np.ndarray):
+    import tensorflow as tf
+
+    converter = tf.lite.TFLiteConverter.from_keras_model(keras_model)
+    if quantize != "none":
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    if quantize == "float16":
+        converter.target_spec.supported_types = [tf.float16]
+    elif quantize == "int8":
+        def representative_dataset():
+            for sample in samples:
+                yield [sample[np.newaxis]]
+
+        converter.representative_dataset = representative_dataset
+        converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+    with open(output_path, "wb") as f:
+        f.write(converter.convert())
+
+
+def convert_to_onnx(keras_model, output_path: str, quantize: str):
+    import tensorflow as tf
+    import tf2onnx
+
+    spec = (tf.TensorSpec((None,) + tuple(keras_model.input_shape[1:]), tf.float32, name="input"),)
+    if quantize in ("none", "float16"):
+        model_proto, _ = tf2onnx.convert.from_keras(keras_model, input_signature=spec, output_path=output_path)
+        if quantize == "float16":
+            import onnx
+            from onnxconverter_common import float16
+
+            onnx.save(float16.convert_float_to_float16(model_proto, keep_io_types=True), output_path)
+        return
+
+    # Dynamic and int8 both use onnxruntime's weight quantization on a float export.
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    float_path = output_path + ".float.onnx"
+    tf2onnx.convert.from_keras(keras_model, input_signature=spec, output_path=float_path)
+    try:
+        quantize_dynamic(float_path, output_path, weight_type=QuantType.QInt8)
+    finally:
+        os.remove(float_path)
+
+
+def parity_check(reference, candidate, samples: np.ndarray) -> dict:
+    expected = reference.predict(samples)
+    actual = candidate.predict(samples)
+    col = 0 if expected.shape[1] == 1 else 1
+    expected, actual = expected[:, col], actual[:, col]
+    return {
+        "samples": int(len(samples)),
+        "max_abs_diff": float(np.max(np.abs(expected - actual))),
+        "mean_abs_diff": float(np.mean(np.abs(expected - actual))),
+        "label_agreement": float(np.mean((expected > 0.5) == (actual > 0.5))),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert the pneumonia Keras model to a lighter runtime format.")
+    parser.add_argument("--to", choices=["tflite", "onnx"], required=True, help="Target runtime format")
+    parser.add_argument("--quantize", choices=QUANTIZE_CHOICES, default="none", help="Quantization mode (default: none)")
+    parser.add_argument("--source", default=default_model_path("keras"), help="Keras .h5 model to convert")
+    parser.add_argument("--output", help=f"Output model path (default: {MODELS_DIR}/pneumonia_model.<ext>)")
+    parser.add_argument("--samples", default=DEFAULT_SAMPLES_DIR, help="Directory of X-rays used for calibration and parity")
+    parser.add_argument("--tolerance", type=float, default=0.05, help="Max allowed absolute probability difference")
+    args = parser.parse_args(argv)
+
+    output = args.output or default_model_path(args.to)
+    samples = load_samples(args.samples)
+    reference = load_backend("keras", args.source)
+
+    if args.to == "tflite":
+        convert_to_tflite(reference.model, output, args.quantize, samples)
+    else:
+        convert_to_onnx(reference.model, output, args.quantize)
+
+    report = parity_check(reference, load_backend(args.to, output), samples)
+    report.update({
+        "output": output,
+        "format": args.to,
+        "quantize": args.quantize,
+        "size_bytes": os.path.getsize(output),
+        "source_size_bytes": os.path.getsize(args.source),
+    })
+    print(json.dumps(report, indent=2))
+    if report["max_abs_diff"] > args.tolerance or report["label_agreement"] < 1.0:
+        print(f"Parity check failed (tolerance {args.tolerance})", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
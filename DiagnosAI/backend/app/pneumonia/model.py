@@ -1,23 +1,35 @@
-import tensorflow as tf
-from tensorflow.keras.models import load_model
+import hashlib
 import os
+from app.core.config import PNEUMONIA_BACKEND, PNEUMONIA_MODEL_PATH, PNEUMONIA_MODEL_VERSION
+from .backends import default_model_path, load_backend
+
+
+def model_file_version(model_path: str) -> str:
+    digest = hashlib.sha256()
+    with open(model_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()[:12]
+
 
 class PneumoniaModel:
-    def __init__(self, model_path=None):
+    def __init__(self, model_path=None, backend=None):
+        backend = backend or PNEUMONIA_BACKEND
         if model_path is None:
-            model_path = os.path.join(os.path.dirname(__file__), "models", "pneumonia_model.h5")
-        self.model = load_model(model_path)
+            model_path = PNEUMONIA_MODEL_PATH or default_model_path(backend)
+        self.model_path = model_path
+        self.backend = load_backend(backend, model_path)
+        # Identifies the weights in cache keys, so a new model never serves stale results.
+        self.version = PNEUMONIA_MODEL_VERSION or f"{backend}-{model_file_version(model_path)}"
 
-    def predict(self, img_tensor):
-
-        prediction = self.model.predict(img_tensor)  # prediction shape might be (1,1) or (1,2)
+    def predict_batch(self, img_batch):
+        prediction = self.backend.predict(img_batch)  # shape (N,1) or (N,2)
 
         if prediction.shape[1] == 1:
             # sigmoid output (single probability)
-            pneumonia_prob = prediction[0][0]
-        else:
-            # softmax output (two class probabilities)
-            pneumonia_prob = prediction[0][1]
-
-        return pneumonia_prob
+            return prediction[:, 0]
+        # softmax output (two class probabilities)
+        return prediction[:, 1]
 
+    def predict(self, img_tensor):
+        return self.predict_batch(img_tensor)[0]
@@ -0,0 +1,64 @@
+from io import BytesIO
+
+import numpy as np
+from PIL import Image
+
+IMAGE_SIZE = (150, 150)
+_SCALE = np.float32(1.0 / 255.0)
+
+
+def decode_image(source, size=IMAGE_SIZE) -> np.ndarray:
+    """Decode raw bytes or a file path into a ``(H, W, 3)`` uint8 RGB array.
+
+    JPEGs are decoded with ``Image.draft`` so libjpeg's DCT scaling produces a
+    reduced image close to ``size`` instead of decoding the full resolution
+    X-ray first. Raises ``ValueError`` for anything PIL can't read.
+    """
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        source = BytesIO(source)
+    try:
+        with Image.open(source) as image:
+            if image.format == "JPEG":
+                image.draft("RGB", size)
+            image = image.convert("RGB")
+            if image.size != size:
+                image = image.resize(size)
+            return np.asarray(image, dtype=np.uint8)
+    except FileNotFoundError:
+        raise
+    except Exception as e:
+        raise ValueError(f"Invalid image file: {e}") from e
+
+
+def new_batch(batch_size: int, size=IMAGE_SIZE) -> np.ndarray:
+    return np.empty((batch_size, size[1], size[0], 3), dtype=np.float32)
+
+
+def write_into(batch: np.ndarray, index: int, pixels: np.ndarray):
+    """Normalize uint8 pixels into ``batch[index]`` without temporary arrays."""
+    np.multiply(pixels, _SCALE, out=batch[index])
+
+
+def to_batch(images, out: np.ndarray = None) -> np.ndarray:
+    """Stack decoded uint8 images into a normalized float32 model batch.
+
+    ``out`` may be a preallocated buffer at least ``len(images)`` long; the
+    returned array is then a view onto it.
+    """
+    images = list(images)
+    if out is None:
+        out = new_batch(len(images))
+    batch = out[:len(images)]
+    for index, pixels in enumerate(images):
+        write_into(batch, index, pixels)
+    return batch
+
+
+def preprocess_batch(sources, out: np.ndarray = None) -> np.ndarray:
+    """Decode and normalize a list of byte strings / paths in one call."""
+    return to_batch((decode_image(source) for source in sources), out=out)
+
+
+def preprocess(source) -> np.ndarray:
+    """Decode one image into a ``(1, H, W, 3)`` float32 batch."""
+    return preprocess_batch([source])
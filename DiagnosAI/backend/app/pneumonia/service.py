@@ -0,0 +1,100 @@
+import asyncio
+import logging
+
+from app.core import config, metrics
+from app.core.cache import register_cache
+
+logger = logging.getLogger("pneumonia.service")
+
+
+class PneumoniaService:
+    """Owns the model, batching predictor and prediction cache.
+
+    Nothing heavy (numpy, PIL, TensorFlow, the model weights) is imported or
+    loaded until the first prediction or an explicit ``warm_up()``, so
+    workers that never serve ``/pneumonia`` never pay for it.
+    """
+
+    def __init__(self):
+        self.model = None
+        self.predictor = None
+        self.cache = None
+        self.error = None
+        self._lock = None
+
+    @property
+    def ready(self) -> bool:
+        return self.predictor is not None
+
+    @property
+    def status(self) -> str:
+        if self.ready:
+            return "loaded"
+        if self.error is not None:
+            return "failed"
+        if self._lock is not None and self._lock.locked():
+            return "loading"
+        return "not_loaded"
+
+    def _load(self):
+        from .batching import BatchingPredictor
+        from .cache import PredictionCache
+        from .model import PneumoniaModel
+
+        model = PneumoniaModel()
+        redis = None
+        if config.PNEUMONIA_CACHE_REDIS:
+            from app.core.dependencies import redis_client
+            redis = redis_client
+        self.cache = register_cache("pneumonia_predictions", PredictionCache(
+            model.version,
+            maxsize=config.PNEUMONIA_CACHE_SIZE,
+            ttl=config.PNEUMONIA_CACHE_TTL,
+            redis=redis,
+        ))
+        self.model = model
+        self.predictor = BatchingPredictor(
+            model,
+            max_batch_size=config.PNEUMONIA_MAX_BATCH_SIZE,
+            max_wait_ms=config.PNEUMONIA_MAX_WAIT_MS,
+        )
+
+    async def ensure_loaded(self):
+        if self.ready:
+            return
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            if self.ready:
+                return
+            try:
+                # Model loading is seconds of blocking work; keep the loop serving.
+                await asyncio.to_thread(self._load)
+            except Exception as e:
+                self.error = e
+                logger.error(f"Loading pneumonia model failed: {e}")
+                raise
+            self.error = None
+
+    async def warm_up(self):
+        """Load the model and run one dummy batch so the first request isn't slow."""
+        await self.ensure_loaded()
+        import numpy as np
+        from .preprocessing import IMAGE_SIZE
+
+        await self.predictor.predict(np.zeros((IMAGE_SIZE[1], IMAGE_SIZE[0], 3), dtype=np.uint8))
+        logger.info(f"Pneumonia model {self.model.version} warmed up")
+
+    @staticmethod
+    def decode(contents: bytes):
+        from .preprocessing import decode_image
+
+        with metrics.PREPROCESS_LATENCY.time():
+            return decode_image(contents)
+
+    async def close(self):
+        if self.predictor is not None:
+            await self.predictor.close()
+
+
+service = PneumoniaService()
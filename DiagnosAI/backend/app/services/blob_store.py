@@ -0,0 +1,233 @@
+import asyncio
+import hashlib
+import logging
+import os
+import tempfile
+import time
+
+from app.core import config
+
+
+logger = logging.getLogger("blob_store")
+
+
+class BlobTooLargeError(Exception):
+    pass
+
+
+async def _spool(chunks, directory: str, max_bytes: int = None):
+    """Write an async byte stream to a temp file, hashing it on the way.
+
+    Returns ``(temp_path, sha256_hex, size)``; only one chunk is ever in memory.
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".part")
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with os.fdopen(fd, "wb") as f:
+            async for chunk in chunks:
+                size += len(chunk)
+                if max_bytes is not None and size > max_bytes:
+                    raise BlobTooLargeError(max_bytes)
+                digest.update(chunk)
+                await asyncio.to_thread(f.write, chunk)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    return tmp_path, digest.hexdigest(), size
+
+
+class LocalBlobStore:
+    """Content-addressed files under ``root``, sharded as ``ab/cd/<sha256>``.
+
+    Identical uploads are stored once: a blob whose digest already exists is
+    simply discarded after hashing.
+    """
+
+    def __init__(self, root: str = None):
+        self.root = root or config.BLOB_STORE_DIR
+        self._tmp = os.path.join(self.root, "tmp")
+
+    def path(self, digest: str) -> str:
+        return os.path.join(self.root, digest[:2], digest[2:4], digest)
+
+    async def put_stream(self, chunks, max_bytes: int = None):
+        """Store a stream of bytes; returns ``(digest, size, deduplicated)``."""
+        # Created on first upload, so importing the app never writes to disk.
+        os.makedirs(self._tmp, exist_ok=True)
+        tmp_path, digest, size = await _spool(chunks, self._tmp, max_bytes)
+        final = self.path(digest)
+        if os.path.exists(final):
+            os.remove(tmp_path)
+            # Fresh mtime: a blob about to be referenced again is not swept as an orphan.
+            os.utime(final)
+            return digest, size, True
+        os.makedirs(os.path.dirname(final), exist_ok=True)
+        os.replace(tmp_path, final)
+        return digest, size, False
+
+    async def exists(self, digest: str) -> bool:
+        return os.path.exists(self.path(digest))
+
+    async def delete(self, digest: str):
+        try:
+            os.remove(self.path(digest))
+        except FileNotFoundError:
+            pass
+
+    async def stored_before(self, cutoff: float):
+        """Digests of blobs last written or reused before ``cutoff`` (a Unix time)."""
+        for directory, subdirs, files in os.walk(self.root):
+            if directory == self.root:
+                subdirs[:] = [d for d in subdirs if d != "tmp"]
+            for name in files:
+                try:
+                    if os.stat(os.path.join(directory, name)).st_mtime < cutoff:
+                        yield name
+                except FileNotFoundError:
+                    continue
+
+    async def age(self, digest: str):
+        try:
+            return time.time() - os.stat(self.path(digest)).st_mtime
+        except FileNotFoundError:
+            return None
+
+    async def iter_range(self, digest: str, start: int = 0, end: int = None, chunk_size: int = None):
+        """Yield bytes ``start..end`` (inclusive) of a blob in ``chunk_size`` pieces."""
+        chunk_size = chunk_size or config.UPLOAD_CHUNK_SIZE
+        with open(self.path(digest), "rb") as f:
+            f.seek(start)
+            remaining = None if end is None else end - start + 1
+            while remaining is None or remaining > 0:
+                size = chunk_size if remaining is None else min(chunk_size, remaining)
+                chunk = await asyncio.to_thread(f.read, size)
+                if not chunk:
+                    return
+                if remaining is not None:
+                    remaining -= len(chunk)
+                yield chunk
+
+
+class S3BlobStore:
+    """Same interface as ``LocalBlobStore`` on an S3-compatible bucket (needs ``boto3``).
+
+    Uploads are hashed while spooling to a local temp file, then sent with
+    boto3's multipart ``upload_file`` unless the digest is already present.
+    """
+
+    def __init__(self, bucket: str = None, prefix: str = None, spool_dir: str = None):
+        import boto3
+
+        self.bucket = bucket or config.BLOB_S3_BUCKET
+        self.prefix = prefix if prefix is not None else config.BLOB_S3_PREFIX
+        self.s3 = boto3.client("s3")
+        self._tmp = spool_dir or tempfile.gettempdir()
+
+    def key(self, digest: str) -> str:
+        return f"{self.prefix}{digest[:2]}/{digest[2:4]}/{digest}"
+
+    async def exists(self, digest: str) -> bool:
+        from botocore.exceptions import ClientError
+
+        try:
+            await asyncio.to_thread(self.s3.head_object, Bucket=self.bucket, Key=self.key(digest))
+            return True
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return False
+            raise
+
+    async def delete(self, digest: str):
+        await asyncio.to_thread(self.s3.delete_object, Bucket=self.bucket, Key=self.key(digest))
+
+    async def stored_before(self, cutoff: float):
+        paginator = self.s3.get_paginator("list_objects_v2")
+        pages = await asyncio.to_thread(lambda: list(paginator.paginate(Bucket=self.bucket, Prefix=self.prefix)))
+        for page in pages:
+            for obj in page.get("Contents", ()):
+                if obj["LastModified"].timestamp() < cutoff:
+                    yield obj["Key"].rsplit("/", 1)[-1]
+
+    async def age(self, digest: str):
+        from botocore.exceptions import ClientError
+
+        try:
+            head = await asyncio.to_thread(self.s3.head_object, Bucket=self.bucket, Key=self.key(digest))
+        except ClientError:
+            return None
+        return time.time() - head["LastModified"].timestamp()
+
+    async def put_stream(self, chunks, max_bytes: int = None):
+        tmp_path, digest, size = await _spool(chunks, self._tmp, max_bytes)
+        try:
+            if await self.exists(digest):
+                # Refresh LastModified so the orphan sweep leaves it alone.
+                key = self.key(digest)
+                await asyncio.to_thread(
+                    self.s3.copy_object, Bucket=self.bucket, Key=key,
+                    CopySource={"Bucket": self.bucket, "Key": key}, MetadataDirective="REPLACE",
+                )
+                return digest, size, True
+            await asyncio.to_thread(self.s3.upload_file, tmp_path, self.bucket, self.key(digest))
+            return digest, size, False
+        finally:
+            os.remove(tmp_path)
+
+    async def iter_range(self, digest: str, start: int = 0, end: int = None, chunk_size: int = None):
+        chunk_size = chunk_size or config.UPLOAD_CHUNK_SIZE
+        byte_range = f"bytes={start}-{'' if end is None else end}"
+        response = await asyncio.to_thread(
+            self.s3.get_object, Bucket=self.bucket, Key=self.key(digest), Range=byte_range
+        )
+        body = response["Body"]
+        try:
+            while True:
+                chunk = await asyncio.to_thread(body.read, chunk_size)
+                if not chunk:
+                    return
+                yield chunk
+        finally:
+            body.close()
+
+
+def get_blob_store():
+    if config.BLOB_STORE == "s3":
+        return S3BlobStore()
+    return LocalBlobStore()
+
+
+async def sweep_orphans(store, min_age: float = None, batch_size: int = 500) -> int:
+    """Delete blobs no ``health_records`` row references; returns how many.
+
+    Uploads never delete blobs themselves: with content addressing, a
+    concurrent upload of the same file may be about to reference it. Only
+    blobs untouched for ``min_age`` seconds (``BLOB_GC_MIN_AGE``) are
+    considered, and each one's age is checked again right before deletion.
+    """
+    from app.db.crud import referenced_digests
+
+    min_age = config.BLOB_GC_MIN_AGE if min_age is None else min_age
+    deleted = 0
+    candidates = []
+
+    async def sweep(digests):
+        nonlocal deleted
+        referenced = await referenced_digests(digests)
+        for digest in digests:
+            if digest in referenced:
+                continue
+            age = await store.age(digest)
+            if age is not None and age >= min_age:
+                await store.delete(digest)
+                deleted += 1
+
+    async for digest in store.stored_before(time.time() - min_age):
+        candidates.append(digest)
+        if len(candidates) >= batch_size:
+            await sweep(candidates)
+            candidates = []
+    if candidates:
+        await sweep(candidates)
+    logger.info(f"Deleted {deleted} orphaned blobs")
+    return deleted
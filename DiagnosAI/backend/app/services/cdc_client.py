@@ -0,0 +1,49 @@
+import asyncio
+import logging
+
+import httpx
+
+from app.core import config
+
+logger = logging.getLogger("cdc_client")
+
+
+class HealthAPIClient:
+    """Searches CDC open datasets (data.cdc.gov) through the Socrata catalog API."""
+
+    def __init__(self, base_url: str = None, timeout: float = 10):
+        self.base_url = base_url or config.CDC_API_URL
+        self.timeout = timeout
+        self._client = None
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(timeout=self.timeout)
+        return self._client
+
+    async def fetch_cdc_data(self, query: str, limit: int = 10, retries: int = 3) -> list:
+        params = {"domains": "data.cdc.gov", "q": query, "limit": limit}
+        for attempt in range(retries):
+            try:
+                response = await self._get_client().get(self.base_url, params=params)
+                response.raise_for_status()
+                break
+            except (httpx.TransportError, httpx.HTTPStatusError) as e:
+                logger.error(f"CDC API request failed (attempt {attempt + 1}): {e}")
+                if attempt == retries - 1:
+                    raise
+                await asyncio.sleep(2 ** attempt)
+        return [
+            {
+                "name": item.get("resource", {}).get("name"),
+                "description": item.get("resource", {}).get("description"),
+                "updated_at": item.get("resource", {}).get("updatedAt"),
+                "link": item.get("link"),
+            }
+            for item in response.json().get("results", [])
+        ]
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
@@ -1,8 +1,14 @@
 import httpx
 import asyncio
+import json
 import logging
 import os
+import random
+import time
+from email.utils import parsedate_to_datetime
 from dotenv import load_dotenv
+from app.core import config
+from app.core import metrics
 
 load_dotenv()
 
@@ -10,29 +16,249 @@ GEMINI_API_URL = os.getenv(
     "GEMINI_API_URL",
     "https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash:generateContent"
 )
+GEMINI_STREAM_API_URL = os.getenv(
+    "GEMINI_STREAM_API_URL",
+    GEMINI_API_URL.replace(":generateContent", ":streamGenerateContent"),
+)
 API_KEY = os.getenv("GEMINI_API_KEY")
 
 logger = logging.getLogger("gemini_client")
 
 
+class CircuitOpenError(Exception):
+    """Raised without calling Gemini while the circuit breaker is open."""
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"Gemini circuit open; retry in {retry_after:.0f}s")
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """Opens after ``failure_threshold`` consecutive upstream failures.
+
+    While open every call fails fast. After ``reset_timeout`` seconds a single
+    probe is let through; its outcome closes or re-opens the circuit.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._probe_started = None
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def before_call(self):
+        state = self.state
+        if state == "closed":
+            return
+        now = time.monotonic()
+        # A probe that never reported back (e.g. cancelled) doesn't block forever.
+        probe_stale = self._probe_started is None or now - self._probe_started >= self.reset_timeout
+        if state == "half_open" and probe_stale:
+            self._probe_started = now
+            return
+        raise CircuitOpenError(max(0.0, self.reset_timeout - (now - self.opened_at)))
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self._probe_started = None
+
+    def record_failure(self):
+        self.failures += 1
+        if self._probe_started is not None or self.failures >= self.failure_threshold:
+            if self.opened_at is None:
+                logger.warning(f"Gemini circuit opened after {self.failures} consecutive failures")
+            self.opened_at = time.monotonic()
+        self._probe_started = None
+
+
+breaker = CircuitBreaker(config.GEMINI_BREAKER_THRESHOLD, config.GEMINI_BREAKER_RESET)
+_client = None
+_semaphore = None
+
+
+def _new_client() -> httpx.AsyncClient:
+    limits = httpx.Limits(
+        max_connections=config.GEMINI_MAX_CONNECTIONS,
+        max_keepalive_connections=config.GEMINI_MAX_CONNECTIONS,
+        keepalive_expiry=60,
+    )
+    kwargs = dict(limits=limits, timeout=httpx.Timeout(config.GEMINI_TIMEOUT))
+    if config.GEMINI_HTTP2:
+        try:
+            return httpx.AsyncClient(http2=True, **kwargs)
+        except ImportError:
+            logger.warning("HTTP/2 requested but the 'h2' package is missing; using HTTP/1.1")
+    return httpx.AsyncClient(**kwargs)
+
+
+async def startup():
+    """Create the process-wide pooled client; called from the app lifespan."""
+    global _client, _semaphore
+    if _client is None:
+        _client = _new_client()
+    if _semaphore is None:
+        _semaphore = asyncio.Semaphore(config.GEMINI_MAX_CONCURRENCY)
+
+
+async def shutdown():
+    global _client, _semaphore
+    if _client is not None:
+        await _client.aclose()
+    _client = None
+    _semaphore = None
+
+
+async def _get_client():
+    # Scripts that never run the lifespan still get a (lazily created) pool.
+    if _client is None or _semaphore is None:
+        await startup()
+    return _client, _semaphore
+
+
+def candidate_text(candidate) -> str:
+    """Concatenate the text parts of a Gemini candidate (or a bare string)."""
+    if isinstance(candidate, str):
+        return candidate
+    if not isinstance(candidate, dict):
+        return ""
+    parts = candidate.get("content", {}).get("parts") if "content" in candidate else candidate.get("parts")
+    if parts and isinstance(parts, list):
+        return "".join(part.get("text", "") for part in parts if isinstance(part, dict))
+    return candidate.get("text", "")
+
+
+def _headers():
+    return {
+        "x-goog-api-key": API_KEY,
+        "Content-Type": "application/json",
+    }
+
+
+def _is_retryable(exc: Exception) -> bool:
+    if isinstance(exc, httpx.HTTPStatusError):
+        return exc.response.status_code == 429 or exc.response.status_code >= 500
+    return isinstance(exc, httpx.TransportError)
+
+
+def _retry_after(exc: Exception):
+    if not isinstance(exc, httpx.HTTPStatusError):
+        return None
+    value = exc.response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def _backoff(attempt: int, exc: Exception) -> float:
+    # Full jitter spreads retries from concurrent callers instead of having
+    # them all hit a recovering upstream at the same instant.
+    delay = random.uniform(0, min(config.GEMINI_MAX_BACKOFF, 2 ** attempt))
+    retry_after = _retry_after(exc)
+    if retry_after is not None:
+        delay = max(delay, min(retry_after, config.GEMINI_MAX_BACKOFF))
+    return delay
+
+
 async def get_diagnosis_with_history(contents: list, retries=3) -> dict:
     payload = {
         "contents": contents
     }
-    headers = {
-        "x-goog-api-key": API_KEY,
-        "Content-Type": "application/json",
-    }
+    headers = _headers()
+    client, semaphore = await _get_client()
+
+    for attempt in range(retries):
+        try:
+            breaker.before_call()
+        except CircuitOpenError:
+            metrics.GEMINI_REJECTED.inc()
+            raise
+        started = time.perf_counter()
+        try:
+            # Only the request itself holds a concurrency slot, not the backoff sleep.
+            async with semaphore:
+                response = await client.post(GEMINI_API_URL, json=payload, headers=headers)
+            response.raise_for_status()
+            data = response.json()
+        except Exception as e:
+            metrics.GEMINI_LATENCY.labels("generate", "error").observe(time.perf_counter() - started)
+            logger.error(f"Gemini API request failed (attempt {attempt + 1}): {str(e)}")
+            if not _is_retryable(e):
+                # Upstream answered (e.g. a 400 for a bad prompt); it isn't degraded.
+                breaker.record_success()
+                raise
+            breaker.record_failure()
+            if attempt == retries - 1:
+                raise
+            metrics.GEMINI_RETRIES.inc()
+            await asyncio.sleep(_backoff(attempt, e))
+            continue
+        metrics.GEMINI_LATENCY.labels("generate", "ok").observe(time.perf_counter() - started)
+        breaker.record_success()
+        return data.get("candidates", [{}])[0]  # return dict first candidate
 
-    async with httpx.AsyncClient() as client:
-        for attempt in range(retries):
-            try:
-                response = await client.post(GEMINI_API_URL, json=payload, headers=headers, timeout=10)
+
+async def stream_diagnosis_with_history(contents: list):
+    """Yield the first candidate of each chunk from ``streamGenerateContent``.
+
+    Uses ``alt=sse`` so chunks arrive as ``data: {...}`` lines. No retries:
+    once text has been relayed to a client the call can't be replayed.
+    """
+    payload = {
+        "contents": contents
+    }
+    client, semaphore = await _get_client()
+    try:
+        breaker.before_call()
+    except CircuitOpenError:
+        metrics.GEMINI_REJECTED.inc()
+        raise
+    started = time.perf_counter()
+    outcome = "error"
+    timeout = httpx.Timeout(config.GEMINI_TIMEOUT, read=60)
+    async with semaphore:
+        try:
+            async with client.stream(
+                "POST", GEMINI_STREAM_API_URL, params={"alt": "sse"}, json=payload,
+                headers=_headers(), timeout=timeout,
+            ) as response:
                 response.raise_for_status()
-                data = response.json()
-                return data.get("candidates", [{}])[0]  # return dict first candidate
-            except Exception as e:
-                logger.error(f"Gemini API request failed (attempt {attempt + 1}): {str(e)}")
-                if attempt == retries - 1:
-                    raise
-                await asyncio.sleep(2 ** attempt)
+                breaker.record_success()
+                async for line in response.aiter_lines():
+                    if not line.startswith("data:"):
+                        continue
+                    data = line[len("data:"):].strip()
+                    if not data:
+                        continue
+                    try:
+                        chunk = json.loads(data)
+                    except ValueError:
+                        logger.warning(f"Skipping malformed Gemini stream chunk: {data[:200]}")
+                        continue
+                    candidates = chunk.get("candidates") or [{}]
+                    yield candidates[0]
+            outcome = "ok"
+        except Exception as e:
+            if _is_retryable(e):
+                breaker.record_failure()
+            elif isinstance(e, httpx.HTTPStatusError):
+                breaker.record_success()
+            raise
+        finally:
+            metrics.GEMINI_LATENCY.labels("stream", outcome).observe(time.perf_counter() - started)
@@ -0,0 +1,219 @@
+import heapq
+import logging
+import math
+import re
+from collections import Counter, defaultdict
+
+from app.services.nlp_utils import analyze
+
+logger = logging.getLogger("health_search")
+
+FIELDS = ("disease_name", "symptoms", "prevention", "treatment")
+# A term in the disease name counts as much as three in the body text.
+FIELD_WEIGHTS = {"disease_name": 3, "symptoms": 2, "prevention": 1, "treatment": 1}
+
+
+class BM25Index:
+    """In-memory inverted index with Okapi BM25 ranking.
+
+    Documents can be added, replaced and removed one at a time; postings,
+    document lengths and the average length are kept up to date so there is
+    never a full rebuild on change.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings = defaultdict(dict)  # term -> {doc_id: term frequency}
+        self.doc_terms = {}  # doc_id -> Counter, needed to remove a document
+        self.doc_len = {}
+        self.docs = {}
+        self._total_len = 0
+
+    def __len__(self):
+        return len(self.doc_len)
+
+    def _weighted_terms(self, doc: dict) -> Counter:
+        terms = Counter()
+        for field in FIELDS:
+            for term in analyze(doc.get(field) or ""):
+                terms[term] += FIELD_WEIGHTS[field]
+        return terms
+
+    def add(self, doc_id, doc: dict):
+        if doc_id in self.doc_len:
+            self.remove(doc_id)
+        terms = self._weighted_terms(doc)
+        for term, tf in terms.items():
+            self.postings[term][doc_id] = tf
+        self.doc_terms[doc_id] = terms
+        self.doc_len[doc_id] = sum(terms.values())
+        self._total_len += self.doc_len[doc_id]
+        self.docs[doc_id] = doc
+
+    def remove(self, doc_id):
+        terms = self.doc_terms.pop(doc_id, None)
+        if terms is None:
+            return
+        for term in terms:
+            postings = self.postings[term]
+            postings.pop(doc_id, None)
+            if not postings:
+                del self.postings[term]
+        self._total_len -= self.doc_len.pop(doc_id)
+        self.docs.pop(doc_id, None)
+
+    def clear(self):
+        self.postings.clear()
+        self.doc_terms.clear()
+        self.doc_len.clear()
+        self.docs.clear()
+        self._total_len = 0
+
+    def search(self, query: str, limit: int = 10):
+        """``[(doc_id, score), ...]`` best first."""
+        n = len(self.doc_len)
+        if not n:
+            return []
+        avgdl = self._total_len / n or 1.0
+        scores = defaultdict(float)
+        for term in set(analyze(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+            for doc_id, tf in postings.items():
+                norm = self.k1 * (1 - self.b + self.b * self.doc_len[doc_id] / avgdl)
+                scores[doc_id] += idf * tf * (self.k1 + 1) / (tf + norm)
+        return heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+
+
+def snippet(doc: dict, query: str, max_chars: int = 200) -> str:
+    """The sentence from the doc's text fields that shares the most terms with the query."""
+    wanted = set(analyze(query))
+    best, best_score = "", -1
+    for field in ("symptoms", "treatment", "prevention"):
+        for sentence in re.split(r"(?<=[.!?;])\s+|\n+", doc.get(field) or ""):
+            score = len(wanted.intersection(analyze(sentence)))
+            if sentence.strip() and score > best_score:
+                best, best_score = sentence.strip(), score
+    return best if len(best) <= max_chars else best[: max_chars - 1].rstrip() + "…"
+
+
+def row_to_doc(row) -> dict:
+    return {field: getattr(row, field) for field in FIELDS}
+
+
+class HealthSearch:
+    """The ``health_info`` table, indexed for local symptom/disease lookups.
+
+    ``load()`` builds the index once; afterwards committed ORM changes to
+    ``HealthInfo`` rows are applied one document at a time (see
+    ``install_listeners``). ``refresh()`` rebuilds from the table, which picks
+    up changes made by other processes.
+    """
+
+    def __init__(self):
+        self.index = BM25Index()
+        self.loaded = False
+        # Changes committed while a load is reading the table, replayed onto
+        # the new index so the swap can't undo them.
+        self._during_load = None
+
+    async def load(self):
+        from app.db.crud import list_health_info
+
+        self._during_load = {}
+        try:
+            rows = await list_health_info()
+            index = BM25Index()
+            for row in rows:
+                index.add(row.id, row_to_doc(row))
+            for doc_id, doc in self._during_load.items():
+                if doc is None:
+                    index.remove(doc_id)
+                else:
+                    index.add(doc_id, doc)
+        finally:
+            self._during_load = None
+        self.index = index
+        self.loaded = True
+        logger.info(f"Indexed {len(index)} health_info rows")
+
+    refresh = load
+
+    def upsert(self, doc_id: int, doc: dict):
+        self.index.add(doc_id, doc)
+        if self._during_load is not None:
+            self._during_load[doc_id] = doc
+
+    def delete(self, doc_id: int):
+        self.index.remove(doc_id)
+        if self._during_load is not None:
+            self._during_load[doc_id] = None
+
+    def search(self, query: str, limit: int = 10):
+        results = []
+        for doc_id, score in self.index.search(query, limit):
+            doc = self.index.docs[doc_id]
+            results.append({
+                "id": doc_id,
+                "disease_name": doc["disease_name"],
+                "score": round(score, 4),
+                "snippet": snippet(doc, query),
+            })
+        return results
+
+    def grounding(self, query: str, limit: int = 3, min_score: float = 1.0) -> str:
+        """Reference notes for a prompt, or ``""`` when nothing relevant is indexed."""
+        lines = []
+        for doc_id, score in self.index.search(query, limit):
+            if score < min_score:
+                break
+            doc = self.index.docs[doc_id]
+            parts = [f"{label}: {doc[field]}" for field, label in (
+                ("symptoms", "Symptoms"), ("prevention", "Prevention"), ("treatment", "Treatment"),
+            ) if doc.get(field)]
+            lines.append(f"- {doc['disease_name']}. " + " ".join(parts))
+        return "\n".join(lines)
+
+
+def install_listeners(search: "HealthSearch"):
+    """Apply committed ``HealthInfo`` inserts, updates and deletes to the index.
+
+    Changes are collected per ORM session at flush and applied only after the
+    transaction commits, so a rollback never leaves the index ahead of the table.
+    """
+    from sqlalchemy import event
+    from sqlalchemy.orm import Session as OrmSession, object_session
+
+    from app.models.health_info import HealthInfo
+
+    def pending(target):
+        return object_session(target).info.setdefault("health_search_pending", {})
+
+    def on_upsert(mapper, connection, target):
+        pending(target)[target.id] = row_to_doc(target)
+
+    def on_delete(mapper, connection, target):
+        pending(target)[target.id] = None
+
+    event.listen(HealthInfo, "after_insert", on_upsert)
+    event.listen(HealthInfo, "after_update", on_upsert)
+    event.listen(HealthInfo, "after_delete", on_delete)
+
+    @event.listens_for(OrmSession, "after_commit")
+    def apply(session):
+        for doc_id, doc in session.info.pop("health_search_pending", {}).items():
+            if doc is None:
+                search.delete(doc_id)
+            else:
+                search.upsert(doc_id, doc)
+
+    @event.listens_for(OrmSession, "after_rollback")
+    def discard(session):
+        session.info.pop("health_search_pending", None)
+
+
+health_search = HealthSearch()
+install_listeners(health_search)
@@ -0,0 +1,121 @@
+import logging
+import re
+
+from app.core import config
+from app.core.cache import TTLCache
+from app.services.gemini_client import candidate_text, get_diagnosis_with_history
+
+logger = logging.getLogger("history")
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s")
+
+
+def estimate_tokens(text: str) -> int:
+    # ~4 characters per token is close enough for budgeting English text.
+    return len(text) // 4 + 1
+
+
+def _truncate_tokens(text: str, tokens: int) -> str:
+    limit = tokens * 4
+    return text if len(text) <= limit else text[:limit].rsplit(" ", 1)[0] + "..."
+
+
+def _keep_recent(summary: str, tokens: int) -> str:
+    """Fit a summary to ``tokens`` by dropping its oldest lines first.
+
+    New turns are appended at the end, so cutting the tail would freeze the
+    summary on the earliest turns once it is full.
+    """
+    limit = tokens * 4
+    lines = summary.split("\n")
+    while len(lines) > 1 and len("\n".join(lines)) > limit:
+        lines.pop(0)
+    summary = "\n".join(lines)
+    if len(summary) <= limit:
+        return summary
+    return "..." + summary[-limit:].split(" ", 1)[-1]
+
+
+async def extractive_summary(previous: str, dropped: list) -> str:
+    lines = [previous] if previous else []
+    for role, text in dropped:
+        first_sentence = _SENTENCE_END.split(text.strip(), 1)[0]
+        lines.append(f"{'Patient' if role == 'user' else 'Doctor'}: {_truncate_tokens(first_sentence, 60)}")
+    return "\n".join(lines)
+
+
+async def llm_summary(previous: str, dropped: list) -> str:
+    transcript = "\n".join(f"{'Patient' if role == 'user' else 'Doctor'}: {text}" for role, text in dropped)
+    prompt = (
+        "Update this running summary of a doctor-patient conversation with the new turns. "
+        "Keep symptoms, durations, medications and advice given; stay under "
+        f"{config.HISTORY_SUMMARY_TOKENS * 3 // 4} words.\n\n"
+        f"Summary so far:\n{previous or '(none)'}\n\nNew turns:\n{transcript}"
+    )
+    candidate = await get_diagnosis_with_history([{"role": "user", "parts": [{"text": prompt}]}])
+    return candidate_text(candidate) or previous
+
+
+SUMMARIZERS = {"extractive": extractive_summary, "llm": llm_summary}
+
+
+class HistoryManager:
+    """Builds a token-budgeted window of a session's history.
+
+    The newest turns that fit in ``budget_tokens`` are sent verbatim. Older
+    turns are folded into a rolling summary that is cached per session and
+    only ever extended with turns that newly fell out of the window.
+    """
+
+    def __init__(self, budget_tokens: int, summary_tokens: int, summarizer=None, cache_size: int = 10000):
+        self.budget_tokens = budget_tokens
+        self.summary_tokens = summary_tokens
+        self.summarizer = summarizer
+        # session_id -> (id of the last message folded into the summary, summary)
+        self._summaries = TTLCache(maxsize=cache_size, ttl=6 * 3600)
+
+    def _window(self, turns: list):
+        used = 0
+        start = len(turns)
+        for index in range(len(turns) - 1, -1, -1):
+            cost = estimate_tokens(turns[index][2])
+            if used + cost > self.budget_tokens:
+                break
+            used += cost
+            start = index
+        # Gemini expects the conversation to open with a user turn.
+        while start < len(turns) and turns[start][1] != "user":
+            start += 1
+        return turns[:start], turns[start:]
+
+    async def _summary_for(self, session_id: int, older: list) -> str:
+        if self.summarizer is None or not older:
+            return ""
+        covered_id, summary = self._summaries.get(session_id, (None, ""))
+        dropped = [(role, text) for msg_id, role, text in older if covered_id is None or msg_id > covered_id]
+        if dropped:
+            try:
+                summary = await self.summarizer(summary, dropped)
+            except Exception as e:
+                logger.warning(f"Summarizing history for session {session_id} failed: {e}")
+                return summary
+            summary = _keep_recent(summary, self.summary_tokens)
+            self._summaries.set(session_id, (older[-1][0], summary))
+        return summary
+
+    async def build(self, session_id: int, messages) -> tuple:
+        """Return ``(contents, summary)`` for the prior ``messages`` of a session."""
+        turns = [(m.id, m.role, m.content or "") for m in messages]
+        older, recent = self._window(turns)
+        contents = [{"role": role, "parts": [{"text": text}]} for _, role, text in recent]
+        return contents, await self._summary_for(session_id, older)
+
+    def forget(self, session_id: int):
+        self._summaries.delete(session_id)
+
+
+history_manager = HistoryManager(
+    config.HISTORY_TOKEN_BUDGET,
+    config.HISTORY_SUMMARY_TOKENS,
+    summarizer=SUMMARIZERS.get(config.HISTORY_SUMMARY),
+)
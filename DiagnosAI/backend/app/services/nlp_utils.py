@@ -0,0 +1,55 @@
+import re
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+STOPWORDS = frozenset("""
+a about above after again against all am an and any are as at be because been before being below between
+both but by can could did do does doing down during each few for from further had has have having he her
+here hers herself him himself his how i if in into is it its itself just me more most my myself no nor not
+now of off on once only or other our ours ourselves out over own same she should so some such than that the
+their theirs them themselves then there these they this those through to too under until up very was we
+were what when where which while who whom why will with would you your yours yourself yourselves
+""".split())
+
+# Longest suffixes first; each needs a stem of at least ``min_stem`` letters left.
+_SUFFIXES = (
+    ("ational", "ate"), ("ization", "ize"), ("fulness", "ful"), ("ousness", "ous"), ("iveness", "ive"),
+    ("tional", "tion"), ("ements", ""), ("ement", ""), ("ments", ""), ("ment", ""),
+    ("ities", ""), ("ity", ""), ("ness", ""), ("ings", ""), ("ing", ""),
+    ("ies", "y"), ("ied", "y"), ("edly", ""), ("ed", ""), ("ly", ""),
+    ("sses", "ss"), ("es", ""), ("s", ""),
+)
+
+
+def tokenize(text: str) -> list:
+    """Lower-cased alphanumeric tokens."""
+    return _TOKEN.findall((text or "").lower())
+
+
+def stem(word: str, min_stem: int = 3) -> str:
+    """Light suffix-stripping stemmer (a small subset of Porter's rules).
+
+    Good enough to fold ``coughing``/``coughs``/``coughed`` and
+    ``infections``/``infection`` together; leaves short words and words
+    ending in ``ss``/``us``/``is`` (``loss``, ``virus``, ``diagnosis``) alone.
+    """
+    if len(word) <= min_stem or word.isdigit():
+        return word
+    for suffix, replacement in _SUFFIXES:
+        if suffix in ("es", "s") and word.endswith(("ss", "us", "is")):
+            break
+        if word.endswith(suffix) and len(word) - len(suffix) >= min_stem:
+            word = word[: -len(suffix)] + replacement
+            # "stopped" -> "stopp" -> "stop"
+            if replacement == "" and len(word) > min_stem and word[-1] == word[-2] and word[-1] not in "lsz":
+                word = word[:-1]
+            break
+    # "ache"/"aches", "rinse"/"rinsed" end up the same.
+    if word.endswith("e") and len(word) > min_stem:
+        word = word[:-1]
+    return word
+
+
+def analyze(text: str) -> list:
+    """Tokens with stopwords removed and stemmed; used for both indexing and queries."""
+    return [stem(token) for token in tokenize(text) if token not in STOPWORDS]
@@ -0,0 +1,217 @@
+import asyncio
+import hashlib
+import json
+import logging
+import random
+import re
+from collections import defaultdict
+
+from app.core import config
+from app.core.cache import TTLCache, register_cache
+from app.services.gemini_client import GEMINI_API_URL, candidate_text
+
+logger = logging.getLogger("response_cache")
+
+_WORD = re.compile(r"[a-z0-9]+")
+_MERSENNE = (1 << 61) - 1
+
+
+def normalize_text(text: str) -> str:
+    return " ".join(_WORD.findall((text or "").lower()))
+
+
+def contents_key(contents: list, model_version: str) -> str:
+    """Hash of a Gemini ``contents`` payload, insensitive to case, spacing and punctuation."""
+    normalized = [
+        [turn.get("role"), [normalize_text(part.get("text", "")) for part in turn.get("parts", [])]]
+        for turn in contents
+    ]
+    raw = json.dumps([model_version, normalized], separators=(",", ":"))
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+class MinHasher:
+    """MinHash signatures over word shingles, bucketed for LSH.
+
+    ``num_perm = bands * rows``; two texts with Jaccard similarity ``s``
+    share at least one band with probability ``1 - (1 - s**rows)**bands``.
+    """
+
+    def __init__(self, bands: int = 16, rows: int = 4, shingle: int = 2, seed: int = 1):
+        self.bands = bands
+        self.rows = rows
+        self.shingle = shingle
+        rng = random.Random(seed)
+        self._perms = [
+            (rng.randrange(1, _MERSENNE), rng.randrange(0, _MERSENNE)) for _ in range(bands * rows)
+        ]
+
+    def shingles(self, text: str) -> set:
+        words = normalize_text(text).split()
+        if len(words) < self.shingle:
+            return {" ".join(words)}
+        return {" ".join(words[i:i + self.shingle]) for i in range(len(words) - self.shingle + 1)}
+
+    def signature(self, text: str) -> tuple:
+        hashes = [
+            int.from_bytes(hashlib.blake2b(s.encode(), digest_size=8).digest(), "big")
+            for s in self.shingles(text)
+        ]
+        return tuple(min((a * h + b) % _MERSENNE for h in hashes) for a, b in self._perms)
+
+    def band_keys(self, signature: tuple):
+        for band in range(self.bands):
+            yield band, signature[band * self.rows:(band + 1) * self.rows]
+
+    @staticmethod
+    def similarity(a: tuple, b: tuple) -> float:
+        return sum(1 for x, y in zip(a, b) if x == y) / len(a)
+
+
+class ResponseCache:
+    """Caches Gemini candidates in front of ``get_diagnosis_with_history``.
+
+    Exact hits are keyed on the normalized ``contents`` plus the model
+    version, so a model change invalidates everything. When ``near_threshold``
+    is set, first-turn prompts (no history, so the reply depends on the
+    prompt alone) can also be answered from a cached prompt whose estimated
+    Jaccard similarity is at least the threshold.
+    """
+
+    def __init__(self, model_version: str, maxsize: int = 2048, ttl: float = 3600,
+                 near_threshold: float = None):
+        self.model_version = model_version
+        self.local = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.near_threshold = near_threshold
+        self.hasher = MinHasher() if near_threshold else None
+        self._signatures = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._buckets = defaultdict(set)
+        self._indexed = 0
+        self._inflight = {}
+        self.exact_hits = 0
+        self.near_hits = 0
+        self.misses = 0
+
+    def _near_lookup(self, signature: tuple):
+        best_key, best_score = None, 0.0
+        for band_key in self.hasher.band_keys(signature):
+            bucket = self._buckets.get(band_key)
+            if not bucket:
+                continue
+            for key in list(bucket):
+                other = self._signatures.get(key)
+                if other is None or key not in self.local:
+                    # Evicted or expired; drop it from the index lazily.
+                    bucket.discard(key)
+                    continue
+                score = self.hasher.similarity(signature, other)
+                if score > best_score:
+                    best_key, best_score = key, score
+            if not bucket:
+                del self._buckets[band_key]
+        if best_key is not None and best_score >= self.near_threshold:
+            return best_key
+        return None
+
+    def lookup(self, contents: list, first_turn_prompt: str = None):
+        """Returns ``(candidate, "exact" | "near")`` or ``(None, None)``."""
+        key = contents_key(contents, self.model_version)
+        if key in self.local:
+            self.exact_hits += 1
+            return self.local.get(key), "exact"
+        if self.hasher is not None and first_turn_prompt:
+            near_key = self._near_lookup(self.hasher.signature(first_turn_prompt))
+            if near_key is not None:
+                self.near_hits += 1
+                return self.local.get(near_key), "near"
+        self.misses += 1
+        return None, None
+
+    def store(self, contents: list, candidate: dict, first_turn_prompt: str = None):
+        # Blocked or empty replies aren't worth replaying.
+        if self.local.maxsize <= 0 or not candidate_text(candidate or {}):
+            return
+        key = contents_key(contents, self.model_version)
+        self.local.set(key, candidate)
+        if self.hasher is not None and first_turn_prompt:
+            signature = self.hasher.signature(first_turn_prompt)
+            self._signatures.set(key, signature)
+            for band_key in self.hasher.band_keys(signature):
+                self._buckets[band_key].add(key)
+            self._indexed += 1
+            if self._indexed > 2 * self.local.maxsize:
+                self._reindex()
+
+    def _reindex(self):
+        # Evicted keys are only pruned from buckets when a lookup touches them;
+        # rebuild from the live signatures now and then to bound the index.
+        self._buckets.clear()
+        self._indexed = 0
+        for key, signature in self._signatures.items():
+            if key in self.local:
+                for band_key in self.hasher.band_keys(signature):
+                    self._buckets[band_key].add(key)
+                self._indexed += 1
+
+    async def get_or_fetch(self, contents: list, fetch, first_turn_prompt: str = None):
+        """Cached candidate, or ``await fetch(contents)``; identical misses share one call.
+
+        Returns ``(candidate, source)`` with source ``"exact"``, ``"near"`` or ``"origin"``.
+        """
+        candidate, source = self.lookup(contents, first_turn_prompt)
+        if candidate is not None:
+            return candidate, source
+        key = contents_key(contents, self.model_version)
+        task = self._inflight.get(key)
+        if task is None:
+            async def load():
+                result = await fetch(contents)
+                self.store(contents, result, first_turn_prompt)
+                return result
+
+            # Shielded so a caller disconnecting doesn't cancel the call the
+            # others are waiting on (or lose the result for the cache).
+            task = asyncio.ensure_future(load())
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return await asyncio.shield(task), "origin"
+
+    def invalidate(self, model_version: str = None):
+        """Drop everything; optionally switch to a new model version."""
+        if model_version is not None:
+            self.model_version = model_version
+        self.local.clear()
+        self._signatures.clear()
+        self._buckets.clear()
+        self._indexed = 0
+
+    def stats(self) -> dict:
+        hits = self.exact_hits + self.near_hits
+        lookups = hits + self.misses
+        return {
+            "model_version": self.model_version,
+            "size": len(self.local),
+            "maxsize": self.local.maxsize,
+            "hits": hits,
+            "exact_hits": self.exact_hits,
+            "near_hits": self.near_hits,
+            "misses": self.misses,
+            "hit_ratio": hits / lookups if lookups else 0.0,
+            "near_threshold": self.near_threshold,
+        }
+
+
+def default_model_version() -> str:
+    """``GEMINI_MODEL_VERSION``, else the model name in the Gemini endpoint URL."""
+    if config.GEMINI_MODEL_VERSION:
+        return config.GEMINI_MODEL_VERSION
+    match = re.search(r"/models/([^/:]+)", GEMINI_API_URL)
+    return match.group(1) if match else GEMINI_API_URL
+
+
+response_cache = register_cache("gemini_responses", ResponseCache(
+    default_model_version(),
+    maxsize=config.GEMINI_CACHE_SIZE,
+    ttl=config.GEMINI_CACHE_TTL,
+    near_threshold=config.GEMINI_CACHE_NEAR_THRESHOLD if config.GEMINI_CACHE_NEAR_DUP else None,
+))
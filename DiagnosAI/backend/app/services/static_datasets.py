@@ -0,0 +1,124 @@
+import gzip
+import hashlib
+import json
+import logging
+import os
+import time
+
+from fastapi import Request, Response
+
+from app.core import config
+
+logger = logging.getLogger("static_datasets")
+
+try:
+    import brotli
+except ImportError:  # optional: br bodies are skipped without it
+    brotli = None
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # Weak comparison, as RFC 9110 requires for If-None-Match.
+    candidates = [tag.strip() for tag in header.split(",")]
+    return any(tag.removeprefix("W/") == etag for tag in candidates)
+
+
+def _accepted_encodings(header: str) -> set:
+    accepted = set()
+    for item in (header or "").split(","):
+        name, *params = [part.strip() for part in item.split(";")]
+        q = 1.0
+        for param in params:
+            key, _, value = param.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if name and q > 0:
+            accepted.add(name.lower())
+    return accepted
+
+
+class _Version:
+    """One loaded revision of a dataset: the encoded bodies and their ETag."""
+
+    def __init__(self, data, mtime_ns: int, size: int):
+        self.data = data
+        self.mtime_ns = mtime_ns
+        self.size = size
+        self.body = json.dumps(data, separators=(",", ":")).encode()
+        self.etag = '"' + hashlib.sha256(self.body).hexdigest()[:32] + '"'
+        self.bodies = {"identity": self.body, "gzip": gzip.compress(self.body, compresslevel=9, mtime=0)}
+        if brotli is not None:
+            self.bodies["br"] = brotli.compress(self.body, quality=11)
+
+
+class StaticDataset:
+    """A JSON file served from memory, revalidated by ETag.
+
+    The file is parsed and validated once and kept as pre-serialized
+    identity/gzip/brotli bodies. Its mtime is checked at most every
+    ``check_interval`` seconds; a changed file is reloaded, and a file that
+    fails to parse or validate is logged and the previous version kept.
+    """
+
+    def __init__(self, path: str, validate=None, check_interval: float = None, max_age: int = None):
+        self.path = path
+        self.validate = validate
+        self.check_interval = config.STATIC_DATASET_CHECK_INTERVAL if check_interval is None else check_interval
+        self.max_age = config.STATIC_DATASET_MAX_AGE if max_age is None else max_age
+        self._version = None
+        self._checked_at = 0.0
+
+    def _load(self, stat) -> _Version:
+        with open(self.path, "rb") as f:
+            data = json.loads(f.read())
+        if self.validate is not None:
+            self.validate(data)
+        version = _Version(data, stat.st_mtime_ns, stat.st_size)
+        logger.info(f"Loaded {self.path} ({len(version.body)} bytes, etag {version.etag})")
+        return version
+
+    def current(self) -> _Version:
+        now = time.monotonic()
+        if self._version is not None and now - self._checked_at < self.check_interval:
+            return self._version
+        self._checked_at = now
+        version = self._version
+        try:
+            stat = os.stat(self.path)
+        except OSError as e:
+            # Deleted or mid-replace: keep serving what's in memory.
+            if version is None:
+                raise
+            logger.warning(f"Keeping previous {self.path}: {e}")
+            return version
+        if version is None or (stat.st_mtime_ns, stat.st_size) != (version.mtime_ns, version.size):
+            try:
+                self._version = self._load(stat)
+            except Exception as e:
+                if version is None:
+                    raise
+                logger.error(f"Keeping previous {self.path}: reload failed: {e}")
+        return self._version
+
+    def response(self, request: Request) -> Response:
+        version = self.current()
+        headers = {
+            "ETag": version.etag,
+            "Cache-Control": f"public, max-age={self.max_age}, must-revalidate",
+            "Vary": "Accept-Encoding",
+        }
+        if _etag_matches(request.headers.get("if-none-match"), version.etag):
+            return Response(status_code=304, headers=headers)
+        accepted = _accepted_encodings(request.headers.get("accept-encoding"))
+        for encoding in ("br", "gzip"):
+            if (encoding in accepted or "*" in accepted) and encoding in version.bodies:
+                headers["Content-Encoding"] = encoding
+                return Response(version.bodies[encoding], media_type="application/json", headers=headers)
+        return Response(version.body, media_type="application/json", headers=headers)
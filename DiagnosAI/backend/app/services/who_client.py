@@ -1,54 +1,173 @@
-import requests
-
-def fetch_countries():
-    url = "https://ghoapi.azureedge.net/api/DIMENSION/COUNTRY/DimensionValues"
-    response = requests.get(url)
-    response.raise_for_status()
-    data = response.json()
-    countries = [(item["Code"], item["Title"]) for item in data["value"]]
-    return countries
-
-def fetch_indicators_for_country(country_code):
-    url = f"https://ghoapi.azureedge.net/api/GHO?filter=SpatialDim eq '{country_code}'"
-    response = requests.get(url)
-    response.raise_for_status()
-    data = response.json()
-    return data.get("value", [])
-
-def interactive_who_explorer():
+import argparse
+import asyncio
+import logging
+
+import httpx
+
+from app.core import config
+
+logger = logging.getLogger("who_client")
+
+
+class WHOClient:
+    """Async client for the WHO Global Health Observatory OData API.
+
+    One pooled connection set is shared by every call, result sets are paged
+    with ``$top``/``$skip``, and multi-country fetches run with bounded
+    concurrency so the public API isn't hammered.
+    """
+
+    def __init__(self, base_url: str = None, page_size: int = None, concurrency: int = None):
+        self.base_url = (base_url or config.WHO_GHO_API_URL).rstrip("/")
+        self.page_size = page_size or config.WHO_PAGE_SIZE
+        self._semaphore = asyncio.Semaphore(concurrency or config.WHO_CONCURRENCY)
+        self._client = httpx.AsyncClient(
+            timeout=httpx.Timeout(30),
+            limits=httpx.Limits(max_connections=concurrency or config.WHO_CONCURRENCY),
+        )
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.aclose()
+
+    async def aclose(self):
+        await self._client.aclose()
+
+    async def _get_json(self, url: str, params: dict = None, retries: int = 3) -> dict:
+        for attempt in range(retries):
+            try:
+                async with self._semaphore:
+                    response = await self._client.get(url, params=params)
+                response.raise_for_status()
+                return response.json()
+            except (httpx.TransportError, httpx.HTTPStatusError) as e:
+                retryable = not isinstance(e, httpx.HTTPStatusError) or e.response.status_code >= 500
+                logger.error(f"WHO API request failed (attempt {attempt + 1}): {e}")
+                if not retryable or attempt == retries - 1:
+                    raise
+                await asyncio.sleep(2 ** attempt)
+
+    async def iter_pages(self, path: str, odata_filter: str = None):
+        """Yield every row of ``path``, one ``$top``-sized page at a time."""
+        skip = 0
+        while True:
+            params = {"$top": self.page_size, "$skip": skip}
+            if odata_filter:
+                params["$filter"] = odata_filter
+            data = await self._get_json(f"{self.base_url}/{path}", params)
+            rows = data.get("value", [])
+            for row in rows:
+                yield row
+            if len(rows) < self.page_size:
+                return
+            skip += len(rows)
+
+    async def fetch_countries(self):
+        rows = [row async for row in self.iter_pages("DIMENSION/COUNTRY/DimensionValues")]
+        return [(item["Code"], item["Title"]) for item in rows]
+
+    async def fetch_indicator_names(self, codes=None) -> dict:
+        names = {}
+        async for row in self.iter_pages("Indicator"):
+            if codes is None or row["IndicatorCode"] in codes:
+                names[row["IndicatorCode"]] = row.get("IndicatorName")
+        return names
+
+    async def fetch_indicator(self, indicator_code: str, country_code: str, since: str = None):
+        odata_filter = f"SpatialDim eq '{country_code}'"
+        if since:
+            # GHO's Date is the row's last-modified timestamp; only pull what changed.
+            odata_filter += f" and Date gt {since}"
+        return [row async for row in self.iter_pages(indicator_code, odata_filter)]
+
+    async def fetch_indicators_for_country(self, country_code: str, indicators=None, since: str = None):
+        indicators = indicators or config.WHO_INDICATORS
+        results = await asyncio.gather(
+            *(self.fetch_indicator(code, country_code, since) for code in indicators)
+        )
+        return [row for rows in results for row in rows]
+
+    async def fetch_many(self, country_codes, indicators=None, since_by_country: dict = None) -> dict:
+        """Fetch several countries concurrently (bounded by the client's semaphore)."""
+        since_by_country = since_by_country or {}
+
+        async def one(code):
+            return code, await self.fetch_indicators_for_country(code, indicators, since_by_country.get(code))
+
+        return dict(await asyncio.gather(*(one(code) for code in country_codes)))
+
+
+async def refresh_snapshots(country_codes=None, indicators=None, full: bool = False):
+    """Bring the on-disk snapshot up to date; returns ``{country: rows_changed}``."""
+    from app.services.who_snapshots import WHOSnapshotStore
+
+    store = WHOSnapshotStore()
+    indicators = indicators or config.WHO_INDICATORS
+    async with WHOClient() as client:
+        countries = await client.fetch_countries()
+        store.write_countries(countries)
+        store.write_indicator_names(await client.fetch_indicator_names(set(indicators)))
+        codes = country_codes or [code for code, _ in countries]
+        since = {} if full else {code: store.last_modified(code) for code in codes}
+        fetched = await client.fetch_many(codes, indicators, since)
+    return {code: store.merge(code, rows) for code, rows in fetched.items()}
+
+
+async def interactive_who_explorer():
     print("Fetching countries from WHO...")
-    countries = fetch_countries()
-
-    # Display countries with index
-    for idx, (code, name) in enumerate(countries, start=1):
-        print(f"{idx}. {name} ({code})")
-    
-    while True:
-        try:
-            choice = int(input("\nEnter the number of the country to explore (0 to exit): "))
-            if choice == 0:
-                print("Exiting WHO data explorer. Goodbye!")
-                break
-            if choice < 1 or choice > len(countries):
-                print("Invalid input. Please enter a valid number.")
-                continue
-            selected_code, selected_name = countries[choice-1]
-            print(f"\nFetching health indicators for {selected_name} ({selected_code})...\n")
-            
-            indicators = fetch_indicators_for_country(selected_code)
-            if not indicators:
-                print("No indicators found for this country.")
-            else:
-                # Display indicator details
-                for ind in indicators[:10]:  # show up to 10 for brevity
-                    print(f"Indicator: {ind.get('IndicatorName')}")
-                    print(f"   Year: {ind.get('Year')}")
-                    print(f"   Data Value: {ind.get('DisplayValue')}")
-                    print(f"   Source: {ind.get('Dim1')}")
-                    print()
-            print("-----")
-        except ValueError:
-            print("Invalid input. Please enter a number.")
+    async with WHOClient() as client:
+        countries = await client.fetch_countries()
+        names = await client.fetch_indicator_names(set(config.WHO_INDICATORS))
+
+        # Display countries with index
+        for idx, (code, name) in enumerate(countries, start=1):
+            print(f"{idx}. {name} ({code})")
+
+        while True:
+            try:
+                choice = int(input("\nEnter the number of the country to explore (0 to exit): "))
+                if choice == 0:
+                    print("Exiting WHO data explorer. Goodbye!")
+                    break
+                if choice < 1 or choice > len(countries):
+                    print("Invalid input. Please enter a valid number.")
+                    continue
+                selected_code, selected_name = countries[choice-1]
+                print(f"\nFetching health indicators for {selected_name} ({selected_code})...\n")
+
+                indicators = await client.fetch_indicators_for_country(selected_code)
+                if not indicators:
+                    print("No indicators found for this country.")
+                else:
+                    # Display indicator details
+                    for ind in indicators[:10]:  # show up to 10 for brevity
+                        print(f"Indicator: {names.get(ind.get('IndicatorCode'), ind.get('IndicatorCode'))}")
+                        print(f"   Year: {ind.get('TimeDim')}")
+                        print(f"   Data Value: {ind.get('Value')}")
+                        print(f"   Source: {ind.get('Dim1')}")
+                        print()
+                print("-----")
+            except ValueError:
+                print("Invalid input. Please enter a number.")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="WHO GHO data tools.")
+    sub = parser.add_subparsers(dest="command")
+    refresh = sub.add_parser("refresh", help="Update the local snapshot used by /api/who")
+    refresh.add_argument("countries", nargs="*", help="Country codes (default: all)")
+    refresh.add_argument("--full", action="store_true", help="Re-download instead of fetching only changed rows")
+    sub.add_parser("explore", help="Interactive explorer against the live API")
+    args = parser.parse_args(argv)
+
+    if args.command == "refresh":
+        changed = asyncio.run(refresh_snapshots(args.countries or None, full=args.full))
+        print(f"Refreshed {len(changed)} countries, {sum(changed.values())} rows changed")
+    else:
+        asyncio.run(interactive_who_explorer())
+
 
 if __name__ == "__main__":
-    interactive_who_explorer()
+    main()
@@ -0,0 +1,117 @@
+import gzip
+import json
+import os
+import tempfile
+import time
+
+from app.core import config
+
+
+class WHOSnapshotStore:
+    """On-disk copy of WHO GHO rows, one compressed file per country.
+
+    Rows are kept as gzip'd JSONL, or Parquet when ``fmt="parquet"`` (needs
+    ``pyarrow``). ``manifest.json`` records when each country was refreshed
+    and the newest GHO ``Date`` seen, which drives incremental refreshes.
+    """
+
+    def __init__(self, directory: str = None, fmt: str = None):
+        self.directory = directory or config.WHO_SNAPSHOT_DIR
+        self.fmt = fmt or config.WHO_SNAPSHOT_FORMAT
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def rows_path(self, country_code: str) -> str:
+        extension = ".parquet" if self.fmt == "parquet" else ".jsonl.gz"
+        return self._path(os.path.join("rows", country_code.upper() + extension))
+
+    def _atomic_write(self, path: str, write):
+        # Created on first write, so a read-only deployment can still import and serve.
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        os.close(fd)
+        try:
+            write(tmp)
+            os.replace(tmp, path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+
+    def _read_json(self, name: str, default):
+        try:
+            with open(self._path(name), "r") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return default
+
+    def _write_json(self, name: str, data):
+        def write(tmp):
+            with open(tmp, "w") as f:
+                json.dump(data, f)
+        self._atomic_write(self._path(name), write)
+
+    def write_countries(self, countries):
+        self._write_json("countries.json", [{"code": code, "name": name} for code, name in countries])
+
+    def read_countries(self):
+        return self._read_json("countries.json", [])
+
+    def write_indicator_names(self, names: dict):
+        merged = self.read_indicator_names()
+        merged.update(names)
+        self._write_json("indicators.json", merged)
+
+    def read_indicator_names(self) -> dict:
+        return self._read_json("indicators.json", {})
+
+    def manifest(self) -> dict:
+        return self._read_json("manifest.json", {})
+
+    def last_modified(self, country_code: str):
+        return self.manifest().get(country_code.upper(), {}).get("last_modified")
+
+    def load(self, country_code: str):
+        path = self.rows_path(country_code)
+        if not os.path.exists(path):
+            return []
+        if self.fmt == "parquet":
+            import pyarrow.parquet as pq
+            return pq.read_table(path).to_pylist()
+        with gzip.open(path, "rt") as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+    def _save(self, country_code: str, rows):
+        def write(tmp):
+            if self.fmt == "parquet":
+                import pyarrow as pa
+                import pyarrow.parquet as pq
+                pq.write_table(pa.Table.from_pylist(rows), tmp, compression="zstd")
+            else:
+                with gzip.open(tmp, "wt", compresslevel=6) as f:
+                    for row in rows:
+                        f.write(json.dumps(row, separators=(",", ":")) + "\n")
+        self._atomic_write(self.rows_path(country_code), write)
+
+    def merge(self, country_code: str, rows) -> int:
+        """Upsert fetched rows by GHO ``Id``; returns how many rows were new or changed."""
+        country_code = country_code.upper()
+        manifest = self.manifest()
+        entry = manifest.get(country_code, {})
+        if rows:
+            existing = {row["Id"]: row for row in self.load(country_code)}
+            changed = sum(1 for row in rows if existing.get(row["Id"]) != row)
+            for row in rows:
+                existing[row["Id"]] = row
+            self._save(country_code, list(existing.values()))
+            dates = [row["Date"] for row in rows if row.get("Date")]
+            if dates:
+                entry["last_modified"] = max([entry.get("last_modified") or ""] + dates)
+            entry["rows"] = len(existing)
+        else:
+            changed = 0
+        entry["refreshed_at"] = time.time()
+        manifest[country_code] = entry
+        self._write_json("manifest.json", manifest)
+        return changed
@@ -0,0 +1,73 @@
+"""Local stand-ins for Gemini and the CDC catalog, used by the benchmark harness."""
+import asyncio
+import json
+import os
+import socket
+import threading
+import time
+
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+
+LATENCY = float(os.getenv("BENCH_UPSTREAM_LATENCY_MS", "50")) / 1000
+REPLY = (
+    "From what you describe this sounds like a viral upper respiratory infection. "
+    "Rest, drink plenty of fluids and take paracetamol for the fever. "
+    "If it lasts more than a week or you struggle to breathe, come back in."
+)
+
+app = FastAPI()
+
+
+def _candidate(text: str) -> dict:
+    return {"content": {"role": "model", "parts": [{"text": text}]}, "finishReason": "STOP"}
+
+
+@app.post("/v1beta/models/{model}:generateContent")
+async def generate_content(model: str):
+    await asyncio.sleep(LATENCY)
+    return {"candidates": [_candidate(REPLY)]}
+
+
+@app.post("/v1beta/models/{model}:streamGenerateContent")
+async def stream_generate_content(model: str):
+    async def events():
+        words = REPLY.split(" ")
+        for start in range(0, len(words), 8):
+            await asyncio.sleep(LATENCY / 4)
+            chunk = {"candidates": [_candidate(" ".join(words[start:start + 8]) + " ")]}
+            yield f"data: {json.dumps(chunk)}\r\n\r\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
+@app.get("/catalog")
+async def cdc_catalog(q: str = "", limit: int = 10):
+    await asyncio.sleep(LATENCY)
+    return {
+        "results": [
+            {
+                "resource": {"name": f"{q} dataset {i}", "description": "Synthetic", "updatedAt": "2024-01-01"},
+                "link": f"https://data.cdc.gov/d/fake-{i}",
+            }
+            for i in range(limit)
+        ]
+    }
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_in_thread(port: int):
+    """Run the fake upstream server on a background thread; returns the uvicorn server."""
+    import uvicorn
+
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+    return server
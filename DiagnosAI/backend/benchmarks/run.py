@@ -0,0 +1,283 @@
+"""Reproducible load and micro benchmarks for the backend's hot paths.
+
+    python -m benchmarks.run --output benchmarks/baseline.json
+    python -m benchmarks.run --baseline benchmarks/baseline.json   # exit 1 on regression
+
+The app runs in-process (ASGI transport) against local stand-ins only: a
+fake Gemini/CDC server on a background thread, SQLite through aiosqlite and
+an in-process fakeredis. Nothing leaves the machine.
+"""
+import argparse
+import asyncio
+import glob
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SAMPLE_IMAGES = sorted(glob.glob(os.path.join(BACKEND_DIR, "app", "pneumonia", "test", "*.jpeg")))
+SCENARIOS = ("login", "diagnosis", "health_info", "pneumonia")
+BENCH_EMAIL = "bench@example.com"
+BENCH_PASSWORD = "bench-password"
+
+
+def configure_environment(workdir: str, upstream_port: int):
+    """Point the app at local stand-ins; must run before anything under ``app`` is imported."""
+    upstream = f"http://127.0.0.1:{upstream_port}"
+    os.environ.update({
+        "DATABASE_URL": f"sqlite+aiosqlite:///{os.path.join(workdir, 'bench.db')}",
+        "REDIS_URL": "memory://",
+        "GEMINI_API_URL": f"{upstream}/v1beta/models/fake:generateContent",
+        "GEMINI_API_KEY": "bench",
+        "GEMINI_HTTP2": "false",
+        "CDC_API_URL": f"{upstream}/catalog",
+        "JWT_SECRET_KEY": "bench-secret",
+        # Throttles would turn a load test into a 429 test.
+        "LOGIN_RATE_LIMIT": "0",
+        "LOGIN_IP_RATE_LIMIT": "0",
+        # Measure inference and the upstream path, not the response caches.
+        "PNEUMONIA_CACHE_SIZE": "0",
+        "GEMINI_CACHE_SIZE": "0",
+    })
+    os.environ.setdefault("BLOB_STORE_DIR", os.path.join(workdir, "blobs"))
+    os.environ.setdefault("WHO_SNAPSHOT_DIR", os.path.join(workdir, "who"))
+    if BACKEND_DIR not in sys.path:
+        sys.path.insert(0, BACKEND_DIR)
+
+
+def percentile(sorted_values, pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def summarize(latencies, elapsed: float, errors: int) -> dict:
+    latencies = sorted(latencies)
+    ms = lambda seconds: round(seconds * 1000, 3)
+    return {
+        "requests": len(latencies) + errors,
+        "errors": errors,
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": ms(percentile(latencies, 50)),
+        "p95_ms": ms(percentile(latencies, 95)),
+        "p99_ms": ms(percentile(latencies, 99)),
+        "mean_ms": ms(statistics.fmean(latencies)) if latencies else 0.0,
+    }
+
+
+async def drive(send, concurrency: int, total: int) -> dict:
+    """Run ``send(i)`` ``total`` times from ``concurrency`` concurrent workers."""
+    latencies = []
+    errors = 0
+    counter = iter(range(total))
+
+    async def worker():
+        nonlocal errors
+        for i in counter:
+            started = time.perf_counter()
+            try:
+                ok = await send(i)
+            except Exception:
+                ok = False
+            if ok:
+                latencies.append(time.perf_counter() - started)
+            else:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, time.perf_counter() - started, errors)
+
+
+async def prepare_database():
+    from app.db.base import Base
+    from app.db.session import dispose_engine, get_engine
+    import app.models.diagnosis, app.models.health_info, app.models.record, app.models.sessions, app.models.user  # noqa: F401,E401
+
+    async with get_engine().begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    # The app builds its own engine in the lifespan.
+    await dispose_engine()
+
+
+def make_scenarios(client, token: str, pneumonia_available: bool):
+    auth = {"Authorization": f"Bearer {token}"}
+    images = [open(path, "rb").read() for path in SAMPLE_IMAGES]
+
+    async def login(i):
+        r = await client.post("/api/users/token", json={"email": BENCH_EMAIL, "password": BENCH_PASSWORD})
+        return r.status_code == 200
+
+    async def diagnosis(i):
+        r = await client.post("/api/diagnosis", json={"prompt": f"Fever and sore throat for {i % 7 + 1} days"}, headers=auth)
+        return r.status_code == 201
+
+    async def health_info(i):
+        r = await client.get(f"/api/health-info/condition-{i % 20}")
+        return r.status_code == 200
+
+    async def pneumonia(i):
+        files = {"file": (f"xray-{i}.jpeg", images[i % len(images)], "image/jpeg")}
+        r = await client.post("/pneumonia/predict", files=files)
+        return r.status_code == 200
+
+    scenarios = {"login": login, "diagnosis": diagnosis, "health_info": health_info}
+    if pneumonia_available and images:
+        scenarios["pneumonia"] = pneumonia
+    return scenarios
+
+
+def pneumonia_model_available() -> bool:
+    try:
+        from app.pneumonia.service import service
+        service._load()
+        return True
+    except Exception as e:
+        print(f"Skipping pneumonia benchmarks: {e}", file=sys.stderr)
+        return False
+
+
+async def run_http(scenario_names, concurrency_levels, total: int, pneumonia_available: bool) -> dict:
+    import httpx
+    from app.main import app
+
+    results = {}
+    await prepare_database()
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+            await client.post("/api/users/register", json={"email": BENCH_EMAIL, "password": BENCH_PASSWORD})
+            r = await client.post("/api/users/token", json={"email": BENCH_EMAIL, "password": BENCH_PASSWORD})
+            r.raise_for_status()
+            scenarios = make_scenarios(client, r.json()["access_token"], pneumonia_available)
+            for name in scenario_names:
+                if name not in scenarios:
+                    continue
+                # One untimed request per scenario warms caches, pools and lazy imports.
+                await scenarios[name](0)
+                for concurrency in concurrency_levels:
+                    stats = await drive(scenarios[name], concurrency, total)
+                    results[f"{name}@c{concurrency}"] = stats
+                    print(f"{name:>12} c={concurrency:<4} {stats['throughput_rps']:>9.1f} rps  "
+                          f"p50 {stats['p50_ms']:>8.2f}  p95 {stats['p95_ms']:>8.2f}  p99 {stats['p99_ms']:>8.2f} ms  "
+                          f"errors {stats['errors']}")
+    return results
+
+
+def time_call(fn, iterations: int) -> dict:
+    timings = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return summarize(timings, sum(timings), 0)
+
+
+def run_micro(pneumonia_available: bool, iterations: int) -> dict:
+    from app.pneumonia.preprocessing import decode_image, new_batch, to_batch
+
+    results = {}
+    if not SAMPLE_IMAGES:
+        return results
+    raw = [open(path, "rb").read() for path in SAMPLE_IMAGES]
+    results["preprocess.decode"] = time_call(lambda: [decode_image(data) for data in raw], iterations)
+    decoded = [decode_image(data) for data in raw]
+    for size in (1, 16, 32):
+        images = [decoded[i % len(decoded)] for i in range(size)]
+        buffer = new_batch(size)
+        results[f"preprocess.to_batch@{size}"] = time_call(lambda: to_batch(images, out=buffer), iterations)
+
+    if pneumonia_available:
+        from app.pneumonia.service import service
+
+        for size in (1, 4, 16, 32):
+            batch = to_batch([decoded[i % len(decoded)] for i in range(size)])
+            service.model.predict_batch(batch)  # warm-up / graph tracing
+            results[f"model.predict_batch@{size}"] = time_call(lambda: service.model.predict_batch(batch), iterations)
+    for name, stats in results.items():
+        print(f"{name:>28}  p50 {stats['p50_ms']:>8.3f}  p95 {stats['p95_ms']:>8.3f} ms")
+    return results
+
+
+def compare(baseline: dict, current: dict, tolerance: float):
+    """Regressions of more than ``tolerance`` (fraction) in p95 latency or throughput."""
+    regressions = []
+    for key, now in current.items():
+        before = baseline.get(key)
+        if not before:
+            continue
+        if before.get("p95_ms") and now["p95_ms"] > before["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{key}: p95 {before['p95_ms']} -> {now['p95_ms']} ms")
+        if "@c" in key and before.get("throughput_rps") and now["throughput_rps"] < before["throughput_rps"] * (1 - tolerance):
+            regressions.append(f"{key}: throughput {before['throughput_rps']} -> {now['throughput_rps']} rps")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark DiagnosAI backend hot paths against local stand-ins.")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help=f"Comma-separated subset of {', '.join(SCENARIOS)}")
+    parser.add_argument("--concurrency", default="1,8,32", help="Comma-separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per scenario and concurrency level")
+    parser.add_argument("--micro-iterations", type=int, default=50, help="Iterations per microbenchmark")
+    parser.add_argument("--skip-micro", action="store_true", help="Only run the HTTP scenarios")
+    parser.add_argument("--output", help="Write results JSON here (e.g. a new baseline)")
+    parser.add_argument("--baseline", help="Compare against this results JSON; exit 1 on regression")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="Allowed relative regression (default 0.15)")
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix="diagnosai-bench-")
+    from benchmarks import fake_upstreams
+
+    port = fake_upstreams.free_port()
+    configure_environment(workdir, port)
+    upstream = fake_upstreams.start_in_thread(port)
+
+    try:
+        pneumonia_available = pneumonia_model_available()
+        results = asyncio.run(run_http(
+            [name.strip() for name in args.scenarios.split(",") if name.strip()],
+            [int(c) for c in args.concurrency.split(",")],
+            args.requests,
+            pneumonia_available,
+        ))
+        if not args.skip_micro:
+            results.update(run_micro(pneumonia_available, args.micro_iterations))
+    finally:
+        upstream.should_exit = True
+
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "cpu_count": os.cpu_count(),
+            "requests_per_level": args.requests,
+            "upstream_latency_ms": fake_upstreams.LATENCY * 1000,
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(baseline, results, args.tolerance)
+        if regressions:
+            print("\nRegressions against baseline:")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print("\nNo regressions against baseline.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
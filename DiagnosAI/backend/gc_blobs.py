@@ -0,0 +1,20 @@
+"""Delete stored blobs that no health record references.
+
+Run periodically (cron) next to the API; see ``sweep_orphans``.
+"""
+import asyncio
+
+from app.db.session import dispose_engine
+from app.services.blob_store import get_blob_store, sweep_orphans
+
+
+async def main():
+    try:
+        deleted = await sweep_orphans(get_blob_store())
+    finally:
+        await dispose_engine()
+    print(f"Deleted {deleted} orphaned blobs")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,17 +1,30 @@
 import asyncio
-from app.db.session import engine
-from app.db.base import Base
+import os
 
-# Import ALL your model classes here so they register with Base.metadata
-from app.models.user import User
-from app.models.diagnosis import Diagnosis
-from app.models.sessions import Session, Message  # import new models here
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import inspect
 
+from app.db.session import dispose_engine, get_engine
 
-async def init_db():
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
-    print("Database tables created successfully")
+ALEMBIC_INI = os.path.join(os.path.dirname(os.path.abspath(__file__)), "alembic.ini")
+BASELINE = "0001_baseline"
+
+
+async def _created_without_migrations() -> bool:
+    """True for databases built by the old ``create_all`` (tables but no alembic_version)."""
+    async with get_engine().connect() as conn:
+        tables = await conn.run_sync(lambda sync_conn: set(inspect(sync_conn).get_table_names()))
+    await dispose_engine()
+    return "users" in tables and "alembic_version" not in tables
+
+
+def init_db():
+    alembic_config = Config(ALEMBIC_INI)
+    if asyncio.run(_created_without_migrations()):
+        command.stamp(alembic_config, BASELINE)
+    command.upgrade(alembic_config, "head")
+    print("Database schema is up to date")
 
 if __name__ == "__main__":
-    asyncio.run(init_db())
+    init_db()
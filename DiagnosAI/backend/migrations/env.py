@@ -0,0 +1,50 @@
+import asyncio
+from logging.config import fileConfig
+
+from alembic import context
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import NullPool
+
+from app.core import config as app_config
+from app.db.base import Base
+
+# Import every model so autogenerate sees the whole schema.
+import app.models.diagnosis, app.models.health_info, app.models.record, app.models.sessions, app.models.user  # noqa: F401,E401
+
+alembic_config = context.config
+if alembic_config.config_file_name is not None and alembic_config.attributes.get("configure_logger", True):
+    fileConfig(alembic_config.config_file_name, disable_existing_loggers=False)
+
+target_metadata = Base.metadata
+
+
+def _url() -> str:
+    if not app_config.DATABASE_URL:
+        raise ValueError("DATABASE_URL is not set in environment variables")
+    return app_config.DATABASE_URL
+
+
+def run_migrations_offline():
+    context.configure(url=_url(), target_metadata=target_metadata, literal_binds=True, render_as_batch=True)
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def _run(connection):
+    # Batch mode lets ALTERs work on SQLite (used for local runs and benchmarks).
+    context.configure(connection=connection, target_metadata=target_metadata, render_as_batch=True)
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+async def run_migrations_online():
+    engine = create_async_engine(_url(), poolclass=NullPool)
+    async with engine.connect() as connection:
+        await connection.run_sync(_run)
+    await engine.dispose()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    asyncio.run(run_migrations_online())
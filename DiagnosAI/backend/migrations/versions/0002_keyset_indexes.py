@@ -0,0 +1,42 @@
+"""Keyset pagination indexes and diagnoses.created_at
+
+Revision ID: 0002_keyset_indexes
+Revises: 0001_baseline
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0002_keyset_indexes"
+down_revision = "0001_baseline"
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ("ix_messages_session_id_created_at_id", "messages", ["session_id", "created_at", "id"]),
+    ("ix_sessions_user_id_id", "sessions", ["user_id", "id"]),
+    ("ix_diagnoses_user_id_id", "diagnoses", ["user_id", "id"]),
+]
+
+
+def upgrade():
+    # Existing rows are stamped with the migration time. SQLite can't ADD a
+    # column with a non-constant default, so there the table is rebuilt.
+    recreate = "always" if op.get_bind().dialect.name == "sqlite" else "auto"
+    with op.batch_alter_table("diagnoses", recreate=recreate) as batch:
+        batch.add_column(sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()))
+
+    # Built CONCURRENTLY on Postgres so large tables stay writable meanwhile;
+    # that can't run inside a transaction, hence the autocommit block.
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, postgresql_concurrently=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, table, _ in INDEXES:
+            op.drop_index(name, table_name=table, postgresql_concurrently=True)
+    with op.batch_alter_table("diagnoses") as batch:
+        batch.drop_column("created_at")
@@ -0,0 +1,35 @@
+"""health_info table for local symptom/disease search
+
+The model existed before but init_db.py never created its table.
+
+Revision ID: 0003_health_info
+Revises: 0002_keyset_indexes
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0003_health_info"
+down_revision = "0002_keyset_indexes"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Some deployments created it by hand from the model.
+    if sa.inspect(op.get_bind()).has_table("health_info"):
+        return
+    op.create_table(
+        "health_info",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("disease_name", sa.String(), nullable=False),
+        sa.Column("symptoms", sa.Text(), nullable=True),
+        sa.Column("prevention", sa.Text(), nullable=True),
+        sa.Column("treatment", sa.Text(), nullable=True),
+    )
+    op.create_index("ix_health_info_id", "health_info", ["id"])
+
+
+def downgrade():
+    op.drop_table("health_info")
@@ -0,0 +1,217 @@
+"""Compact reply storage
+
+Model replies were stored twice, each time as a JSON dump of the whole
+Gemini candidate: once in messages.content and again in diagnoses.diagnosis.
+Now messages.content holds only the reply text (compressed when large), the
+candidate goes to messages.candidate per REPLY_CANDIDATE_STORAGE, and a
+diagnosis made in a chat session points at its message instead of copying it.
+
+Revision ID: 0004_compact_replies
+Revises: 0003_health_info
+Create Date: 2026-10-17
+"""
+import hashlib
+import json
+import os
+import zlib
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import JSONB
+
+
+revision = "0004_compact_replies"
+down_revision = "0003_health_info"
+branch_labels = None
+depends_on = None
+
+CHUNK = 1000
+
+# Frozen copies of app.db.types and the candidate policy as of this revision,
+# so later app changes don't change what it writes.
+JSONVariant = sa.JSON(none_as_null=True).with_variant(JSONB(none_as_null=True), "postgresql")
+_PLAIN = b"\x00"
+_ZLIB = b"\x01"
+
+
+def encode_text(value: str) -> bytes:
+    min_bytes = int(os.getenv("TEXT_COMPRESS_MIN_BYTES", "256"))
+    raw = value.encode("utf-8")
+    if 0 <= min_bytes <= len(raw):
+        compressed = zlib.compress(raw, 6)
+        if len(compressed) < len(raw):
+            return _ZLIB + compressed
+    return _PLAIN + raw
+
+
+def decode_text(value: bytes) -> str:
+    value = bytes(value)
+    if value[:1] == _ZLIB:
+        return zlib.decompress(value[1:]).decode("utf-8")
+    return value[1:].decode("utf-8")
+
+
+def _link_key(content) -> str:
+    return hashlib.sha256((content or "").encode("utf-8")).hexdigest()
+
+
+def _legacy_parts(content):
+    """``(text, candidate)`` of a stored message; candidate is None for plain text."""
+    if content and content.lstrip().startswith("{"):
+        try:
+            data = json.loads(content)
+        except ValueError:
+            return content, None
+        if isinstance(data, dict):
+            parts = data.get("content", {}).get("parts") if "content" in data else data.get("parts")
+            if parts and isinstance(parts, list):
+                text = "".join(part.get("text", "") for part in parts if isinstance(part, dict))
+            else:
+                text = data.get("text", "")
+            return text, data
+    return content or "", None
+
+
+def _stored_candidate(candidate):
+    policy = os.getenv("REPLY_CANDIDATE_STORAGE", "none")
+    if not candidate or policy == "none":
+        return None
+    if policy == "metadata":
+        return {key: value for key, value in candidate.items() if key != "content"} or None
+    return candidate
+
+
+def _chunks(conn, table, *columns):
+    """Rows of ``table`` in id order, ``CHUNK`` at a time."""
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            sa.select(table.c.id, *columns).where(table.c.id > last_id).order_by(table.c.id).limit(CHUNK)
+        ).all()
+        if not rows:
+            return
+        yield rows
+        last_id = rows[-1].id
+
+
+def _update(conn, table, values: list):
+    if values:
+        names = [key for key in values[0] if key != "_id"]
+        conn.execute(
+            sa.update(table).where(table.c.id == sa.bindparam("_id")).values({name: sa.bindparam(name) for name in names}),
+            values,
+        )
+
+
+def upgrade():
+    conn = op.get_bind()
+    recreate = "always" if conn.dialect.name == "sqlite" else "auto"
+
+    with op.batch_alter_table("messages") as batch:
+        batch.add_column(sa.Column("body", sa.LargeBinary(), nullable=True))
+        batch.add_column(sa.Column("candidate", JSONVariant, nullable=True))
+        # Hash of the legacy content, only to link diagnoses to their message.
+        batch.add_column(sa.Column("link_key", sa.String(64), nullable=True))
+    with op.batch_alter_table("diagnoses", recreate=recreate) as batch:
+        batch.add_column(sa.Column("message_id", sa.Integer(), nullable=True))
+        batch.add_column(sa.Column("body", sa.LargeBinary(), nullable=True))
+        batch.create_foreign_key("fk_diagnoses_message_id_messages", "messages", ["message_id"], ["id"])
+    op.create_index("ix_diagnoses_message_id", "diagnoses", ["message_id"])
+
+    messages = sa.table(
+        "messages", sa.column("id", sa.Integer), sa.column("role", sa.String), sa.column("session_id", sa.Integer),
+        sa.column("content", sa.Text), sa.column("body", sa.LargeBinary), sa.column("candidate", JSONVariant),
+        sa.column("link_key", sa.String),
+    )
+    for rows in _chunks(conn, messages, messages.c.role, messages.c.content):
+        values = []
+        for row in rows:
+            text, candidate = _legacy_parts(row.content)
+            values.append({
+                "_id": row.id, "body": encode_text(text), "candidate": _stored_candidate(candidate),
+                "link_key": _link_key(row.content) if row.role == "model" else None,
+            })
+        _update(conn, messages, values)
+    op.create_index("ix_messages_link_key", "messages", ["link_key"])
+
+    # A chat diagnosis is the model message with the same (legacy JSON) content
+    # in one of the same user's sessions; linked rows keep no text of their own.
+    sessions = sa.table("sessions", sa.column("id", sa.Integer), sa.column("user_id", sa.Integer))
+    diagnoses = sa.table(
+        "diagnoses", sa.column("id", sa.Integer), sa.column("user_id", sa.Integer), sa.column("diagnosis", sa.String),
+        sa.column("message_id", sa.Integer), sa.column("body", sa.LargeBinary),
+    )
+    for rows in _chunks(conn, diagnoses, diagnoses.c.user_id, diagnoses.c.diagnosis):
+        keys = {row.id: _link_key(row.diagnosis) for row in rows}
+        candidates = conn.execute(
+            sa.select(messages.c.id, messages.c.link_key, sessions.c.user_id)
+            .join(sessions, sessions.c.id == messages.c.session_id)
+            .where(messages.c.link_key.in_(set(keys.values())))
+        ).all()
+        linked = {}
+        for message in candidates:
+            key = (message.user_id, message.link_key)
+            linked[key] = min(linked.get(key, message.id), message.id)
+        values = []
+        for row in rows:
+            message_id = linked.get((row.user_id, keys[row.id]))
+            body = None if message_id is not None else encode_text(_legacy_parts(row.diagnosis)[0])
+            values.append({"_id": row.id, "message_id": message_id, "body": body})
+        _update(conn, diagnoses, values)
+
+    op.drop_index("ix_messages_link_key", table_name="messages")
+    with op.batch_alter_table("messages", recreate=recreate) as batch:
+        batch.drop_column("link_key")
+        batch.drop_column("content")
+        batch.alter_column("body", new_column_name="content", existing_type=sa.LargeBinary(), nullable=False)
+    with op.batch_alter_table("diagnoses", recreate=recreate) as batch:
+        batch.drop_column("diagnosis")
+        batch.alter_column("body", new_column_name="diagnosis", existing_type=sa.LargeBinary(), nullable=True)
+
+
+def downgrade():
+    conn = op.get_bind()
+    recreate = "always" if conn.dialect.name == "sqlite" else "auto"
+
+    with op.batch_alter_table("messages") as batch:
+        batch.add_column(sa.Column("legacy", sa.Text(), nullable=True))
+    with op.batch_alter_table("diagnoses") as batch:
+        batch.add_column(sa.Column("legacy", sa.String(), nullable=True))
+
+    # Back to the old layout: a model reply is its full candidate as JSON when
+    # that was kept, otherwise just the text.
+    messages = sa.table(
+        "messages", sa.column("id", sa.Integer), sa.column("content", sa.LargeBinary),
+        sa.column("candidate", JSONVariant), sa.column("legacy", sa.Text),
+    )
+    for rows in _chunks(conn, messages, messages.c.content, messages.c.candidate):
+        values = []
+        for row in rows:
+            text = decode_text(row.content)
+            if row.candidate and "content" in row.candidate:
+                text = json.dumps(row.candidate)
+            values.append({"_id": row.id, "legacy": text})
+        _update(conn, messages, values)
+
+    diagnoses = sa.table(
+        "diagnoses", sa.column("id", sa.Integer), sa.column("diagnosis", sa.LargeBinary),
+        sa.column("legacy", sa.String),
+    )
+    for rows in _chunks(conn, diagnoses, diagnoses.c.diagnosis):
+        values = [{"_id": row.id, "legacy": decode_text(row.diagnosis)} for row in rows if row.diagnosis is not None]
+        _update(conn, diagnoses, values)
+    conn.execute(sa.text("""
+        UPDATE diagnoses SET legacy = (SELECT m.legacy FROM messages m WHERE m.id = diagnoses.message_id)
+        WHERE message_id IS NOT NULL
+    """))
+
+    op.drop_index("ix_diagnoses_message_id", table_name="diagnoses")
+    with op.batch_alter_table("diagnoses", recreate=recreate) as batch:
+        batch.drop_constraint("fk_diagnoses_message_id_messages", type_="foreignkey")
+        batch.drop_column("message_id")
+        batch.drop_column("diagnosis")
+        batch.alter_column("legacy", new_column_name="diagnosis", existing_type=sa.String(), nullable=False)
+    with op.batch_alter_table("messages", recreate=recreate) as batch:
+        batch.drop_column("candidate")
+        batch.drop_column("content")
+        batch.alter_column("legacy", new_column_name="content", existing_type=sa.Text(), nullable=False)
@@ -0,0 +1,40 @@
+"""health_records table for uploaded records
+
+The old init_db.py never created it, so databases stamped at the baseline
+don't have it.
+
+Revision ID: 0005_health_records
+Revises: 0004_compact_replies
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0005_health_records"
+down_revision = "0004_compact_replies"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Databases migrated before this revision existed got it from the baseline.
+    if sa.inspect(op.get_bind()).has_table("health_records"):
+        return
+    op.create_table(
+        "health_records",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("filename", sa.String(), nullable=False),
+        sa.Column("content_type", sa.String(), nullable=False),
+        sa.Column("digest", sa.String(64), nullable=False),
+        sa.Column("size", sa.BigInteger(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+    op.create_index("ix_health_records_id", "health_records", ["id"])
+    op.create_index("ix_health_records_user_id", "health_records", ["user_id"])
+    op.create_index("ix_health_records_digest", "health_records", ["digest"])
+
+
+def downgrade():
+    op.drop_table("health_records")
@@ -0,0 +1,81 @@
+"""Report where app startup time goes, from ``python -X importtime``.
+
+    python profile_startup.py                # top 25 modules by cumulative time
+    python profile_startup.py --top 50 --json startup_profile.json
+"""
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+
+LINE_RE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def collect_import_times(target: str):
+    env = dict(os.environ, PYTHONPATH=os.path.dirname(os.path.abspath(__file__)))
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {target}"],
+        capture_output=True,
+        text=True,
+        env=env,
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+    )
+    if proc.returncode != 0:
+        raise SystemExit(f"Importing {target} failed:\n{proc.stderr}")
+
+    modules = []
+    for line in proc.stderr.splitlines():
+        match = LINE_RE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            modules.append({
+                "module": name,
+                "self_ms": int(self_us) / 1000,
+                "cumulative_ms": int(cumulative_us) / 1000,
+                # importtime indents nested imports by two spaces per level
+                "depth": (len(indent) - 1) // 2,
+            })
+    return modules
+
+
+def summarize(modules, top: int):
+    roots = [m for m in modules if m["depth"] == 0]
+    packages = {}
+    for m in modules:
+        package = m["module"].split(".")[0]
+        packages[package] = packages.get(package, 0.0) + m["self_ms"]
+    return {
+        "total_ms": round(sum(m["cumulative_ms"] for m in roots), 1),
+        "modules_imported": len(modules),
+        "slowest_modules": sorted(modules, key=lambda m: m["cumulative_ms"], reverse=True)[:top],
+        "packages_by_self_time_ms": dict(
+            sorted(((k, round(v, 1)) for k, v in packages.items()), key=lambda kv: kv[1], reverse=True)[:top]
+        ),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Profile backend import/startup time.")
+    parser.add_argument("--target", default="app.main", help="Module to import (default: app.main)")
+    parser.add_argument("--top", type=int, default=25, help="Number of entries to show")
+    parser.add_argument("--json", dest="json_path", help="Also write the full report to this file")
+    args = parser.parse_args(argv)
+
+    report = summarize(collect_import_times(args.target), args.top)
+    print(f"Importing {args.target}: {report['total_ms']} ms across {report['modules_imported']} modules\n")
+    print(f"{'cumulative ms':>14}  {'self ms':>8}  module")
+    for m in report["slowest_modules"]:
+        print(f"{m['cumulative_ms']:>14.1f}  {m['self_ms']:>8.1f}  {'  ' * m['depth']}{m['module']}")
+    print("\nSelf time by top-level package:")
+    for package, ms in report["packages_by_self_time_ms"].items():
+        print(f"{ms:>14.1f}  {package}")
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,36 +1,38 @@
+import argparse
+import csv
+import glob
+import multiprocessing
 import os
-from io import BytesIO
-from PIL import Image
-import numpy as np
 import json
 import sys
 
 # Add the backend directory to the Python path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__))))
 
-from app.pneumonia.model import PneumoniaModel
+from app.pneumonia.preprocessing import decode_image, new_batch, preprocess, to_batch
 from app.pneumonia.schemas import PneumoniaPredictionResponse
 
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png")
+CSV_FIELDS = ["path", "pneumonia_probability", "diagnosis", "detail"]
+
+
 def run_prediction(image_path: str):
+    # Imported lazily so that bulk-mode worker processes never load TensorFlow.
+    from app.pneumonia.model import PneumoniaModel
+
     # Load the model
     model = PneumoniaModel()
 
     # Load and preprocess the image
     try:
-        with open(image_path, "rb") as f:
-            contents = f.read()
-        image = Image.open(BytesIO(contents)).convert("RGB")
+        img_array = preprocess(image_path)
     except FileNotFoundError:
         print(json.dumps({"detail": f"Image file not found at {image_path}"}))
         return
-    except Exception as e:
-        print(json.dumps({"detail": f"Invalid image file: {e}"}))
+    except ValueError as e:
+        print(json.dumps({"detail": str(e)}))
         return
 
-    image = image.resize((150, 150))
-    img_array = np.array(image) / 255.0
-    img_array = np.expand_dims(img_array, 0)
-
     # Make prediction
     prob = float(model.predict(img_array))
     diagnosis = "Pneumonia likely" if prob > 0.5 else "Likely normal"
@@ -38,11 +40,180 @@ def run_prediction(image_path: str):
     response = PneumoniaPredictionResponse(pneumonia_probability=prob, diagnosis=diagnosis)
     print(json.dumps(response.model_dump()))
 
-if __name__ == "__main__":
-    if len(sys.argv) < 2:
-        print("Usage: python run_pneumonia_prediction.py <path_to_image>")
-        sys.exit(1)
-    
-    image_file_path = sys.argv[1]
-    run_prediction(image_file_path)
 
+# ---------------------------------------------------------------------------
+# Bulk mode
+# ---------------------------------------------------------------------------
+
+def _expand_input(spec: str):
+    if spec.startswith("@"):
+        with open(spec[1:], "r") as manifest:
+            for line in manifest:
+                line = line.strip()
+                if line and not line.startswith("#"):
+                    yield line
+    elif os.path.isdir(spec):
+        for root, dirs, files in os.walk(spec):
+            dirs.sort()
+            for name in sorted(files):
+                if name.lower().endswith(IMAGE_EXTENSIONS):
+                    yield os.path.join(root, name)
+    elif glob.has_magic(spec):
+        yield from sorted(glob.glob(spec, recursive=True))
+    else:
+        yield spec
+
+
+def iter_image_paths(specs, skip=frozenset()):
+    seen = set(skip)
+    for spec in specs:
+        for path in _expand_input(spec):
+            if path not in seen:
+                seen.add(path)
+                yield path
+
+
+def _load_image(path: str):
+    """Decode one image in a worker process; returns uint8 pixels to keep IPC small."""
+    try:
+        return path, decode_image(path), None
+    except FileNotFoundError:
+        return path, None, f"Image file not found at {path}"
+    except ValueError as e:
+        return path, None, str(e)
+
+
+def _read_checkpoint(output_path: str, fmt: str):
+    """Paths already scored in a previous (possibly interrupted) output file.
+
+    Rows written for images that failed to load carry no diagnosis; those
+    images are tried again.
+    """
+    done = set()
+    if not output_path or not os.path.exists(output_path):
+        return done
+    with open(output_path, "r", newline="") as f:
+        if fmt == "csv":
+            for row in csv.DictReader(f):
+                if row.get("diagnosis"):
+                    done.add(row["path"])
+        else:
+            for line in f:
+                try:
+                    row = json.loads(line)
+                    if row.get("diagnosis"):
+                        done.add(row["path"])
+                except (ValueError, KeyError, AttributeError):
+                    # A torn last line from a crash; that image is simply redone.
+                    continue
+    return done
+
+
+class ResultWriter:
+    def __init__(self, stream, fmt: str, write_header: bool):
+        self.stream = stream
+        self.fmt = fmt
+        if fmt == "csv":
+            self._csv = csv.DictWriter(stream, fieldnames=CSV_FIELDS)
+            if write_header:
+                self._csv.writeheader()
+
+    def write(self, row: dict):
+        if self.fmt == "csv":
+            self._csv.writerow(row)
+        else:
+            self.stream.write(json.dumps(row) + "\n")
+
+    def flush(self):
+        self.stream.flush()
+
+
+def _predict_batch(model, batch, writer, buffer):
+    probs = model.predict_batch(to_batch([img for _, img in batch], out=buffer))
+    for (path, _), prob in zip(batch, probs):
+        prob = float(prob)
+        writer.write({
+            "path": path,
+            "pneumonia_probability": prob,
+            "diagnosis": "Pneumonia likely" if prob > 0.5 else "Likely normal",
+            "detail": None,
+        })
+    writer.flush()
+
+
+def run_bulk_prediction(inputs, output=None, fmt=None, batch_size=32, workers=None, resume=False):
+    from app.pneumonia.model import PneumoniaModel
+
+    if fmt is None:
+        fmt = "csv" if output and output.lower().endswith(".csv") else "jsonl"
+    done = _read_checkpoint(output, fmt) if resume else set()
+    paths = iter_image_paths(inputs, skip=done)
+
+    if output:
+        append = resume and os.path.exists(output)
+        stream = open(output, "a" if append else "w", newline="")
+        writer = ResultWriter(stream, fmt, write_header=not append or os.path.getsize(output) == 0)
+    else:
+        stream = sys.stdout
+        writer = ResultWriter(stream, fmt, write_header=True)
+
+    # Spawned workers only need PIL/numpy; forking after TensorFlow starts its
+    # thread pools is unsafe, so the pool is created before the model loads.
+    ctx = multiprocessing.get_context("spawn")
+    try:
+        with ctx.Pool(processes=workers) as pool:
+            model = PneumoniaModel()
+            buffer = new_batch(batch_size)
+            batch = []
+            for path, img, error in pool.imap(_load_image, paths, chunksize=8):
+                if error is not None:
+                    writer.write({"path": path, "pneumonia_probability": None, "diagnosis": None, "detail": error})
+                    continue
+                batch.append((path, img))
+                if len(batch) == batch_size:
+                    _predict_batch(model, batch, writer, buffer)
+                    batch = []
+            if batch:
+                _predict_batch(model, batch, writer, buffer)
+    finally:
+        if stream is not sys.stdout:
+            stream.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run pneumonia predictions on chest X-ray images.")
+    parser.add_argument(
+        "inputs",
+        nargs="+",
+        help="Image files, directories, glob patterns or @manifest files (one path per line)",
+    )
+    parser.add_argument("-o", "--output", help="Write results to this file instead of stdout")
+    parser.add_argument("--format", choices=["jsonl", "csv"], help="Output format (default: from --output extension, else jsonl)")
+    parser.add_argument("--batch-size", type=int, default=32, help="Images per model call (default: 32)")
+    parser.add_argument("--workers", type=int, default=None, help="Decode worker processes (default: CPU count)")
+    parser.add_argument("--resume", action="store_true", help="Skip images already present in --output")
+    args = parser.parse_args(argv)
+
+    single = (
+        len(args.inputs) == 1
+        and not args.inputs[0].startswith("@")
+        and not os.path.isdir(args.inputs[0])
+        and not glob.has_magic(args.inputs[0])
+        and args.output is None
+        and args.format is None
+    )
+    if single:
+        run_prediction(args.inputs[0])
+    else:
+        run_bulk_prediction(
+            args.inputs,
+            output=args.output,
+            fmt=args.format,
+            batch_size=max(1, args.batch_size),
+            workers=args.workers,
+            resume=args.resume,
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""Shared setup: the app runs against SQLite (aiosqlite) and an in-process
+fakeredis, the same local stand-ins as ``benchmarks/run.py``.
+
+The environment is set here, before anything under ``app`` is imported,
+because ``app.core.config`` reads it at import time.
+"""
+import os
+import sys
+import tempfile
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+WORKDIR = tempfile.mkdtemp(prefix="diagnosai-tests-")
+
+os.environ.update({
+    "DATABASE_URL": f"sqlite+aiosqlite:///{os.path.join(WORKDIR, 'test.db')}",
+    "REDIS_URL": "memory://",
+    "JWT_SECRET_KEY": "test-secret",
+    "GEMINI_API_KEY": "test",
+    "BLOB_STORE_DIR": os.path.join(WORKDIR, "blobs"),
+    "WHO_SNAPSHOT_DIR": os.path.join(WORKDIR, "who"),
+    "WRITE_BEHIND_SPILL_PATH": os.path.join(WORKDIR, "write_behind.jsonl"),
+})
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+async def db():
+    """A fresh schema (from the models) in the test database."""
+    from app.db.base import Base
+    from app.db.session import dispose_engine, get_engine
+    import app.models.diagnosis, app.models.health_info, app.models.record, app.models.sessions, app.models.user  # noqa: F401,E401
+
+    async with get_engine().begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    yield
+    await dispose_engine()
+
+
+@pytest.fixture
+async def chat_session(db):
+    """``(user_id, session_id)`` of a user with one empty conversation."""
+    from sqlalchemy import insert
+
+    from app.db import crud
+    from app.db.session import async_session
+    from app.models.sessions import Session
+
+    user = await crud.create_user("patient@example.com", "not-a-real-hash")
+    async with async_session() as session:
+        async with session.begin():
+            result = await session.execute(insert(Session).values(user_id=user.id).returning(Session.id))
+            session_id = result.scalar_one()
+    return user.id, session_id
@@ -0,0 +1,73 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from app.pneumonia.batching import BatchingPredictor
+
+pytestmark = pytest.mark.anyio
+
+
+def _image(value: int = 0):
+    return np.full((150, 150, 3), value, dtype=np.uint8)
+
+
+class MeanModel:
+    """Probability = mean normalized pixel, so each image's result is recognizable."""
+
+    def __init__(self):
+        self.batch_sizes = []
+
+    def predict_batch(self, batch):
+        self.batch_sizes.append(len(batch))
+        return batch.reshape(len(batch), -1).mean(axis=1)
+
+
+class BrokenModel:
+    def predict_batch(self, batch):
+        raise RuntimeError("model exploded")
+
+
+async def test_concurrent_requests_share_a_batch_and_get_their_own_result():
+    model = MeanModel()
+    predictor = BatchingPredictor(model, max_batch_size=8, max_wait_ms=50)
+    try:
+        results = await asyncio.gather(*[predictor.predict(_image(v)) for v in (0, 51, 255)])
+    finally:
+        await predictor.close()
+    assert results == pytest.approx([0.0, 0.2, 1.0])
+    assert model.batch_sizes == [3]
+
+
+async def test_model_error_fails_every_request_in_the_batch():
+    predictor = BatchingPredictor(BrokenModel(), max_batch_size=8, max_wait_ms=50)
+    try:
+        results = await asyncio.gather(*[predictor.predict(_image()) for _ in range(4)], return_exceptions=True)
+        assert len(results) == 4
+        assert all(isinstance(r, RuntimeError) and "model exploded" in str(r) for r in results)
+        # The worker survives a failed batch.
+        predictor.model = MeanModel()
+        assert await predictor.predict(_image(255)) == pytest.approx(1.0)
+    finally:
+        await predictor.close()
+
+
+async def test_requests_queued_when_the_worker_dies_are_still_answered():
+    predictor = BatchingPredictor(MeanModel(), max_batch_size=4, max_wait_ms=1)
+    try:
+        assert await predictor.predict(_image()) == pytest.approx(0.0)
+        predictor._worker.cancel()
+        await asyncio.sleep(0)
+        results = await asyncio.wait_for(asyncio.gather(*[predictor.predict(_image(255)) for _ in range(3)]), 5)
+    finally:
+        await predictor.close()
+    assert results == pytest.approx([1.0, 1.0, 1.0])
+
+
+async def test_close_fails_requests_still_queued():
+    predictor = BatchingPredictor(MeanModel(), max_batch_size=4, max_wait_ms=1000)
+    pending = asyncio.ensure_future(predictor.predict(_image()))
+    await asyncio.sleep(0.01)
+    await predictor.close()
+    with pytest.raises(RuntimeError):
+        await asyncio.wait_for(pending, 5)
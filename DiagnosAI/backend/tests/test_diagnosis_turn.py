@@ -0,0 +1,59 @@
+import pytest
+from sqlalchemy import func, select
+
+from app.db import crud
+from app.db.session import async_session
+from app.models.sessions import Message
+
+pytestmark = pytest.mark.anyio
+
+
+async def _message_count(session_id: int) -> int:
+    async with async_session() as session:
+        result = await session.execute(select(func.count()).select_from(Message).filter(Message.session_id == session_id))
+        return result.scalar_one()
+
+
+async def test_new_turn_creates_a_session(db):
+    user = await crud.create_user("a@example.com", "hash")
+    session_id, message_id, prior = await crud.begin_diagnosis_turn(user.id, None, "I have a cough")
+    assert prior == []
+    assert message_id is not None
+    assert await _message_count(session_id) == 1
+
+
+async def test_follow_up_turn_returns_prior_history(db):
+    user = await crud.create_user("a@example.com", "hash")
+    session_id, _, _ = await crud.begin_diagnosis_turn(user.id, None, "I have a cough")
+    # Long enough to be stored compressed.
+    follow_up = "It has lasted three days. " * 20
+    same_session, _, prior = await crud.begin_diagnosis_turn(user.id, session_id, follow_up)
+    assert same_session == session_id
+    assert [(m.role, m.content) for m in prior] == [("user", "I have a cough")]
+    _, _, prior = await crud.begin_diagnosis_turn(user.id, session_id, "Any advice?")
+    assert [m.content for m in prior] == ["I have a cough", follow_up]
+
+
+async def test_turn_in_someone_elses_session_is_rejected(db):
+    owner = await crud.create_user("owner@example.com", "hash")
+    intruder = await crud.create_user("intruder@example.com", "hash")
+    session_id, _, _ = await crud.begin_diagnosis_turn(owner.id, None, "private symptoms")
+
+    with pytest.raises(crud.SessionNotFoundError):
+        await crud.begin_diagnosis_turn(intruder.id, session_id, "let me in")
+    # Nothing was written into the owner's session.
+    assert await _message_count(session_id) == 1
+
+
+async def test_turn_in_missing_session_is_rejected(db):
+    user = await crud.create_user("a@example.com", "hash")
+    with pytest.raises(crud.SessionNotFoundError):
+        await crud.begin_diagnosis_turn(user.id, 12345, "hello?")
+
+
+async def test_discard_user_turn_removes_the_prompt_and_a_new_session(db):
+    user = await crud.create_user("a@example.com", "hash")
+    session_id, message_id, _ = await crud.begin_diagnosis_turn(user.id, None, "hello")
+    await crud.discard_user_turn(session_id, message_id, new_session=True)
+    assert await _message_count(session_id) == 0
+    assert await crud.list_messages(session_id, user.id, 10) is None
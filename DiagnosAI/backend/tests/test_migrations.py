@@ -0,0 +1,77 @@
+import json
+import sqlite3
+
+import init_db
+from app.core import config
+from app.db.types import decode_text
+
+# What the old init_db.py built with create_all, before migrations existed.
+CREATE_ALL_SCHEMA = """
+CREATE TABLE users (
+    id INTEGER NOT NULL PRIMARY KEY,
+    email VARCHAR NOT NULL,
+    hashed_password VARCHAR NOT NULL
+);
+CREATE INDEX ix_users_id ON users (id);
+CREATE UNIQUE INDEX ix_users_email ON users (email);
+CREATE TABLE diagnoses (
+    id INTEGER NOT NULL PRIMARY KEY,
+    user_id INTEGER REFERENCES users (id),
+    prompt VARCHAR NOT NULL,
+    diagnosis VARCHAR NOT NULL
+);
+CREATE INDEX ix_diagnoses_id ON diagnoses (id);
+CREATE TABLE sessions (
+    id INTEGER NOT NULL PRIMARY KEY,
+    user_id INTEGER NOT NULL REFERENCES users (id),
+    created_at DATETIME DEFAULT (CURRENT_TIMESTAMP)
+);
+CREATE INDEX ix_sessions_id ON sessions (id);
+CREATE TABLE messages (
+    id INTEGER NOT NULL PRIMARY KEY,
+    session_id INTEGER NOT NULL REFERENCES sessions (id),
+    role VARCHAR NOT NULL,
+    content TEXT NOT NULL,
+    created_at DATETIME DEFAULT (CURRENT_TIMESTAMP)
+);
+CREATE INDEX ix_messages_id ON messages (id);
+"""
+
+CANDIDATE = {"content": {"role": "model", "parts": [{"text": "Likely a cold."}]}, "finishReason": "STOP"}
+
+
+def test_upgrade_from_create_all_database(tmp_path, monkeypatch):
+    path = tmp_path / "legacy.db"
+    reply = json.dumps(CANDIDATE)
+    with sqlite3.connect(path) as conn:
+        conn.executescript(CREATE_ALL_SCHEMA)
+        conn.execute("INSERT INTO users (id, email, hashed_password) VALUES (1, 'old@example.com', 'hash')")
+        conn.execute("INSERT INTO sessions (id, user_id) VALUES (1, 1)")
+        conn.execute("INSERT INTO messages (session_id, role, content) VALUES (1, 'user', 'I have a cough')")
+        conn.execute("INSERT INTO messages (session_id, role, content) VALUES (1, 'model', ?)", (reply,))
+        conn.execute("INSERT INTO diagnoses (user_id, prompt, diagnosis) VALUES (1, 'I have a cough', ?)", (reply,))
+        conn.execute("INSERT INTO diagnoses (user_id, prompt, diagnosis) VALUES (1, 'headache', 'Drink water.')")
+
+    monkeypatch.setattr(config, "DATABASE_URL", f"sqlite+aiosqlite:///{path}")
+    init_db.init_db()
+
+    conn = sqlite3.connect(path)
+    try:
+        assert conn.execute("SELECT version_num FROM alembic_version").fetchall() == [("0005_health_records",)]
+        tables = {name for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        assert {"health_info", "health_records"} <= tables
+
+        messages = conn.execute("SELECT id, role, content FROM messages ORDER BY id").fetchall()
+        assert [(role, decode_text(content)) for _, role, content in messages] == [
+            ("user", "I have a cough"), ("model", "Likely a cold."),
+        ]
+        diagnoses = conn.execute("SELECT prompt, message_id, diagnosis FROM diagnoses ORDER BY id").fetchall()
+        # The chat diagnosis now points at its message; the standalone one keeps its text.
+        assert diagnoses[0] == ("I have a cough", messages[1][0], None)
+        assert diagnoses[1][:2] == ("headache", None)
+        assert decode_text(diagnoses[1][2]) == "Drink water."
+    finally:
+        conn.close()
+
+    # Running it again is a no-op.
+    init_db.init_db()
@@ -0,0 +1,30 @@
+import pytest
+
+from app.api.records import _parse_range
+
+SIZE = 1000
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("bytes=0-99", (0, 99)),
+    ("bytes=500-", (500, 999)),
+    ("bytes=-100", (900, 999)),
+    ("bytes=-5000", (0, 999)),  # suffix longer than the file: the whole file
+    ("bytes=900-5000", (900, 999)),  # end past the file is clipped
+    (" bytes=10-10 ", (10, 10)),
+])
+def test_parse_range_satisfiable(header, expected):
+    assert _parse_range(header, SIZE) == expected
+
+
+@pytest.mark.parametrize("header", [
+    "bytes=1000-",  # starts past the end
+    "bytes=5-2",  # end before start
+    "bytes=-0",  # empty suffix
+    "bytes=-",
+    "bytes=0-1,5-6",  # multiple ranges aren't supported
+    "items=0-1",
+    "",
+])
+def test_parse_range_unsatisfiable(header):
+    assert _parse_range(header, SIZE) is None
@@ -0,0 +1,145 @@
+import json
+import os
+
+import pytest
+from sqlalchemy import select
+
+from app.db.crud import _reply_rows
+from app.db.session import async_session
+from app.db.write_behind import SpilledRowsError, WriteBehindQueue, utcnow
+from app.models.diagnosis import Diagnosis
+from app.models.sessions import Message
+
+pytestmark = pytest.mark.anyio
+
+CANDIDATE = {"content": {"role": "model", "parts": [{"text": "Likely a cold. "}, {"text": "Rest."}]}}
+
+
+@pytest.fixture
+def spill_path(tmp_path):
+    return str(tmp_path / "spill.jsonl")
+
+
+async def _messages():
+    async with async_session() as session:
+        return (await session.execute(select(Message).order_by(Message.id))).scalars().all()
+
+
+async def _diagnoses():
+    async with async_session() as session:
+        return (await session.execute(select(Diagnosis).order_by(Diagnosis.id))).scalars().all()
+
+
+async def test_spilled_batches_are_replayed_with_message_links(chat_session, spill_path):
+    user_id, session_id = chat_session
+    queue = WriteBehindQueue(spill_path=spill_path)
+    batch = {"messages": [], "diagnoses": []}
+    for prompt in ("first", "second"):
+        for name, rows in _reply_rows(session_id, user_id, prompt, CANDIDATE).items():
+            batch[name].extend(rows)
+    # The second diagnosis points at the second message of the batch.
+    batch["diagnoses"][1]["_message_index"] = 1
+    queue._spill(batch)
+    assert session_id in queue._spilled_sessions
+
+    await queue.replay_spill()
+
+    messages = await _messages()
+    diagnoses = await _diagnoses()
+    assert [m.content for m in messages] == ["Likely a cold. Rest.", "Likely a cold. Rest."]
+    assert [d.message_id for d in diagnoses] == [messages[0].id, messages[1].id]
+    assert [d.text for d in diagnoses] == ["Likely a cold. Rest.", "Likely a cold. Rest."]
+    assert not os.path.exists(spill_path)
+    assert not os.path.exists(spill_path + ".replaying")
+    assert queue._spilled_sessions == set()
+
+
+async def test_legacy_lines_and_torn_lines(chat_session, spill_path):
+    user_id, session_id = chat_session
+    created_at = {"__datetime__": utcnow().isoformat()}
+    legacy_reply = json.dumps(CANDIDATE)
+    with open(spill_path, "w") as f:
+        f.write(json.dumps({"table": "messages", "row": {
+            "session_id": session_id, "role": "model", "content": legacy_reply, "created_at": created_at,
+        }}) + "\n")
+        f.write(json.dumps({"table": "diagnoses", "row": {
+            "user_id": user_id, "prompt": "cough", "diagnosis": legacy_reply, "created_at": created_at,
+        }}) + "\n")
+        f.write('{"messages": [{"session_id": ')  # crash mid-append
+    queue = WriteBehindQueue(spill_path=spill_path)
+    # A new spill after the crash starts on its own line.
+    queue._spill(_reply_rows(session_id, user_id, "later", CANDIDATE))
+
+    await queue.replay_spill()
+
+    assert [m.content for m in await _messages()] == ["Likely a cold. Rest.", "Likely a cold. Rest."]
+    diagnoses = await _diagnoses()
+    assert [(d.prompt, d.text) for d in diagnoses] == [("cough", "Likely a cold. Rest."), ("later", "Likely a cold. Rest.")]
+    assert diagnoses[0].message_id is None and diagnoses[1].message_id is not None
+    with open(spill_path + ".rejected") as f:
+        assert f.read() == '{"messages": [{"session_id": \n'
+
+
+async def test_rejected_batch_does_not_block_later_ones(chat_session, spill_path):
+    user_id, session_id = chat_session
+    queue = WriteBehindQueue(spill_path=spill_path)
+    bad = _reply_rows(session_id, user_id, "bad", CANDIDATE)
+    bad["messages"][0]["role"] = None  # NOT NULL violation
+    queue._spill(bad)
+    queue._spill(_reply_rows(session_id, user_id, "good", CANDIDATE))
+
+    await queue.replay_spill()
+
+    assert [d.prompt for d in await _diagnoses()] == ["good"]
+    with open(spill_path + ".rejected") as f:
+        assert json.loads(f.read())["diagnoses"][0]["prompt"] == "bad"
+    assert not os.path.exists(spill_path + ".replaying")
+
+
+async def test_interrupted_replay_is_resumed_not_overwritten(chat_session, spill_path):
+    user_id, session_id = chat_session
+    queue = WriteBehindQueue(spill_path=spill_path)
+    queue._spill(_reply_rows(session_id, user_id, "stranded", CANDIDATE))
+    # A crash during the previous replay left its file behind...
+    os.replace(spill_path, spill_path + ".replaying")
+    # ...and the next outage spilled more.
+    queue._spill(_reply_rows(session_id, user_id, "newer", CANDIDATE))
+
+    await queue.replay_spill()
+
+    assert [d.prompt for d in await _diagnoses()] == ["stranded", "newer"]
+
+
+async def test_wait_for_session_replays_spilled_rows(chat_session, spill_path, monkeypatch):
+    user_id, session_id = chat_session
+    queue = WriteBehindQueue(spill_path=spill_path)
+    queue._spill(_reply_rows(session_id, user_id, "during outage", CANDIDATE))
+    write = queue._write
+
+    async def unreachable(batch):
+        raise ConnectionError("database is down")
+
+    monkeypatch.setattr(queue, "_write", unreachable)
+    with pytest.raises(SpilledRowsError):
+        await queue.wait_for_session(session_id)
+    assert os.path.exists(spill_path + ".replaying")
+    # Other sessions aren't held up.
+    assert await queue.wait_for_session(session_id + 1) is False
+
+    monkeypatch.setattr(queue, "_write", write)
+    assert await queue.wait_for_session(session_id) is True
+    assert [d.prompt for d in await _diagnoses()] == ["during outage"]
+
+
+async def test_started_queue_flushes_for_read_your_writes(chat_session, spill_path):
+    user_id, session_id = chat_session
+    queue = WriteBehindQueue(interval_ms=60_000, spill_path=spill_path)
+    queue.start()
+    try:
+        await queue.add(session_id, _reply_rows(session_id, user_id, "queued", CANDIDATE))
+        assert queue.pending_for(session_id)
+        assert await queue.wait_for_session(session_id) is True
+        assert not queue.pending_for(session_id)
+        assert [m.content for m in await _messages()] == ["Likely a cold. Rest."]
+    finally:
+        await queue.close()